@@ -1,19 +1,28 @@
+import copy
+import functools
+import os
+import time
 import random
 import pathlib
 
-from typing import Optional
+from typing import List, Optional
 
 import click
 from schnapsen.bots import MLDataBot, train_ML_model, MLPlayingBot, RandBot
 from schnapsen.bots.strategybot1 import StrategyBot1
 from schnapsen.bots.example_bot import ExampleBot
 
-from schnapsen.game import (Bot, Move, PlayerPerspective,
+from schnapsen.batched import BatchedSimulator
+from schnapsen.endgame_cache import build_endgame_cache
+
+from schnapsen.game import (Bot, BotFactory, BotState, GamePhase, GameState, Move, PlayerPerspective,
                             SchnapsenGamePlayEngine, Trump_Exchange)
 from schnapsen.twenty_four_card_schnapsen import \
     TwentyFourSchnapsenGamePlayEngine
 
 from schnapsen.bots.rdeep import RdeepBot
+from schnapsen.bots.pimc import PIMCBot
+from schnapsen.bots.alphabeta import AlphaBetaSolver, ParallelAlphaBetaSolver
 
 
 @click.group()
@@ -40,6 +49,32 @@ def play_games_and_return_stats(engine: SchnapsenGamePlayEngine, bot1: Bot, bot2
     return bot1_wins
 
 
+def play_games_in_parallel_and_return_stats(engine: SchnapsenGamePlayEngine, bot_factory1: BotFactory, bot_factory2: BotFactory,
+                                            number_of_games: int, workers: int) -> int:
+    """
+    Play number_of_games games between bots created by bot_factory1 and bot_factory2, using the engine, and return how often bot1 won.
+    The bots swap seats like in play_games_and_return_stats, and the games are played by the given number of processes.
+    Every game gets new bots, seeded from the number of the game with bot_seeds, so the results differ from those of a pair of bots playing all games.
+    """
+    results = engine.play_games(bot_factory1, bot_factory2, seeds=range(1, number_of_games + 1), workers=workers)
+    return sum(bot1_won for bot1_won, _, _ in results)
+
+
+def create_rdeep_bot(seed: int) -> Bot:
+    return RdeepBot(num_samples=16, depth=4, rand=random.Random(seed))
+
+
+@functools.lru_cache(maxsize=None)
+def load_ml_playing_bot(model_location: pathlib.Path) -> MLPlayingBot:
+    """Load the model once in each process, instead of for every game"""
+    return MLPlayingBot(model_location=model_location)
+
+
+def create_ml_playing_bot(model_location: pathlib.Path, seed: int) -> Bot:
+    # a shallow copy is a new bot, which shares the loaded model
+    return copy.copy(load_ml_playing_bot(model_location))
+
+
 @main.command()
 def random_game() -> None:
     engine = SchnapsenGamePlayEngine()
@@ -50,6 +85,73 @@ def random_game() -> None:
         print(f"Game ended. Winner is {winner_id} with {game_points} points, score {score}")
 
 
+@main.command()
+@click.option("--games", default=10000, help="The number of games to play.")
+@click.option("--twenty-four", is_flag=True, help="Use the rules of twenty-four card schnapsen.")
+def random_baseline(games: int, twenty_four: bool) -> None:
+    """Statistics of random play, with all games simulated at once"""
+    engine = TwentyFourSchnapsenGamePlayEngine() if twenty_four else SchnapsenGamePlayEngine()
+    results = BatchedSimulator(engine).play_random_games(range(1, games + 1))
+    leader_wins = int((results.winners == 0).sum())
+    print(f"The player leading the first trick won {leader_wins} out of {games} games.")
+    print(f"The average number of game points won was {results.game_points.mean():.3f}.")
+    for points in (1, 2, 3):
+        print(f"{int((results.game_points == points).sum())} games were won with {points} game points.")
+
+
+@main.command("build-endgame-cache")
+@click.option("--games", default=1000, help="The number of games whose phase two positions are solved.")
+@click.option("--output", type=click.Path(dir_okay=False, path_type=pathlib.Path), default="endgame_cache.bin", help="The file to write.")
+def build_phase_two_endgame_cache(games: int, output: pathlib.Path) -> None:
+    """Solve the phase two positions reachable in random games, and write them to an endgame cache. Other positions are not in the cache."""
+    engine = SchnapsenGamePlayEngine()
+    roots = []
+    for seed in range(1, games + 1):
+        deck = engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), random.Random(seed))
+        hand1, hand2, talon = engine.hand_generator.generateHands(deck)
+        state = GameState(leader=BotState(RandBot(seed), hand1), follower=BotState(RandBot(seed + 1), hand2), talon=talon, previous=None)
+        # play random tricks until the talon is empty
+        while state.game_phase() == GamePhase.ONE and not engine.trick_scorer.declare_winner(state):
+            state, _ = engine.play_at_most_n_tricks(state, RandBot(seed), RandBot(seed + 1), n=1)
+        if not engine.trick_scorer.declare_winner(state):
+            roots.append(state)
+    positions = build_endgame_cache(str(output), engine, roots)
+    print(f"Wrote {positions} positions, reachable from the second phase of {len(roots)} games, to {output}.")
+
+
+@main.command()
+@click.option("--positions", default=10, help="The number of positions to solve.")
+@click.option("--tricks", default=3, help="The number of random tricks played before the positions, fewer tricks give larger searches.")
+@click.option("--max-workers", default=os.cpu_count() or 1, help="The largest number of worker processes to try.")
+def parallel_alphabeta_benchmark(positions: int, tricks: int, max_workers: int) -> None:
+    """Solve perfect information positions to the end of the game with the ParallelAlphaBetaSolver, and report the speedup per number of workers"""
+    engine = SchnapsenGamePlayEngine()
+    states: List[GameState] = []
+    seed = 0
+    while len(states) < positions:
+        seed += 1
+        deck = engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), random.Random(seed))
+        hand1, hand2, talon = engine.hand_generator.generateHands(deck)
+        state = GameState(leader=BotState(RandBot(seed), hand1), follower=BotState(RandBot(seed + 1), hand2), talon=talon, previous=None)
+        state, _ = engine.play_at_most_n_tricks(state, RandBot(seed), RandBot(seed + 1), n=tricks)
+        if not engine.trick_scorer.declare_winner(state):
+            states.append(state)
+    start = time.perf_counter()
+    expected = [AlphaBetaSolver(engine).solve(state) for state in states]
+    sequential = time.perf_counter() - start
+    print(f"The AlphaBetaSolver took {sequential:.2f} seconds.")
+    for workers in range(1, max_workers + 1):
+        solver = ParallelAlphaBetaSolver(engine, workers)
+        # start the processes before timing
+        solver.solve(states[0], max_depth=1)
+        start = time.perf_counter()
+        results = [solver.solve(state) for state in states]
+        elapsed = time.perf_counter() - start
+        solver.close()
+        assert [value for value, _ in results] == [value for value, _ in expected], "The parallel search found different values"
+        print(f"With {workers} workers it took {elapsed:.2f} seconds, a speedup of {sequential / elapsed:.2f}.")
+
+
 class NotificationExampleBot(Bot):
 
     def get_move(self, state: PlayerPerspective, leader_move: Optional[Move]) -> Move:
@@ -90,14 +192,21 @@ def try_example_bot_game() -> None:
 
 
 @main.command()
-def rdeep_game() -> None:
+@click.option("--workers", default=1, help="The number of processes playing the games. With more than one, every game gets new bots "
+              "seeded from the number of the game, so the results differ from those of a single process, where one pair of bots plays all games.")
+def rdeep_game(workers: int) -> None:
+    engine = SchnapsenGamePlayEngine()
+    amount = 100
+    if workers > 1:
+        wins = play_games_in_parallel_and_return_stats(engine=engine, bot_factory1=create_rdeep_bot, bot_factory2=RandBot, number_of_games=amount,
+                                                       workers=workers)
+        print(f"won {wins} out of {amount}")
+        return
     bot1: Bot
     bot2: Bot
-    engine = SchnapsenGamePlayEngine()
     rdeep = bot1 = RdeepBot(num_samples=16, depth=4, rand=random.Random(4564654644))
     bot2 = RandBot(464566)
     wins = 0
-    amount = 100
     for game_number in range(1, amount + 1):
         if game_number % 2 == 0:
             bot1, bot2 = bot2, bot1
@@ -108,6 +217,28 @@ def rdeep_game() -> None:
             print(f"won {wins} out of {game_number}")
 
 
+def create_timed_rdeep_bot(time_budget: float, seed: int) -> Bot:
+    return RdeepBot(num_samples=10000, depth=4, rand=random.Random(seed), time_budget=time_budget)
+
+
+def create_timed_pimc_bot(time_budget: float, seed: int) -> Bot:
+    return PIMCBot(num_samples=1000, rand=random.Random(seed), time_budget=time_budget)
+
+
+@main.command()
+@click.option("--games", default=100, help="The number of games to play.")
+@click.option("--time-budget", default=0.1, help="The number of seconds both bots can spend on a move.")
+@click.option("--workers", default=1, help="The number of games played at once. With more than one, the bots share the cores, "
+              "so a bot can get less CPU time within its budget than the other.")
+def pimc_benchmark(games: int, time_budget: float, workers: int) -> None:
+    """Play the PIMCBot against the RdeepBot, with the same time for each move. Every game gets new bots, seeded from the number of the game."""
+    engine = SchnapsenGamePlayEngine()
+    wins = play_games_in_parallel_and_return_stats(engine=engine, bot_factory1=functools.partial(create_timed_pimc_bot, time_budget),
+                                                   bot_factory2=functools.partial(create_timed_rdeep_bot, time_budget), number_of_games=games,
+                                                   workers=workers)
+    print(f"The PIMCBot won {wins} out of {games} games against the RdeepBot, with {time_budget} seconds per move.")
+
+
 @main.group()
 def ml() -> None:
     """Commands for the ML bot"""
@@ -171,17 +302,24 @@ def train_model() -> None:
 
 
 @ml.command()
-def try_bot_game() -> None:
+@click.option("--workers", default=1, help="The number of processes playing the games. With more than one, every game gets new bots "
+              "seeded from the number of the game, so the results differ from those of a single process, where one pair of bots plays all games.")
+def try_bot_game(workers: int) -> None:
     engine = SchnapsenGamePlayEngine()
     model_dir: str = 'ML_models'
     model_name: str = 'simple_model'
     model_location = pathlib.Path(model_dir) / model_name
-    bot1: Bot = MLPlayingBot(model_location=model_location)
-    bot2: Bot = RandBot(464566)
     number_of_games: int = 10000
 
     # play games with altering leader position on first rounds
-    ml_bot_wins_against_random = play_games_and_return_stats(engine=engine, bot1=bot1, bot2=bot2, number_of_games=number_of_games)
+    if workers > 1:
+        ml_bot_wins_against_random = play_games_in_parallel_and_return_stats(engine=engine,
+                                                                             bot_factory1=functools.partial(create_ml_playing_bot, model_location),
+                                                                             bot_factory2=RandBot, number_of_games=number_of_games, workers=workers)
+    else:
+        bot1: Bot = MLPlayingBot(model_location=model_location)
+        bot2: Bot = RandBot(464566)
+        ml_bot_wins_against_random = play_games_and_return_stats(engine=engine, bot1=bot1, bot2=bot2, number_of_games=number_of_games)
     print(f"The ML bot with name {model_name}, won {ml_bot_wins_against_random} times out of {number_of_games} games played.")
 
 
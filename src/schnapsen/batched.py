@@ -0,0 +1,211 @@
+"""
+Simulation of many games at once. All games are advanced one trick at a time in lockstep, using numpy array operations.
+This is meant for baseline statistics of random play, for which playing the games one by one with the GamePlayEngine is slow.
+"""
+from dataclasses import dataclass
+from random import Random
+from typing import Iterable, Optional, cast
+
+import numpy as np
+import numpy.typing as npt
+
+from .deck import Rank, Suit
+from .game import FastSimulator, GamePlayEngine, SchnapsenTrickScorer
+
+
+@dataclass
+class BatchedGameResults:
+    """
+    The results of games played by the BatchedSimulator. All arrays are indexed by game.
+    Player 0 leads the first trick of each game.
+    """
+
+    winners: npt.NDArray[np.int8]
+    """The player (0 or 1) which won each game"""
+    game_points: npt.NDArray[np.int8]
+    """The game points the winner obtained"""
+    direct_points: npt.NDArray[np.int16]
+    """The direct points of player 0 and player 1 at the end of each game, with shape (number of games, 2)"""
+    pending_points: npt.NDArray[np.int16]
+    """The pending points of player 0 and player 1 at the end of each game, with shape (number of games, 2)"""
+    actions: Optional[npt.NDArray[np.int16]] = None
+    """
+    If recorded, the actions played, with shape (number of games, maximum number of tricks, 2).
+    For each trick, the action of the leader and the card of the follower, in the encoding of the FastSimulator.
+    The follower card is -1 after a trump exchange, and both are -1 after the game has ended.
+    """
+
+
+class BatchedSimulator:
+    """
+    Plays random games with the rules of the FastSimulator, and hence of the engine it is created for, for many games at once.
+    Hands are stored as boolean matrices indexed by (game, player, card), with cards as in the FastSimulator.
+    The leader and follower choose uniformly at random among their legal actions.
+    """
+
+    def __init__(self, engine: GamePlayEngine) -> None:
+        self.fast_simulator = FastSimulator(engine)
+        """The FastSimulator used for dealing, and whose rules are applied"""
+        cards = self.fast_simulator.cards
+        suits = list(Suit)
+        self.__num_cards = len(cards)
+        self.__suit = suit = np.array([suits.index(card.suit) for card in cards], dtype=np.int64)
+        self.__points = points = np.array([engine.trick_scorer.rank_to_points(card.rank) for card in cards], dtype=np.int16)
+        # all indexed by [leader card, card]
+        self.__same_suit = same_suit = suit[:, None] == suit[None, :]
+        self.__higher = same_suit & (points[None, :] > points[:, None])
+        # indexed by [suit, card]
+        self.__suit_cards = np.arange(4)[:, None] == suit[None, :]
+        # indexed by [leader card, follower card, trump suit]
+        trick_outcomes = cast(SchnapsenTrickScorer, engine.trick_scorer).trick_outcomes
+        self.__leader_wins = np.array([[[trick_outcomes.outcome(leader_card, follower_card, trump)[0] for trump in suits]
+                                        for follower_card in cards] for leader_card in cards])
+
+        def card_of_rank(rank: Rank) -> npt.NDArray[np.int64]:
+            # for each suit the card of the rank in that suit, or -1 if it is not in the deck
+            result = np.full(4, -1, dtype=np.int64)
+            for index, card in enumerate(cards):
+                if card.rank is rank:
+                    result[suits.index(card.suit)] = index
+            return result
+        self.__jack = card_of_rank(Rank.JACK)
+        self.__queen = card_of_rank(Rank.QUEEN)
+        self.__king = card_of_rank(Rank.KING)
+        self.__has_marriage = (self.__queen >= 0) & (self.__king >= 0)
+        # indexed by [marriage suit, trump suit]
+        marriage_scores = [[self.fast_simulator.marriage_score(marriage_suit, trump) for trump in range(4)] for marriage_suit in range(4)]
+        self.__marriage_direct = np.array([[score.direct_points for score in row] for row in marriage_scores], dtype=np.int16)
+        self.__marriage_pending = np.array([[score.pending_points for score in row] for row in marriage_scores], dtype=np.int16)
+
+    def play_random_games(self, seeds: Iterable[int], rng: Optional[np.random.Generator] = None,
+                          record_actions: bool = False) -> BatchedGameResults:
+        """
+        Play one random game for each seed. Game i is dealt like GamePlayEngine.play_game deals with random.Random(seeds[i]).
+
+        :param seeds: The seeds used for dealing the games.
+        :param rng: The generator used to choose the moves. If not provided, a generator seeded with all seeds is used.
+        :param record_actions: Whether the actions played should be included in the results.
+        :returns: The results of the games, in the order of the seeds.
+        """
+        seeds = list(seeds)
+        if rng is None:
+            rng = np.random.default_rng(seeds)
+        n = self.__num_cards
+        num_games = len(seeds)
+
+        hands = np.zeros((num_games, 2, n), dtype=bool)
+        talon: npt.NDArray[np.int64] = np.zeros((num_games, 0), dtype=np.int64)
+        trump = np.zeros(num_games, dtype=np.int64)
+        for game, seed in enumerate(seeds):
+            state = self.fast_simulator.deal(Random(seed))
+            if game == 0:
+                talon = np.zeros((num_games, len(state.talon)), dtype=np.int64)
+            assert len(state.talon) == talon.shape[1], "The BatchedSimulator requires all talons to have the same size"
+            hands[game, 0, state.hands[0]] = True
+            hands[game, 1, state.hands[1]] = True
+            talon[game] = state.talon
+            trump[game] = state.trump_suit
+        talon_size = talon.shape[1]
+
+        drawn = np.zeros(num_games, dtype=np.int64)
+        leader = np.zeros(num_games, dtype=np.int64)
+        direct_points = np.zeros((num_games, 2), dtype=np.int16)
+        pending_points = np.zeros((num_games, 2), dtype=np.int16)
+        winners = np.zeros(num_games, dtype=np.int8)
+        game_points = np.zeros(num_games, dtype=np.int8)
+        done = np.zeros(num_games, dtype=bool)
+        # there is at most one trump exchange in a game, so n tricks is more than enough
+        actions = np.full((num_games, n, 2), -1, dtype=np.int16) if record_actions else None
+
+        active = np.arange(num_games)
+        trick_number = 0
+        while active.size > 0:
+            rows = np.arange(active.size)
+            leaders = leader[active]
+            followers = 1 - leaders
+            leader_hands = hands[active, leaders]
+            trumps = trump[active]
+            talon_left = drawn[active] < talon_size
+
+            # the leader plays
+            legal = np.zeros((active.size, n + 8), dtype=bool)
+            legal[:, :n] = leader_hands
+            trump_jacks = self.__jack[trumps]
+            legal[rows, n + trumps] = talon_left & (trump_jacks >= 0) & leader_hands[rows, trump_jacks]
+            legal[:, n + 4:] = self.__has_marriage & leader_hands[:, self.__queen] & leader_hands[:, self.__king]
+            leader_actions = self.__sample(legal, rng)
+            if actions is not None:
+                actions[active, trick_number, 0] = leader_actions
+
+            # trump exchanges end the trick
+            exchange = (leader_actions >= n) & (leader_actions < n + 4)
+            games = active[exchange]
+            jacks = trump_jacks[exchange]
+            hands[games, leaders[exchange], jacks] = False
+            hands[games, leaders[exchange], talon[games, -1]] = True
+            talon[games, -1] = jacks
+
+            playing = ~exchange
+            games, leaders, followers = active[playing], leaders[playing], followers[playing]
+            leader_actions, trumps, talon_left = leader_actions[playing], trumps[playing], talon_left[playing]
+            marriage = leader_actions >= n + 4
+            marriage_suits = np.clip(leader_actions - n - 4, 0, 3)
+            leader_cards = np.where(marriage, self.__queen[marriage_suits], leader_actions)
+            direct_points[games, leaders] += np.where(marriage, self.__marriage_direct[marriage_suits, trumps], 0).astype(np.int16)
+            pending_points[games, leaders] += np.where(marriage, self.__marriage_pending[marriage_suits, trumps], 0).astype(np.int16)
+
+            # the follower plays, in phase two it has to follow suit, play higher, or play trump if it can
+            follower_hands = hands[games, followers]
+            phase_two = ~talon_left[:, None]
+            higher = follower_hands & self.__higher[leader_cards]
+            same_suit = follower_hands & self.__same_suit[leader_cards]
+            trump_cards = follower_hands & self.__suit_cards[trumps] & (self.__suit[leader_cards] != trumps)[:, None]
+            allowed = np.where(phase_two & trump_cards.any(axis=1, keepdims=True), trump_cards, follower_hands)
+            allowed = np.where(phase_two & same_suit.any(axis=1, keepdims=True), same_suit, allowed)
+            allowed = np.where(phase_two & higher.any(axis=1, keepdims=True), higher, allowed)
+            follower_cards = self.__sample(allowed, rng)
+            if actions is not None:
+                actions[games, trick_number, 1] = follower_cards
+
+            # score the trick, the winner leads the next one
+            hands[games, leaders, leader_cards] = False
+            hands[games, followers, follower_cards] = False
+            trick_winners = np.where(self.__leader_wins[leader_cards, follower_cards, trumps], leaders, followers)
+            trick_losers = 1 - trick_winners
+            direct_points[games, trick_winners] += self.__points[leader_cards] + self.__points[follower_cards] + pending_points[games, trick_winners]
+            pending_points[games, trick_winners] = 0
+            leader[games] = trick_winners
+
+            # draw from the talon, the winner first
+            drawing = talon_left
+            drawing_games, positions = games[drawing], drawn[games[drawing]]
+            hands[drawing_games, trick_winners[drawing], talon[drawing_games, positions]] = True
+            hands[drawing_games, trick_losers[drawing], talon[drawing_games, positions + 1]] = True
+            drawn[drawing_games] += 2
+
+            # the same as SchnapsenTrickScorer.declare_winner
+            winner_points = direct_points[games, trick_winners]
+            loser_points = direct_points[games, trick_losers]
+            reached_66 = winner_points >= 66
+            out_of_cards = ~hands[games].any(axis=(1, 2)) & (drawn[games] >= talon_size)
+            ended = reached_66 | out_of_cards
+            points_for_66 = np.where(loser_points == 0, 3, np.where(loser_points >= 33, 1, 2))
+            winners[games[ended]] = trick_winners[ended]
+            game_points[games[ended]] = np.where(reached_66, points_for_66, 1)[ended]
+            done[games[ended]] = True
+
+            active = active[~done[active]]
+            trick_number += 1
+
+        return BatchedGameResults(winners=winners, game_points=game_points, direct_points=direct_points,
+                                  pending_points=pending_points, actions=actions)
+
+    @staticmethod
+    def __sample(legal: npt.NDArray[np.bool_], rng: np.random.Generator) -> npt.NDArray[np.int64]:
+        """For each row, pick one of the columns which are True uniformly at random"""
+        keys: npt.NDArray[np.float64] = np.where(legal, rng.random(legal.shape), -1.0)
+        chosen: npt.NDArray[np.int64] = np.argmax(keys, axis=1)
+        return chosen
+
+    def __repr__(self) -> str:
+        return f"BatchedSimulator(engine={self.fast_simulator.engine})"
@@ -4,7 +4,9 @@ it by from schnapsen.bots import MyBot.
 from .rand import RandBot
 from .alphabeta import AlphaBetaBot
 from .rdeep import RdeepBot
+from .pimc import PIMCBot
+from .ismcts import ISMCTSBot
 from .ml_bot import MLDataBot, MLPlayingBot, train_ML_model
 from .gui.guibot import SchnapsenServer
 
-__all__ = ["RandBot", "AlphaBetaBot", "RdeepBot", "MLDataBot", "MLPlayingBot", "train_ML_model", "SchnapsenServer"]
+__all__ = ["RandBot", "AlphaBetaBot", "RdeepBot", "PIMCBot", "ISMCTSBot", "MLDataBot", "MLPlayingBot", "train_ML_model", "SchnapsenServer"]
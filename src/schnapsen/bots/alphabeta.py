@@ -1,11 +1,463 @@
-from typing import Optional
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
 
-from schnapsen.game import Bot, Move, PlayerPerspective
+from schnapsen.game import Bot, GamePhase, GamePlayEngine, GameState, Move, PlayerPerspective, RegularMove
+from schnapsen.endgame_cache import EndgameCache
+
+_EXACT, _LOWER_BOUND, _UPPER_BOUND = 0, 1, 2
+# The depth stored in the transposition table for values which were found without cutting off the search at some depth
+_SOLVED = 1 << 30
+# Any win or loss is worth at least one game point, heuristic values at the search horizon are always smaller than that
+_HEURISTIC_SCALE = 1.0 / 256
+
+_TableKey = Tuple[int, Optional[Move]]
+_TableEntry = Tuple[int, float, int, Optional[Move]]
+
+
+class AlphaBetaSolver:
+    """
+    Searches perfect information GameStates with alpha-beta pruning, to find the move which gives the most game points.
+    The value of a position is the number of game points (see TrickScorer.declare_winner) the player to move wins, or minus the points it loses.
+
+    Each trick is searched as two plies, one for the leader and one for the follower. The tricks are played on the GameState
+    with apply_trick and undo, so the state is not copied. To find cutoffs early, moves are ordered by the best move stored
+    in the transposition table, then the killer moves of the ply, then their history score, and finally by the points of their card.
+
+    The search is iteratively deepened by one trick at a time, until no position had to be cut off at the search horizon,
+    which means that the value is exact. In phase two, this is the case after at most five iterations.
+    The transposition table is kept between searches, it is bounded to table_size positions, evicting the oldest ones.
+    """
+
+    def __init__(self, engine: GamePlayEngine, table_size: int = 1_000_000) -> None:
+        """
+        Create a new solver.
+
+        :param engine: the engine with the rules of the game
+        :param table_size: the maximum number of positions kept in the transposition table
+        """
+        assert table_size >= 1, f"The transposition table must be able to hold at least one position, got {table_size}"
+        self.engine = engine
+        self.table_size = table_size
+        self.__table: Dict[_TableKey, _TableEntry] = {}
+        self.__killers: List[List[Move]] = []
+        self.__history: Dict[Move, int] = {}
+        self.__cut_off = False
+        self.nodes = 0
+        """The number of positions visited by the last search"""
+
+    def solve(self, game_state: GameState, leader_move: Optional[Move] = None, max_depth: Optional[int] = None) -> Tuple[float, Move]:
+        """
+        Find the best move for the player to move in the game_state. The game_state is modified during the search, but restored afterwards.
+
+        :param game_state: the state to search. Its bots are not used.
+        :param leader_move: if provided, the move the leader already played in the current trick, and the follower is the player to move.
+        :param max_depth: if provided, the search stops at this many tricks, and positions beyond it are valued by the difference of the direct points.
+        :returns: the value of the position for the player to move, and the move to play.
+        """
+        assert self.engine.trick_scorer.declare_winner(game_state) is None, "The game has already ended"
+        self.__start_search()
+        value = self.__deepen(game_state, leader_move, self.__depth_limit(game_state, max_depth))
+        best_move = self.__table[self.__key(game_state, leader_move)][3]
+        assert best_move is not None
+        return value, best_move
+
+    def move_values(self, game_state: GameState, leader_move: Optional[Move] = None, max_depth: Optional[int] = None) -> List[Tuple[Move, float]]:
+        """
+        Find the value of each of the valid moves for the player to move in the game_state. This takes longer than solve,
+        since the moves which are not the best one have to be searched more precisely.
+        The game_state is modified during the search, but restored afterwards.
+
+        :param game_state: the state to search. Its bots are not used.
+        :param leader_move: if provided, the move the leader already played in the current trick, and the follower is the player to move.
+        :param max_depth: if provided, the search stops at this many tricks, and positions beyond it are valued by the difference of the direct points.
+        :returns: the valid moves, each with the value for the player to move when playing it.
+        """
+        engine = self.engine
+        assert engine.trick_scorer.declare_winner(game_state) is None, "The game has already ended"
+        self.__start_search()
+        depth_limit = self.__depth_limit(game_state, max_depth)
+        result: List[Tuple[Move, float]] = []
+        if leader_move is None:
+            for move in engine.move_validator.get_legal_leader_moves(engine, game_state):
+                if move.is_trump_exchange():
+                    game_state.apply_trick(engine, move)
+                    value = self.__deepen(game_state, None, depth_limit)
+                    game_state.undo()
+                else:
+                    value = -self.__deepen(game_state, move, depth_limit)
+                result.append((move, value))
+            return result
+        for move in engine.move_validator.get_legal_follower_moves(engine, game_state, leader_move):
+            me = game_state.follower
+            game_state.apply_trick(engine, leader_move, move.as_regular_move())
+            value = self.__deepen(game_state, None, depth_limit - 1)
+            result.append((move, value if game_state.leader is me else -value))
+            game_state.undo()
+        return result
+
+    def search(self, game_state: GameState, leader_move: Optional[Move], alpha: float, beta: float, max_depth: Optional[int] = None) -> float:
+        """
+        Find the value of the position for the player to move within a window. This is used to search parts of a tree separately,
+        like the ParallelAlphaBetaSolver does. The game_state is modified during the search, but restored afterwards.
+
+        :param game_state: the state to search. Its bots are not used.
+        :param leader_move: if provided, the move the leader already played in the current trick, and the follower is the player to move.
+        :param alpha: the value the player to move can already get elsewhere
+        :param beta: the value the opponent can already keep the player to move to elsewhere
+        :param max_depth: if provided, the search stops at this many tricks, and positions beyond it are valued by the difference of the direct points.
+        :returns: the value if it is between alpha and beta. Otherwise, a value of at most alpha is an upper bound, and a value of at least beta a lower bound.
+        """
+        winner = self.engine.trick_scorer.declare_winner(game_state) if leader_move is None else None
+        if winner is not None:
+            winning_bot, points = winner
+            return float(points if winning_bot is game_state.leader else -points)
+        self.__start_search()
+        return self.__deepen(game_state, leader_move, self.__depth_limit(game_state, max_depth), alpha, beta)
+
+    def __start_search(self) -> None:
+        self.__killers = []
+        self.__history = {}
+        self.nodes = 0
+
+    @staticmethod
+    def __depth_limit(game_state: GameState, max_depth: Optional[int]) -> int:
+        # the game ends at the latest when both players are out of cards, and a trump exchange does not count as a trick
+        full_depth = len(game_state.leader.hand) + (len(game_state.talon) + 1) // 2 + 1
+        return full_depth if max_depth is None else min(max_depth, full_depth)
+
+    def __deepen(self, game_state: GameState, leader_move: Optional[Move], depth_limit: int,
+                 alpha: float = float('-inf'), beta: float = float('inf')) -> float:
+        """Search one trick deeper each time, until the value is exact or the depth limit is reached"""
+        depth = min(1, depth_limit)
+        while True:
+            self.__cut_off = False
+            value = self.__search(game_state, leader_move, depth, alpha, beta, 0)
+            if not self.__cut_off or depth >= depth_limit:
+                return value
+            depth += 1
+
+    def __search(self, game_state: GameState, leader_move: Optional[Move], depth: int, alpha: float, beta: float, ply: int) -> float:
+        """The negamax value of the position for the player to move, which is the follower if leader_move is given."""
+        self.nodes += 1
+        engine = self.engine
+        if leader_move is None:
+            winner = engine.trick_scorer.declare_winner(game_state)
+            if winner is not None:
+                winning_bot, points = winner
+                return float(points if winning_bot is game_state.leader else -points)
+            if depth <= 0:
+                self.__cut_off = True
+                return (game_state.leader.score.direct_points - game_state.follower.score.direct_points) * _HEURISTIC_SCALE
+
+        key = self.__key(game_state, leader_move)
+        entry = self.__table.get(key)
+        table_move: Optional[Move] = None
+        if entry is not None:
+            entry_depth, entry_value, entry_flag, table_move = entry
+            if entry_depth >= depth:
+                if entry_flag == _EXACT or (entry_flag == _LOWER_BOUND and entry_value >= beta) or (entry_flag == _UPPER_BOUND and entry_value <= alpha):
+                    if entry_depth != _SOLVED:
+                        self.__cut_off = True
+                    return entry_value
+
+        outer_cut_off = self.__cut_off
+        self.__cut_off = False
+        original_alpha = alpha
+        best_value = float('-inf')
+        best_move: Optional[Move] = None
+        for move in self.__ordered_moves(game_state, leader_move, table_move, ply):
+            if leader_move is None:
+                if move.is_trump_exchange():
+                    # the leader stays the player to move
+                    game_state.apply_trick(engine, move)
+                    value = self.__search(game_state, None, depth, alpha, beta, ply + 1)
+                    game_state.undo()
+                else:
+                    value = -self.__search(game_state, move, depth, -beta, -alpha, ply + 1)
+            else:
+                me = game_state.follower
+                game_state.apply_trick(engine, leader_move, move.as_regular_move())
+                if game_state.leader is me:
+                    # I won the trick, and lead the next one
+                    value = self.__search(game_state, None, depth - 1, alpha, beta, ply + 1)
+                else:
+                    value = -self.__search(game_state, None, depth - 1, -beta, -alpha, ply + 1)
+                game_state.undo()
+            if value > best_value:
+                best_value = value
+                best_move = move
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                self.__record_cutoff(move, depth, ply)
+                break
+
+        if best_value <= original_alpha:
+            flag = _UPPER_BOUND
+        elif best_value >= beta:
+            flag = _LOWER_BOUND
+        else:
+            flag = _EXACT
+        self.__store(key, (depth if self.__cut_off else _SOLVED, best_value, flag, best_move))
+        self.__cut_off = self.__cut_off or outer_cut_off
+        return best_value
+
+    def __ordered_moves(self, game_state: GameState, leader_move: Optional[Move], table_move: Optional[Move], ply: int) -> List[Move]:
+        engine = self.engine
+        if leader_move is None:
+            moves = list(engine.move_validator.get_legal_leader_moves(engine, game_state))
+        else:
+            moves = list(engine.move_validator.get_legal_follower_moves(engine, game_state, leader_move))
+        killers = self.__killers[ply] if ply < len(self.__killers) else []
+        history = self.__history
+        rank_to_points = engine.trick_scorer.rank_to_points
+
+        def priority(move: Move) -> Tuple[bool, bool, int, bool, int]:
+            # marriages and trump exchanges first, then the cards with the most points
+            points = 0 if move.is_trump_exchange() else rank_to_points(move.cards[0].rank)
+            return move == table_move, move in killers, history.get(move, 0), not move.is_regular_move(), points
+        moves.sort(key=priority, reverse=True)
+        return moves
+
+    def __record_cutoff(self, move: Move, depth: int, ply: int) -> None:
+        while len(self.__killers) <= ply:
+            self.__killers.append([])
+        killers = self.__killers[ply]
+        if move not in killers:
+            # keep the two most recent killer moves of the ply
+            killers.insert(0, move)
+            del killers[2:]
+        self.__history[move] = self.__history.get(move, 0) + depth * depth
+
+    def __store(self, key: _TableKey, entry: _TableEntry) -> None:
+        table = self.__table
+        if key not in table and len(table) >= self.table_size:
+            # dicts keep the insertion order, so this is the oldest position
+            del table[next(iter(table))]
+        table[key] = entry
+
+    @staticmethod
+    def __key(game_state: GameState, leader_move: Optional[Move]) -> _TableKey:
+        """The position, and the move of the leader if the follower is to move"""
+        return game_state.zobrist_hash(), leader_move
+
+
+# All values are multiples of _HEURISTIC_SCALE, searching above a bound minus this margin also finds the exact values of moves equal to the bound
+_TIE_MARGIN = _HEURISTIC_SCALE / 2
+
+
+class ParallelAlphaBetaSolver:
+    """
+    Searches perfect information GameStates like the AlphaBetaSolver, but divides the moves at the root over a pool of processes.
+    The first move, the best one according to a search of one trick, is searched in this process to get a bound. Then the other moves
+    are searched in the workers. The best value found so far is kept in shared memory, and each worker only searches for values above it,
+    and publishes the values it finds which are better. If there are fewer moves for the leader than workers, the replies of the follower
+    to each move are searched separately instead, and combined by this process.
+
+    The chosen move does not depend on the timing of the workers: the values of the moves which can be the best are always exact,
+    and of the moves with the best value, the first in the order of the root is played.
+    With max_depth, every search starts with an empty transposition table, since values at the search horizon depend on the positions stored.
+    """
+
+    def __init__(self, engine: GamePlayEngine, workers: int, table_size: int = 1_000_000) -> None:
+        """
+        Create a new parallel solver. The worker processes are started on the first search.
+
+        :param engine: the engine with the rules of the game
+        :param workers: the number of processes searching the moves at the root
+        :param table_size: the maximum number of positions kept in the transposition table of each process
+        """
+        assert workers >= 1, f"we cannot work with less than one worker, got {workers}"
+        self.engine = engine
+        self.workers = workers
+        self.table_size = table_size
+        self.__solver = AlphaBetaSolver(engine, table_size)
+        self.__bound = multiprocessing.Value('d', float('-inf'))
+        self.__executor: Optional[ProcessPoolExecutor] = None
+
+    def solve(self, game_state: GameState, leader_move: Optional[Move] = None, max_depth: Optional[int] = None) -> Tuple[float, Move]:
+        """
+        Find the best move for the player to move in the game_state, see AlphaBetaSolver.solve.
+
+        :param game_state: the state to search. Its bots are not used.
+        :param leader_move: if provided, the move the leader already played in the current trick, and the follower is the player to move.
+        :param max_depth: if provided, the search stops at this many tricks, and positions beyond it are valued by the difference of the direct points.
+        :returns: the value of the position for the player to move, and the move to play.
+        """
+        engine = self.engine
+        assert engine.trick_scorer.declare_winner(game_state) is None, "The game has already ended"
+        # the order of the moves does not depend on earlier searches, since it breaks ties between moves with the same value
+        ordering = AlphaBetaSolver(engine).move_values(game_state, leader_move, max_depth=1)
+        moves = [move for move, _ in sorted(ordering, key=lambda move_value: move_value[1], reverse=True)]
+        if self.__executor is None:
+            # the pool is kept for the next searches, starting processes is expensive
+            self.__executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                  initargs=(engine, self.table_size, self.__bound))
+        encoded = engine.state_codec.encode(game_state)
+        bound = self.__bound
+        bound.value = float('-inf')
+        values: Dict[Move, float] = {}
+        if leader_move is None and len(moves) < self.workers:
+            self.__solve_replies(game_state, encoded, moves, max_depth, values)
+        else:
+            solver = self.__solver if max_depth is None else AlphaBetaSolver(engine, self.table_size)
+            first_value = _move_value(solver, game_state, leader_move, moves[0], None, float('-inf'), max_depth)
+            values[moves[0]] = bound.value = first_value
+            futures = [self.__executor.submit(_search_in_worker, encoded, leader_move, move, None, max_depth, True) for move in moves[1:]]
+            for move, future in zip(moves[1:], futures):
+                values[move] = future.result()
+        # max gives the first of the moves with the highest value
+        best_move = max(moves, key=lambda move: values[move])
+        return values[best_move], best_move
+
+    def __solve_replies(self, game_state: GameState, encoded: bytes, moves: List[Move], max_depth: Optional[int], values: Dict[Move, float]) -> None:
+        """Search the replies to each move of the leader in the workers, and store the value of each move for the leader in values"""
+        assert self.__executor is not None
+        engine = self.engine
+        futures: Dict["Future[float]", Move] = {}
+        remaining: Dict[Move, int] = {}
+        for move in moves:
+            if move.is_trump_exchange():
+                replies: List[Optional[RegularMove]] = [None]
+            else:
+                replies = [reply.as_regular_move() for reply in engine.move_validator.get_legal_follower_moves(engine, game_state, move)]
+            remaining[move] = len(replies)
+            for reply in replies:
+                futures[self.__executor.submit(_search_in_worker, encoded, None, move, reply, max_depth, False)] = move
+        for future in as_completed(futures):
+            move = futures[future]
+            # the follower chooses the reply which is worst for the leader
+            values[move] = min(values.get(move, float('inf')), future.result())
+            remaining[move] -= 1
+            if remaining[move] == 0:
+                with self.__bound.get_lock():
+                    self.__bound.value = max(self.__bound.value, values[move])
+
+    def close(self) -> None:
+        """Shut down the worker processes, if any. They are started again when needed."""
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+
+# the solver and the shared bound of a worker process of a ParallelAlphaBetaSolver
+_worker_solver: Optional[AlphaBetaSolver] = None
+_worker_bound: Optional["multiprocessing.sharedctypes.Synchronized[float]"] = None
+
+
+def _init_worker(engine: GamePlayEngine, table_size: int, bound: "multiprocessing.sharedctypes.Synchronized[float]") -> None:
+    global _worker_solver, _worker_bound
+    _worker_solver = AlphaBetaSolver(engine, table_size)
+    _worker_bound = bound
+
+
+def _search_in_worker(encoded: bytes, leader_move: Optional[Move], move: Move, reply: Optional[RegularMove], max_depth: Optional[int], share: bool) -> float:
+    """
+    The value of a move at the root, see _move_value, searched above the shared bound. With share, a better value is published as the new bound.
+    """
+    assert _worker_solver is not None and _worker_bound is not None
+    solver = _worker_solver if max_depth is None else AlphaBetaSolver(_worker_solver.engine, _worker_solver.table_size)
+    game_state = solver.engine.state_codec.decode(encoded)
+    value = _move_value(solver, game_state, leader_move, move, reply, _worker_bound.value - _TIE_MARGIN, max_depth)
+    if share:
+        with _worker_bound.get_lock():
+            if value > _worker_bound.value:
+                _worker_bound.value = value
+    return value
+
+
+def _move_value(solver: AlphaBetaSolver, game_state: GameState, leader_move: Optional[Move], move: Move, reply: Optional[RegularMove],
+                alpha: float, max_depth: Optional[int]) -> float:
+    """
+    The value of a move at the root for the player to move, which is exact if it is above alpha, and an upper bound otherwise.
+
+    :param leader_move: the move the leader played, if the follower is to move at the root
+    :param move: the move of the player to move at the root
+    :param reply: if provided, the leader is to move at the root, and this is the reply of the follower to the move
+    """
+    engine = solver.engine
+    if leader_move is None and reply is None:
+        if move.is_trump_exchange():
+            game_state.apply_trick(engine, move)
+            value = solver.search(game_state, None, alpha, float('inf'), max_depth)
+            game_state.undo()
+            return value
+        return -solver.search(game_state, move, float('-inf'), -alpha, max_depth)
+    if leader_move is None:
+        assert reply is not None
+        me = game_state.leader
+        game_state.apply_trick(engine, move, reply)
+    else:
+        me = game_state.follower
+        game_state.apply_trick(engine, leader_move, move.as_regular_move())
+    depth = None if max_depth is None else max_depth - 1
+    if game_state.leader is me:
+        value = solver.search(game_state, None, alpha, float('inf'), depth)
+    else:
+        value = -solver.search(game_state, None, float('-inf'), -alpha, depth)
+    game_state.undo()
+    return value
 
 
 class AlphaBetaBot(Bot):
-    def __init__(self) -> None:
+    """
+    A bot which plays the second phase of the game perfectly, by searching all ways the game can continue with an AlphaBetaSolver.
+    It can only be used in the second phase. In the first phase, the cards in the talon and the hand of the opponent are not known.
+    You can delegate to this bot from your own bot once the second phase starts.
+    """
+
+    def __init__(self, table_size: int = 1_000_000, endgame_cache: Optional[EndgameCache] = None, workers: Optional[int] = None) -> None:
+        """
+        Create a new alpha-beta bot.
+
+        :param table_size: the maximum number of positions the transposition table of the solver keeps between moves
+        :param endgame_cache: if provided, positions are looked up in this cache, and only searched if they are not in it
+        :param workers: if provided, the moves are searched in parallel by this many processes, see ParallelAlphaBetaSolver.
+            The moves played are the same as without workers.
+        """
         super().__init__()
+        self.__table_size = table_size
+        self.__endgame_cache = endgame_cache
+        self.__workers = workers
+        self.__solver: Optional[AlphaBetaSolver] = None
+        self.__parallel_solver: Optional[ParallelAlphaBetaSolver] = None
 
     def get_move(self, state: PlayerPerspective, leader_move: Optional[Move]) -> Move:
-        raise NotImplementedError()
+        _, move = self.__solve(state, leader_move)
+        return move
+
+    def value(self, state: PlayerPerspective, leader_move: Optional[Move]) -> float:
+        """
+        The number of game points this bot wins from the current position in the second phase, or minus the number of points it loses,
+        if both players play perfectly.
+
+        :param state: the state of the game, as seen by this bot
+        :param leader_move: if this bot is the follower, the move the leader played
+        :returns: the value of the position for this bot
+        """
+        value, _ = self.__solve(state, leader_move)
+        return value
+
+    def __solve(self, state: PlayerPerspective, leader_move: Optional[Move]) -> Tuple[float, Move]:
+        assert state.get_phase() == GamePhase.TWO, "The AlphaBetaBot can only be used in the second phase of the game"
+        engine = state.get_engine()
+        game_state = state.get_state_in_phase_two()
+        if self.__endgame_cache is not None and self.__endgame_cache.engine is engine:
+            move_values = self.__endgame_cache.move_values(game_state, leader_move)
+            if move_values is not None:
+                best_move, best_value = max(move_values, key=lambda move_value: move_value[1])
+                return float(best_value), best_move
+        if self.__workers is not None:
+            if self.__parallel_solver is None or self.__parallel_solver.engine is not engine:
+                self.close()
+                self.__parallel_solver = ParallelAlphaBetaSolver(engine, self.__workers, self.__table_size)
+            return self.__parallel_solver.solve(game_state, leader_move)
+        if self.__solver is None or self.__solver.engine is not engine:
+            self.__solver = AlphaBetaSolver(engine, self.__table_size)
+        return self.__solver.solve(game_state, leader_move)
+
+    def close(self) -> None:
+        """Shut down the processes used for the search, if any. They are started again when needed."""
+        if self.__parallel_solver is not None:
+            self.__parallel_solver.close()
+            self.__parallel_solver = None
@@ -0,0 +1,277 @@
+import math
+from concurrent.futures import Future, ProcessPoolExecutor
+from random import Random
+from typing import Dict, List, Optional, Tuple, cast
+
+from schnapsen.deck import Card, CardSet
+from schnapsen.game import Bot, ExchangeTrick, GamePlayEngine, GameState, Move, PlayerPerspective, RegularTrick
+
+
+class _Node:
+    """
+    A node of the search tree. It stands for the information set of the searching bot after a sequence of moves and of the cards it drew,
+    which is the path from the root.
+    The statistics are those of the move leading to this node, from the point of view of the player who made that move.
+    """
+    __slots__ = ("children", "draws", "mine", "visits", "availability", "total")
+
+    def __init__(self, mine: bool) -> None:
+        self.children: Dict[Move, _Node] = {}
+        self.draws: Dict[Optional[Card], _Node] = {}
+        """If the move leading to this node completes a trick with two regular moves, the nodes after the card drawn by the searching bot,
+        or None if it drew no card. Their children are the moves of the next trick."""
+        self.mine = mine
+        """Whether the move leading to this node is made by the searching bot"""
+        self.visits = 0
+        """The number of iterations which played the move leading to this node"""
+        self.availability = 0
+        """The number of iterations in which the move leading to this node was a valid move"""
+        self.total = 0.0
+        """The sum of the rewards of the iterations which played the move leading to this node"""
+
+
+class ISMCTSBot(Bot):
+    """
+    A bot using Information Set Monte Carlo Tree Search. It builds a single search tree over the information sets of this bot,
+    in which every iteration makes a new assumption about the unknown cards and follows the branches which are valid for that assumption.
+    After each trick, the branches are split by the card this bot drew, which it observes, but not by the card the opponent drew.
+    The moves are selected with UCB, in which the number of times a move was available replaces the number of visits of the parent.
+    The game is played randomly from the first new node to the end of the game, and the game points are propagated back.
+
+    After the moves of a trick are played, the subtree for the new information set is kept as the tree for the next move.
+    The rules of the engine are used throughout, so the bot works with any engine supporting GameState.apply_trick.
+    """
+
+    def __init__(self, num_iterations: int, rand: Random, exploration: float = 0.7, workers: Optional[int] = None, reuse_tree: bool = True) -> None:
+        """
+        Create a new ISMCTS bot.
+
+        :param num_iterations: how many iterations to do for every move, including those of the workers
+        :param rand: the source of randomness for this Bot
+        :param exploration: the exploration constant in UCB. The rewards are between 0 and 1.
+        :param workers: if provided, the iterations are divided over this many trees, which are searched in parallel by as many processes
+            (root parallelism), and the visits of the moves are added up. Only the tree of this process is reused for the next move.
+            The moves chosen then only depend on rand, not on the timing of the processes.
+        :param reuse_tree: if False, the search starts from a new tree for every move
+        """
+        assert num_iterations >= 1, f"we cannot work with less than one iteration, got {num_iterations}"
+        assert workers is None or workers >= 1, f"we cannot work with less than one worker, got {workers}"
+        self.__num_iterations = num_iterations
+        self.__rand = rand
+        self.__exploration = exploration
+        self.__workers = workers
+        self.__reuse_tree = reuse_tree
+        self.__executor: Optional[ProcessPoolExecutor] = None
+        self.__root: Optional[_Node] = None
+        # the number of tricks played before the root, and the move of the leader if this bot was the follower at the root
+        self.__root_tricks = 0
+        self.__root_leader_move: Optional[Move] = None
+        self.__root_visits: Dict[Move, int] = {}
+        self.__reused_visits = 0
+
+    def get_move(self, state: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        moves = state.valid_moves()
+        if len(moves) == 1:
+            # there is nothing to decide, but the tree is kept to be reused when it is our turn again
+            return moves[0]
+        engine = state.get_engine()
+        root = self.__reused_root(state, leader_move)
+        self.__reused_visits = sum(child.visits for child in root.children.values())
+
+        trees = self.__workers or 1
+        # the other trees are searched while this process searches its own tree
+        worker_results = self.__search_in_workers(state, leader_move, trees - 1) if trees > 1 else []
+        local_iterations = self.__num_iterations - (trees - 1) * (self.__num_iterations // trees)
+        assumptions = state.make_assumptions(leader_move, self.__rand, local_iterations, lazy=True)
+        for assumption in assumptions:
+            _iterate(engine, root, assumption, leader_move, self.__rand, self.__exploration)
+
+        visits = {move: child.visits for move, child in root.children.items()}
+        for worker_result in worker_results:
+            for move, count in worker_result.result().items():
+                visits[move] = visits.get(move, 0) + count
+
+        self.__root_visits = visits
+        # the most visited move, in a random order to break ties
+        self.__rand.shuffle(moves)
+        best_move = max(moves, key=lambda move: visits.get(move, 0))
+        self.__root, self.__root_leader_move = root, leader_move
+        self.__root_tricks = len(state.get_game_history()) - 1
+        return best_move
+
+    def get_root_visits(self) -> Dict[Move, int]:
+        """
+        For diagnostics. The number of visits of each move at the root in the last search, added up over the trees of the workers.
+        Every iteration visits one move, so together they are get_reused_visits plus num_iterations.
+
+        :returns: The visits by move, or an empty dict if no search has been done yet.
+        """
+        return self.__root_visits
+
+    def get_reused_visits(self) -> int:
+        """
+        For diagnostics. The number of visits of the moves at the root of the last search which were made while searching earlier moves,
+        i.e., which were kept with the subtree of the current information set.
+
+        :returns: The number of reused visits, which is 0 if the tree was not reused.
+        """
+        return self.__reused_visits
+
+    def __reused_root(self, state: PlayerPerspective, leader_move: Optional[Move]) -> _Node:
+        """The node of the tree of the previous move for the current information set, or a new root if there is none"""
+        history = state.get_game_history()
+        tricks = len(history) - 1
+        if not self.__reuse_tree or self.__root is None or tricks < self.__root_tricks:
+            return _Node(mine=False)
+        # the moves played since the old root, each with whether it completes a trick of two regular moves and the card this bot drew after it
+        played: List[Tuple[Move, bool, Optional[Card]]] = []
+        # the elements of the history from the old root to the current perspective, which comes last
+        elements = history[self.__root_tricks:]
+        for index, (perspective, trick) in enumerate(elements):
+            if trick is None:
+                break
+            if trick.is_trump_exchange():
+                played.append((cast(ExchangeTrick, trick).exchange, False, None))
+            else:
+                regular_trick = cast(RegularTrick, trick)
+                drawn = _drawn_card(CardSet(perspective.get_hand()), CardSet(elements[index + 1][0].get_hand()))
+                played.extend(((regular_trick.leader_move, False, None), (regular_trick.follower_move, True, drawn)))
+        if self.__root_leader_move is not None:
+            # the move of the leader in the first of these tricks led to the old root
+            played = played[1:]
+        if leader_move is not None:
+            played.append((leader_move, False, None))
+        node = self.__root
+        for move, completes_trick, drawn in played:
+            child = node.children.get(move)
+            if child is not None and completes_trick:
+                child = child.draws.get(drawn)
+            if child is None:
+                return _Node(mine=False)
+            node = child
+        return node
+
+    def __search_in_workers(self, state: PlayerPerspective, leader_move: Optional[Move], num_trees: int) -> List["Future[Dict[Move, int]]"]:
+        """Start searching num_trees new trees in the worker processes. Their results are the visits of the moves at the roots."""
+        engine = state.get_engine()
+        iterations = self.__num_iterations // (num_trees + 1)
+        if self.__executor is None:
+            # the pool is kept for the next moves, starting processes is expensive
+            self.__executor = ProcessPoolExecutor(max_workers=self.__workers)
+        results = []
+        for _ in range(num_trees):
+            # the assumptions are sent in their compact encoding, rather than pickled with their bots
+            assumptions = [engine.state_codec.encode(assumption) for assumption in state.make_assumptions(leader_move, self.__rand, iterations)]
+            results.append(self.__executor.submit(_search_new_tree, engine, assumptions, leader_move, self.__rand.getrandbits(64), self.__exploration))
+        return results
+
+    def notify_game_end(self, won: bool, state: PlayerPerspective) -> None:
+        self.__root = None
+        self.__root_leader_move = None
+        self.__root_tricks = 0
+
+    def close(self) -> None:
+        """Shut down the processes used for the search, if any. They are started again when needed."""
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+
+def _search_new_tree(engine: GamePlayEngine, assumptions: List[bytes], leader_move: Optional[Move], seed: int, exploration: float) -> Dict[Move, int]:
+    """Do an iteration for each of the assumptions, encoded with the GameStateCodec of the engine, on a new tree, and get the visits of the moves at the root"""
+    root = _Node(mine=False)
+    rand = Random(seed)
+    for assumption in assumptions:
+        _iterate(engine, root, engine.state_codec.decode(assumption), leader_move, rand, exploration)
+    return {move: child.visits for move, child in root.children.items()}
+
+
+def _iterate(engine: GamePlayEngine, root: _Node, game_state: GameState, leader_move: Optional[Move], rand: Random, exploration: float) -> None:
+    """
+    Do one iteration of the search, on the given assumption, which is modified.
+    :param root: the root of the tree, which is the information set of the bot to move
+    :param game_state: the assumption
+    :param leader_move: the move of the leader, if the bot to move is the follower
+    """
+    me = game_state.leader if leader_move is None else game_state.follower
+    node = root
+    path = [root]
+    pending_move = leader_move
+    expanded = False
+    winner = engine.trick_scorer.declare_winner(game_state)
+    while winner is None:
+        if pending_move is None:
+            valid_moves = list(engine.move_validator.get_legal_leader_moves(engine, game_state))
+            mover = game_state.leader
+        else:
+            valid_moves = list(engine.move_validator.get_legal_follower_moves(engine, game_state, pending_move))
+            mover = game_state.follower
+        if expanded:
+            # after the new node, the game is played randomly
+            move = rand.choice(valid_moves)
+        else:
+            move = _select(node, valid_moves, mover is me, rand, exploration)
+            node = node.children[move]
+            path.append(node)
+            expanded = node.visits == 0
+        if pending_move is None and not move.is_trump_exchange():
+            pending_move = move
+            continue
+        if pending_move is None:
+            game_state.apply_trick(engine, move)
+        elif expanded:
+            game_state.apply_trick(engine, pending_move, move.as_regular_move())
+            pending_move = None
+        else:
+            # the next trick is searched in the branch of the card we drew, the card drawn by the opponent stays unknown
+            hand_before = me.hand.card_set()
+            game_state.apply_trick(engine, pending_move, move.as_regular_move())
+            pending_move = None
+            drawn = _drawn_card(hand_before, me.hand.card_set())
+            draw_node = node.draws.get(drawn)
+            if draw_node is None:
+                draw_node = node.draws[drawn] = _Node(mine=False)
+            node = draw_node
+        winner = engine.trick_scorer.declare_winner(game_state)
+
+    winning_bot, points = winner
+    # the game points of the bot, from -3 to 3, scaled to a reward between 0 and 1
+    reward = (3 + (points if winning_bot is me else -points)) / 6
+    root.visits += 1
+    for visited in path[1:]:
+        visited.visits += 1
+        visited.total += reward if visited.mine else 1 - reward
+
+
+def _drawn_card(hand_before: CardSet, hand_after: CardSet) -> Optional[Card]:
+    """The card which was drawn in a trick of two regular moves by the player with these hands before and after the trick, or None if it drew none"""
+    return next(iter(hand_after - hand_before), None)
+
+
+def _select(node: _Node, valid_moves: List[Move], mine: bool, rand: Random, exploration: float) -> Move:
+    """Choose a move which was never tried, or else the one with the highest upper confidence bound. The chosen move gets a child if needed."""
+    untried = []
+    best_move: Optional[Move] = None
+    best_bound = float('-inf')
+    for move in valid_moves:
+        child = node.children.get(move)
+        if child is None:
+            untried.append(move)
+            continue
+        child.availability += 1
+        if child.visits == 0:
+            untried.append(move)
+            continue
+        bound = child.total / child.visits + exploration * math.sqrt(math.log(child.availability) / child.visits)
+        if bound > best_bound:
+            best_bound = bound
+            best_move = move
+    if untried:
+        move = rand.choice(untried)
+        child = node.children.get(move)
+        if child is None:
+            child = node.children[move] = _Node(mine)
+            child.availability = 1
+        return move
+    assert best_move is not None
+    return best_move
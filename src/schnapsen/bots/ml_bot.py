@@ -311,15 +311,15 @@ def get_move_feature_vector(move: Optional[Move]) -> List[int]:
         # in case the move is a marriage move
         if move.is_marriage():
             move_type_one_hot_encoding = [0, 0, 1]
-            card = move.queen_card
+            card = move.as_marriage().queen_card
         #  in case the move is a trump exchange move
         elif move.is_trump_exchange():
             move_type_one_hot_encoding = [0, 1, 0]
-            card = move.jack
+            card = move.as_trump_exchange().jack
         #  in case it is a regular move
         else:
             move_type_one_hot_encoding = [1, 0, 0]
-            card = move.card
+            card = move.as_regular_move().card
         move_type_one_hot_encoding_numpy_array = move_type_one_hot_encoding
         card_rank_one_hot_encoding_numpy_array = get_one_hot_encoding_of_card_rank(card.rank)
         card_suit_one_hot_encoding_numpy_array = get_one_hot_encoding_of_card_suit(card.suit)
@@ -0,0 +1,106 @@
+import time
+from random import Random
+from typing import Dict, Iterator, Optional, Tuple
+
+from schnapsen.bots.alphabeta import AlphaBetaSolver
+from schnapsen.game import Bot, GamePhase, GameState, Move, PlayerPerspective
+
+
+class PIMCBot(Bot):
+    """
+    A Perfect Information Monte Carlo bot. It makes assumptions about the unknown cards, and searches each of the resulting perfect information
+    states with an AlphaBetaSolver, instead of playing random rollouts like the RdeepBot. The values of the moves are then averaged over the
+    assumptions, or each assumption votes for its best moves.
+
+    The solver, and hence its transposition table, is kept for the whole game. Positions which are solved for one assumption are reused for the
+    other assumptions and for the next tricks.
+    """
+
+    def __init__(self, num_samples: int, rand: Random, max_depth: Optional[int] = 3, vote: bool = False,
+                 time_budget: Optional[float] = None, table_size: int = 1_000_000) -> None:
+        """
+        Create a new PIMC bot.
+
+        :param num_samples: how many assumptions to make. If there are fewer distinct assumptions, all of them are searched.
+            With a time budget, this is the maximum.
+        :param rand: the source of randomness for this Bot
+        :param max_depth: the number of tricks searched in the first phase, beyond which positions are valued by the difference of the direct points.
+            If None, the first phase is searched to the end of the game, which takes seconds early in the game. The second phase is always searched to the end.
+        :param vote: if True, each assumption votes for the moves with the highest value for it, instead of averaging the values of the moves.
+        :param time_budget: if provided, the number of seconds to spend on a move. Assumptions are searched until the time is used or
+            num_samples assumptions are searched. At least one assumption is searched.
+        :param table_size: the maximum number of positions in the transposition table of the solver
+        """
+        assert num_samples >= 1, f"we cannot work with less than one sample, got {num_samples}"
+        assert max_depth is None or max_depth >= 1, f"it does not make sense to use a depth <1. got {max_depth}"
+        self.__num_samples = num_samples
+        self.__rand = rand
+        self.__max_depth = max_depth
+        self.__vote = vote
+        self.__time_budget = time_budget
+        self.__table_size = table_size
+        self.__solver: Optional[AlphaBetaSolver] = None
+        self.__move_scores: Dict[Move, float] = {}
+
+    def get_move(self, state: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        start = time.perf_counter()
+        moves = state.valid_moves()
+        if len(moves) == 1:
+            # there is nothing to decide
+            return moves[0]
+        # shuffle the moves, such that we get a random move of the best ones if there are several
+        self.__rand.shuffle(moves)
+        engine = state.get_engine()
+        if self.__solver is None or self.__solver.engine is not engine:
+            self.__solver = AlphaBetaSolver(engine, self.__table_size)
+
+        scores: Dict[Move, float] = {move: 0.0 for move in moves}
+        # the weights of the assumptions which were searched, which add up to less than one if the time budget runs out
+        searched_weight = 0.0
+        for assumption, weight in self.__assumptions(state, leader_move):
+            max_depth = None if assumption.game_phase() == GamePhase.TWO else self.__max_depth
+            move_values = self.__solver.move_values(assumption, leader_move, max_depth)
+            if self.__vote:
+                best_value = max(value for _, value in move_values)
+                best_moves = [move for move, value in move_values if value == best_value]
+                for move in best_moves:
+                    scores[move] += weight / len(best_moves)
+            else:
+                for move, value in move_values:
+                    scores[move] += weight * value
+            searched_weight += weight
+            if self.__time_budget is not None and time.perf_counter() - start >= self.__time_budget:
+                break
+
+        self.__move_scores = {move: score / searched_weight for move, score in scores.items()}
+        best_score = float('-inf')
+        best_move = moves[0]
+        for move in moves:
+            if self.__move_scores[move] > best_score:
+                best_score = self.__move_scores[move]
+                best_move = move
+        return best_move
+
+    def get_move_scores(self) -> Dict[Move, float]:
+        """
+        For diagnostics. The score of each move in the last decision which was searched: the value of the move averaged over the
+        searched assumptions, or with vote, the share of the searched assumptions voting for it.
+
+        :returns: The scores by move, or an empty dict if no decision has been searched yet.
+        """
+        return self.__move_scores
+
+    def __assumptions(self, state: PlayerPerspective, leader_move: Optional[Move]) -> Iterator[Tuple[GameState, float]]:
+        """The assumptions to search, each with its weight"""
+        if state.get_phase() == GamePhase.TWO:
+            # all cards are known
+            yield state.get_state_in_phase_two(), 1.0
+        elif state.count_assumptions(leader_move) <= self.__num_samples:
+            yield from state.enumerate_assumptions(leader_move)
+        else:
+            for assumption in state.make_assumptions(leader_move, self.__rand, self.__num_samples, lazy=True):
+                yield assumption, 1.0 / self.__num_samples
+
+    def notify_game_end(self, won: bool, state: PlayerPerspective) -> None:
+        # the positions of this game will not occur in the next one
+        self.__solver = None
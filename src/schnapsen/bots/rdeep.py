@@ -1,79 +1,286 @@
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+import math
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
 from schnapsen.game import Bot, PlayerPerspective, Move, GameState, GamePlayEngine
 from random import Random
 
 
 class RdeepBot(Bot):
-    def __init__(self, num_samples: int, depth: int, rand: Random) -> None:
+    def __init__(self, num_samples: int, depth: int, rand: Random, workers: Optional[int] = None,
+                 time_budget: Optional[float] = None, game_time_budget: Optional[float] = None, common_random_numbers: bool = False,
+                 rollout_budget: Optional[int] = None, enumeration_threshold: Optional[int] = None) -> None:
         """
         Create a new rdeep bot.
 
-        :param num_samples: how many samples to take per move
+        :param num_samples: how many samples to take per move. With a time budget, this is the maximum.
         :param depth: how deep to sample
         :param rand: the source of randomness for this Bot
+        :param workers: if provided, every rollout gets its own seed drawn from rand, and the rollouts are played by this many processes.
+            The moves chosen then only depend on rand, not on the number of workers. With 1 worker, the rollouts are played in this process.
+            If not provided, the rollouts use rand directly, and are played in this process.
+        :param time_budget: if provided, the number of seconds to spend on a move. Samples are then taken in rounds, one for each move
+            (or one per worker for each move), until the time is used or num_samples samples are taken. At least one round is done.
+        :param game_time_budget: if provided, the number of seconds to spend on a game. The remaining time is spread evenly over the moves
+            which still have to be made. Can be combined with time_budget, then the smallest budget is used for a move.
+        :param common_random_numbers: if True, all moves are evaluated on the same assumptions, with the same rollout seeds drawn from rand.
+            The differences between the moves are then not hidden by the differences between the samples, so fewer samples are needed.
+            The paired differences of the last decision are available from get_paired_differences.
+        :param rollout_budget: if provided, the total number of rollouts for a move, which are allocated with successive halving instead of taking
+            num_samples samples for each move. In each of the log2(number of moves) rounds, the remaining moves get an equal share of the budget
+            of that round, after which the worse half of them is dropped. Cannot be combined with a time budget.
+        :param enumeration_threshold: if provided, and there are at most this many distinct assumptions about the unknown cards,
+            the moves are evaluated on all of them instead of on random samples, which would mostly be duplicates.
+            Every distinct assumption gets an equal share of the num_samples rollouts of a move (at least one), or of the rollout_budget
+            if provided, and the scores of the assumptions are weighted with their probability. With a time budget, the rollouts stop
+            when the time is used, after at least one rollout for each assumption and move.
         """
         assert num_samples >= 1, f"we cannot work with less than one sample, got {num_samples}"
         assert depth >= 1, f"it does not make sense to use a dept <1. got {depth}"
+        assert workers is None or workers >= 1, f"we cannot work with less than one worker, got {workers}"
+        assert rollout_budget is None or rollout_budget >= 1, f"we cannot work with less than one rollout, got {rollout_budget}"
+        assert rollout_budget is None or (time_budget is None and game_time_budget is None), "a rollout budget cannot be combined with a time budget"
         self.__num_samples = num_samples
         self.__depth = depth
         self.__rand = rand
+        self.__workers = workers
+        self.__executor: Optional[ProcessPoolExecutor] = None
+        self.__time_budget = time_budget
+        self.__game_time_budget = game_time_budget
+        self.__game_time_used = 0.0
+        self.__common_random_numbers = common_random_numbers
+        self.__paired_differences: Dict[Move, List[float]] = {}
+        self.__rollout_budget = rollout_budget
+        self.__enumeration_threshold = enumeration_threshold
 
     def get_move(self, state: PlayerPerspective, leader_move: Optional[Move]) -> Move:
         # get the list of valid moves, and shuffle it such
         # that we get a random move of the highest scoring
         # ones if there are multiple highest scoring moves.
         moves = state.valid_moves()
+        timed = self.__time_budget is not None or self.__game_time_budget is not None
+        if (timed or self.__rollout_budget is not None or self.__enumeration_threshold is not None) and len(moves) == 1:
+            # there is nothing to decide
+            return moves[0]
         self.__rand.shuffle(moves)
 
+        # The assumptions are made lazily, such that they use the random numbers in the same order as when they would be made one by one
+        if self.__rollout_budget is not None:
+            # the budget might be exceeded a bit because every remaining move gets at least one sample in each round
+            num_assumptions = self.__rollout_budget + len(moves) * _halving_rounds(len(moves))
+        else:
+            num_assumptions = self.__num_samples if self.__common_random_numbers else self.__num_samples * len(moves)
+        assumptions = state.make_assumptions(leader_move=leader_move, rand=self.__rand, n=num_assumptions, lazy=True)
+        candidates = list(range(len(moves)))
+        if self.__enumeration_threshold is not None and state.count_assumptions(leader_move) <= self.__enumeration_threshold:
+            scores_of_moves = self.__enumerate(state, leader_move, moves)
+        elif self.__rollout_budget is not None:
+            scores_of_moves, candidates = self.__successive_halving(state, leader_move, moves, assumptions, self.__rollout_budget)
+        elif timed:
+            scores_of_moves = self.__sample_within_budget(state, leader_move, moves, assumptions)
+        else:
+            scores_of_moves = self.__sample(state, leader_move, moves, assumptions, self.__num_samples)
+
         best_score = float('-inf')
-        best_move = None
-        for move in moves:
-            sum_of_scores = 0.0
-            for _ in range(self.__num_samples):
-                gamestate = state.make_assumption(leader_move=leader_move, rand=self.__rand)
-                score = self.__evaluate(gamestate, state.get_engine(), leader_move, move)
-                sum_of_scores += score
-            average_score = sum_of_scores / self.__num_samples
+        best_index = -1
+        for index in candidates:
+            average_score = sum(scores_of_moves[index]) / len(scores_of_moves[index])
             if average_score > best_score:
                 best_score = average_score
-                best_move = move
-        assert best_move is not None
-        return best_move
+                best_index = index
+        assert best_index >= 0
+        if self.__common_random_numbers:
+            # moves dropped by successive halving only share the samples of the rounds they were part of
+            best_scores = scores_of_moves[best_index]
+            self.__paired_differences = {move: [best - score for best, score in zip(best_scores, scores)] for move, scores in zip(moves, scores_of_moves)}
+        return moves[best_index]
+
+    def __sample_within_budget(self, state: PlayerPerspective, leader_move: Optional[Move], moves: List[Move],
+                               assumptions: Iterator[GameState]) -> List[List[float]]:
+        """Take samples in rounds until the time budget of the move is used. Returns the scores of the samples of each move."""
+        start = time.perf_counter()
+        budget = self.__move_budget(state, moves)
+        scores_of_moves: List[List[float]] = [[] for _ in moves]
+        samples_taken = 0
+        while samples_taken < self.__num_samples:
+            samples_per_move = min(self.__workers or 1, self.__num_samples - samples_taken)
+            for scores, new_scores in zip(scores_of_moves, self.__sample(state, leader_move, moves, assumptions, samples_per_move)):
+                scores.extend(new_scores)
+            samples_taken += samples_per_move
+            if time.perf_counter() - start >= budget:
+                break
+        self.__game_time_used += time.perf_counter() - start
+        return scores_of_moves
+
+    def __successive_halving(self, state: PlayerPerspective, leader_move: Optional[Move], moves: List[Move],
+                             assumptions: Iterator[GameState], rollout_budget: int) -> Tuple[List[List[float]], List[int]]:
+        """
+        Allocate the rollouts with successive halving.
+        Returns the scores of the samples of each move and the indices of the moves which remained until the end.
+        """
+        scores_of_moves: List[List[float]] = [[] for _ in moves]
+        candidates = list(range(len(moves)))
+        rounds = _halving_rounds(len(moves))
+        for _ in range(rounds):
+            samples_per_move = max(1, rollout_budget // (len(candidates) * rounds))
+            new_scores = self.__sample(state, leader_move, [moves[index] for index in candidates], assumptions, samples_per_move)
+            for index, scores in zip(candidates, new_scores):
+                scores_of_moves[index].extend(scores)
+            # the sort is stable, so equally good moves stay in their random order
+            candidates.sort(key=lambda index: -sum(scores_of_moves[index]) / len(scores_of_moves[index]))
+            candidates = candidates[:(len(candidates) + 1) // 2]
+        return scores_of_moves, candidates
 
-    def __evaluate(self, gamestate: GameState, engine: GamePlayEngine, leader_move: Optional[Move], my_move: Move) -> float:
+    def __enumerate(self, state: PlayerPerspective, leader_move: Optional[Move], moves: List[Move]) -> List[List[float]]:
         """
-        Evaluates the value of the given state for the given player
-        :param state: The state to evaluate
-        :param player: The player for whom to evaluate this state (1 or 2)
-        :return: A float representing the value of this state for the given player. The higher the value, the better the
-                state is for the player.
+        Evaluate the moves on all distinct assumptions, such that the rollouts of an assumption are only played once
+        instead of for every random sample which happens to make the same assumption. Returns the expected score of each move.
+        The rollouts are played in rounds, with one rollout for each assumption and move, so every assumption keeps its weight when a
+        time budget ends the search early.
         """
-        me: Bot
-        leader_bot: Bot
-        follower_bot: Bot
-
-        if leader_move:
-            # we know what the other bot played
-            leader_bot = FirstFixedMoveThenBaseBot(RandBot(rand=self.__rand), leader_move)
-            # I am the follower
-            me = follower_bot = FirstFixedMoveThenBaseBot(RandBot(rand=self.__rand), my_move)
+        start = time.perf_counter()
+        budget = self.__move_budget(state, moves)
+        assumptions = [(_without_history(assumption), probability) for assumption, probability in state.enumerate_assumptions(leader_move)]
+        if self.__rollout_budget is not None:
+            rollouts_per_assumption = max(1, self.__rollout_budget // (len(moves) * len(assumptions)))
         else:
-            # I am the leader bot
-            me = leader_bot = FirstFixedMoveThenBaseBot(RandBot(rand=self.__rand), my_move)
-            # We assume the other bot just random
-            follower_bot = RandBot(self.__rand)
+            rollouts_per_assumption = -(-self.__num_samples // len(assumptions))
+        num_rollouts = len(assumptions) * rollouts_per_assumption
+        if self.__common_random_numbers:
+            shared_seeds = [self.__rand.getrandbits(64) for _ in range(num_rollouts)]
+            seeds = [shared_seeds for _ in moves]
+        else:
+            seeds = [[self.__rand.getrandbits(64) for _ in range(num_rollouts)] for _ in moves]
+        # the sum of the scores of the rollouts of each move on each assumption
+        totals = [[0.0] * len(assumptions) for _ in moves]
+        rounds = 0
+        while rounds < rollouts_per_assumption:
+            rollouts = [(assumption, move, move_seeds[index * rollouts_per_assumption + rounds])
+                        for move, move_seeds in zip(moves, seeds)
+                        for index, (assumption, _) in enumerate(assumptions)]
+            scores = iter(self.__play_rollouts(state.get_engine(), leader_move, rollouts))
+            for move_totals in totals:
+                for index in range(len(assumptions)):
+                    move_totals[index] += next(scores)
+            rounds += 1
+            if time.perf_counter() - start >= budget:
+                break
+        self.__game_time_used += time.perf_counter() - start
+        return [[sum(probability * total / rounds for (_, probability), total in zip(assumptions, move_totals))] for move_totals in totals]
+
+    def get_paired_differences(self) -> Dict[Move, List[float]]:
+        """
+        For diagnostics when using common random numbers. For each move considered in the last decision,
+        the differences between the score of the chosen move and the score of that move, for each of the samples.
 
-        new_game_state, _ = engine.play_at_most_n_tricks(game_state=gamestate, new_leader=leader_bot, new_follower=follower_bot, n=self.__depth)
+        :returns: The paired differences, or an empty dict if common random numbers are not used or no decision has been made yet.
+        """
+        return self.__paired_differences
+
+    def __move_budget(self, state: PlayerPerspective, moves: List[Move]) -> float:
+        """The number of seconds to spend on the current move"""
+        budget = float('inf') if self.__time_budget is None else self.__time_budget
+        hand_size = len(state.get_hand())
+        if self.__game_time_budget is not None:
+            remaining = max(0.0, self.__game_time_budget - self.__game_time_used)
+            # we still play the cards in our hand, and the ones we draw from the talon
+            moves_left = hand_size + state.get_talon_size() // 2
+            budget = min(budget, remaining / max(1, moves_left))
+        # positions with few choices, like having to follow suit in phase two, get less time
+        return budget * min(1.0, len(moves) / max(1, hand_size))
 
-        if new_game_state.leader.implementation is me:
-            my_score = new_game_state.leader.score.direct_points
-            opponent_score = new_game_state.follower.score.direct_points
+    def __sample(self, state: PlayerPerspective, leader_move: Optional[Move], moves: List[Move],
+                 assumptions: Iterator[GameState], samples_per_move: int) -> List[List[float]]:
+        """Take samples_per_move samples for each of the moves, using the next assumptions. Returns the scores of the samples of each move."""
+        engine = state.get_engine()
+        if self.__common_random_numbers:
+            samples = [(_without_history(next(assumptions)), self.__rand.getrandbits(64)) for _ in range(samples_per_move)]
+            rollouts = [(gamestate, move, seed) for move in moves for gamestate, seed in samples]
+        elif self.__workers is None:
+            return [[_rollout(engine, next(assumptions), leader_move, move, self.__depth, self.__rand) for _ in range(samples_per_move)]
+                    for move in moves]
         else:
-            my_score = new_game_state.follower.score.direct_points
-            opponent_score = new_game_state.leader.score.direct_points
+            rollouts = [(_without_history(next(assumptions)), move, self.__rand.getrandbits(64)) for move in moves for _ in range(samples_per_move)]
+        scores = self.__play_rollouts(engine, leader_move, rollouts)
+        return [scores[index * samples_per_move:(index + 1) * samples_per_move] for index in range(len(moves))]
+
+    def notify_game_end(self, won: bool, state: PlayerPerspective) -> None:
+        # the time budget of the game starts again for the next game
+        self.__game_time_used = 0.0
+
+    def __play_rollouts(self, engine: GamePlayEngine, leader_move: Optional[Move], rollouts: List[Tuple[GameState, Move, int]]) -> List[float]:
+        """Play the rollouts, each given by the state, my move and the seed of the rollout, and get their scores in the same order."""
+        if self.__workers is None or self.__workers == 1:
+            return _seeded_rollouts(engine, self.__depth, leader_move, rollouts)
+        if self.__executor is None:
+            # the pool is kept for the next moves, starting processes is expensive
+            self.__executor = ProcessPoolExecutor(max_workers=self.__workers)
+        chunksize = -(-len(rollouts) // self.__workers)
+        chunks = [rollouts[start:start + chunksize] for start in range(0, len(rollouts), chunksize)]
+        scores: List[float] = []
+        for chunk_scores in self.__executor.map(_seeded_rollouts, *zip(*[(engine, self.__depth, leader_move, chunk) for chunk in chunks])):
+            scores.extend(chunk_scores)
+        return scores
+
+    def close(self) -> None:
+        """Shut down the processes used for the rollouts, if any. They are started again when needed."""
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+
+def _halving_rounds(num_moves: int) -> int:
+    """The number of rounds of successive halving needed to go from num_moves moves to a single one"""
+    return max(1, math.ceil(math.log2(num_moves)))
+
+
+def _without_history(gamestate: GameState) -> GameState:
+    """The state without the previous states. These are not needed for a rollout, and contain the real bots, which might not be picklable."""
+    return GameState(leader=gamestate.leader, follower=gamestate.follower, talon=gamestate.talon, previous=None)
+
+
+def _seeded_rollouts(engine: GamePlayEngine, depth: int, leader_move: Optional[Move], rollouts: List[Tuple[GameState, Move, int]]) -> List[float]:
+    """Play the rollouts, each given by the state, my move and the seed of the rollout, and get their scores in the same order."""
+    return [_rollout(engine, gamestate, leader_move, my_move, depth, Random(seed)) for gamestate, my_move, seed in rollouts]
+
+
+def _rollout(engine: GamePlayEngine, gamestate: GameState, leader_move: Optional[Move], my_move: Move, depth: int, rand: Random) -> float:
+    """
+    Evaluates the value of playing my_move in the given state, by playing random moves for at most depth tricks.
+    :param gamestate: The state to evaluate
+    :param leader_move: The move of the leader, if I am the follower
+    :param my_move: The move I play first
+    :param depth: The number of tricks to play
+    :param rand: The source of randomness for the random moves
+    :return: A float representing the value of this state for the given player. The higher the value, the better the
+            state is for the player.
+    """
+    me: Bot
+    leader_bot: Bot
+    follower_bot: Bot
+
+    if leader_move:
+        # we know what the other bot played
+        leader_bot = FirstFixedMoveThenBaseBot(RandBot(rand=rand), leader_move)
+        # I am the follower
+        me = follower_bot = FirstFixedMoveThenBaseBot(RandBot(rand=rand), my_move)
+    else:
+        # I am the leader bot
+        me = leader_bot = FirstFixedMoveThenBaseBot(RandBot(rand=rand), my_move)
+        # We assume the other bot just random
+        follower_bot = RandBot(rand)
+
+    new_game_state, _ = engine.play_at_most_n_tricks(game_state=gamestate, new_leader=leader_bot, new_follower=follower_bot, n=depth)
+
+    if new_game_state.leader.implementation is me:
+        my_score = new_game_state.leader.score.direct_points
+        opponent_score = new_game_state.follower.score.direct_points
+    else:
+        my_score = new_game_state.follower.score.direct_points
+        opponent_score = new_game_state.leader.score.direct_points
 
-        heuristic = my_score / (my_score + opponent_score)
-        return heuristic
+    heuristic = my_score / (my_score + opponent_score)
+    return heuristic
 
 
 class RandBot(Bot):
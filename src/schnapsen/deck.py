@@ -96,6 +96,9 @@ class Card(Enum):
         self.rank = rank
         self.suit = suit
         self.character = character
+        # The bit of this card in a CardSet, and the position of the card in Card. They get assigned once all cards are created, see _CardCache
+        self.bit = 0
+        self.index = 0
 
     @staticmethod
     def _get_card(rank: Rank, suit: Suit) -> 'Card':
@@ -115,6 +118,16 @@ class Card(Enum):
 
 class _CardCache:
     _CARD_CACHE = {(card_rank, card_suit): Card._get_card(card_rank, card_suit) for (card_rank, card_suit) in itertools.product(Rank, Suit)}
+    _CARDS_BY_INDEX: list[Card] = list(Card)
+    _SUIT_MASKS: dict[Suit, int] = {suit: 0 for suit in Suit}
+    _RANK_MASKS: dict[Rank, int] = {rank: 0 for rank in Rank}
+
+
+for _index, _card in enumerate(_CardCache._CARDS_BY_INDEX):
+    _card.bit = 1 << _index
+    _card.index = _index
+    _CardCache._SUIT_MASKS[_card.suit] |= _card.bit
+    _CardCache._RANK_MASKS[_card.rank] |= _card.bit
 
 
 class CardCollection(ABC):
@@ -191,3 +204,99 @@ class OrderedCardCollection(CardCollection):
 
     def __repr__(self) -> str:
         return f"OrderedCardCollection(cards={self._cards})"
+
+
+class CardSet(CardCollection):
+    """
+    An immutable set of cards, stored as an integer bitmask over all cards in `Card`.
+    Membership tests, set operations and taking the size are constant time operations on this integer.
+    The cards are always iterated in the order in which they are defined in `Card`.
+    """
+
+    def __init__(self, cards: Iterable[Card] = ()) -> None:
+        """
+        Create a CardSet containing the cards. Duplicates are only contained once.
+
+        :param cards: The cards to be put in this set.
+        """
+        mask = 0
+        for card in cards:
+            mask |= card.bit
+        self._mask = mask
+
+    @staticmethod
+    def from_mask(mask: int) -> 'CardSet':
+        """Create a CardSet from its bitmask representation, as returned by `mask`."""
+        card_set = CardSet.__new__(CardSet)
+        card_set._mask = mask
+        return card_set
+
+    @property
+    def mask(self) -> int:
+        """The bitmask of this set. The card at position i in `Card` is in this set if bit i is set."""
+        return self._mask
+
+    @staticmethod
+    def suit_mask(suit: Suit) -> int:
+        """The bitmask with all cards of the given suit"""
+        return _CardCache._SUIT_MASKS[suit]
+
+    @staticmethod
+    def rank_mask(rank: Rank) -> int:
+        """The bitmask with all cards of the given rank"""
+        return _CardCache._RANK_MASKS[rank]
+
+    def get_cards(self) -> list[Card]:
+        return list(self)
+
+    def is_empty(self) -> bool:
+        return self._mask == 0
+
+    def filter_suit(self, suit: Suit) -> 'CardSet':
+        """Returns a CardSet with in it all cards which have the provided suit"""
+        return CardSet.from_mask(self._mask & _CardCache._SUIT_MASKS[suit])
+
+    def filter_rank(self, rank: Rank) -> 'CardSet':
+        """Returns a CardSet with in it all cards which have the provided rank"""
+        return CardSet.from_mask(self._mask & _CardCache._RANK_MASKS[rank])
+
+    def issubset(self, other: 'CardSet') -> bool:
+        """Are all cards of this set also in the other set?"""
+        return self._mask & ~other._mask == 0
+
+    def __len__(self) -> int:
+        return bin(self._mask).count("1")
+
+    def __iter__(self) -> Iterator[Card]:
+        mask = self._mask
+        while mask:
+            lowest = mask & -mask
+            yield _CardCache._CARDS_BY_INDEX[lowest.bit_length() - 1]
+            mask ^= lowest
+
+    def __contains__(self, item: Any) -> bool:
+        assert isinstance(item, Card), "Only cards can be contained in a card collection"
+        return self._mask & item.bit != 0
+
+    def __or__(self, other: 'CardSet') -> 'CardSet':
+        return CardSet.from_mask(self._mask | other._mask)
+
+    def __and__(self, other: 'CardSet') -> 'CardSet':
+        return CardSet.from_mask(self._mask & other._mask)
+
+    def __sub__(self, other: 'CardSet') -> 'CardSet':
+        return CardSet.from_mask(self._mask & ~other._mask)
+
+    def __xor__(self, other: 'CardSet') -> 'CardSet':
+        return CardSet.from_mask(self._mask ^ other._mask)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CardSet):
+            return NotImplemented
+        return self._mask == other._mask
+
+    def __hash__(self) -> int:
+        return hash(self._mask)
+
+    def __repr__(self) -> str:
+        return f"CardSet(cards={self.get_cards()})"
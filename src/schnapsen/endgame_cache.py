@@ -0,0 +1,247 @@
+"""
+A cache of solved positions of the second phase of the game. In the second phase all cards are known, so each position has a value which can be
+computed once and stored. The cache is sampled: it contains the positions which can be reached from a collection of starting positions, for
+example the second phase of a number of random games, and not all positions of the second phase, which are far too many when the scores are
+included. Lookups of other positions miss, and the caller has to search them.
+The cache is written to a file, which bots read through a memory-mapped EndgameCache, such that the file is loaded only once by the operating
+system, even if many processes use it.
+"""
+import mmap
+import struct
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .deck import Card
+from .game import GamePhase, GamePlayEngine, GameState, Move, SuitRelabeling
+
+_MAGIC = b"SCHNEC01"
+# the magic bytes, the number of cards in the deck, and the number of positions
+_HEADER = struct.Struct("<8sQQ")
+# the number of bits for each of the points in the key
+_POINT_BITS = 7
+
+
+class EndgameCacheEncoder:
+    """
+    Computes the keys of phase two positions, packed in 64 bits. Positions which only differ by a permutation of the non-trump suits get the same key,
+    since the rules treat these suits the same. The positions are first brought in canonical form with SuitRelabeling.canonical_for_state,
+    ignoring the won cards, which do not matter for the rest of the game.
+
+    In the key, the two hands take 32 bits, as a base-3 number with a digit for each card saying whether it is in the hand of the leader,
+    the follower, or neither. The direct and pending points of both players take 7 bits each. Hence, decks of at most 20 cards are supported.
+    """
+
+    def __init__(self, engine: GamePlayEngine) -> None:
+        cards = engine.action_space.cards
+        suits = list(dict.fromkeys(card.suit for card in cards))
+        ranks = [card.rank for card in cards if card.suit is suits[0]]
+        assert len(cards) <= 20, f"The keys only have room for decks of at most 20 cards, got {len(cards)}"
+        assert len(suits) == 4 and all(sorted(card.rank.value for card in cards if card.suit is suit) == sorted(rank.value for rank in ranks)
+                                       for suit in suits), \
+            "All suits must have the same ranks to treat the non-trump suits as interchangeable"
+        self.engine = engine
+        self.num_cards = len(cards)
+        # the base-3 digit of each card
+        self.__digits: Dict[Card, int] = {card: 3 ** index for index, card in enumerate(cards)}
+
+    def key(self, game_state: GameState) -> int:
+        """
+        The key of a position in the second phase, at the start of a trick.
+
+        :param game_state: the position
+        :returns: the key, which is the same for positions which only differ by a permutation of the non-trump suits
+        """
+        relabeling = SuitRelabeling.canonical_for_state(game_state, include_won_cards=False)
+        leader, follower = game_state.leader, game_state.follower
+        digits = self.__digits
+        key = sum(digits[relabeling.card(card)] for card in leader.hand.cards) + 2 * sum(digits[relabeling.card(card)] for card in follower.hand.cards)
+        shift = 32
+        for points in (leader.score.direct_points, leader.score.pending_points, follower.score.direct_points, follower.score.pending_points):
+            assert 0 <= points < 1 << _POINT_BITS, f"The points {points} do not fit in the key"
+            key |= points << shift
+            shift += _POINT_BITS
+        return key
+
+
+def solve_positions(engine: GamePlayEngine, roots: Iterable[GameState]) -> Dict[int, int]:
+    """
+    Solve all phase two positions which can be reached from the roots. These are the sampled positions stored in the cache.
+
+    :param engine: the engine with the rules of the game
+    :param roots: positions in the second phase, at the start of a trick. They are modified during the search, but restored afterwards.
+    :returns: for the key of each position which is not the end of the game, the number of game points the leader wins, or minus the points it loses.
+    """
+    encoder = EndgameCacheEncoder(engine)
+    values: Dict[int, int] = {}
+
+    def value(game_state: GameState) -> int:
+        winner = engine.trick_scorer.declare_winner(game_state)
+        if winner is not None:
+            winning_bot, points = winner
+            return points if winning_bot is game_state.leader else -points
+        key = encoder.key(game_state)
+        known = values.get(key)
+        if known is not None:
+            return known
+        leader = game_state.leader
+        best = -4
+        for leader_move in engine.move_validator.get_legal_leader_moves(engine, game_state):
+            # the follower picks the reply which is worst for the leader
+            worst = 4
+            for follower_move in engine.move_validator.get_legal_follower_moves(engine, game_state, leader_move):
+                game_state.apply_trick(engine, leader_move, follower_move.as_regular_move())
+                child_value = value(game_state) if game_state.leader is leader else -value(game_state)
+                game_state.undo()
+                worst = min(worst, child_value)
+            best = max(best, worst)
+        values[key] = best
+        return best
+
+    for root in roots:
+        assert root.game_phase() == GamePhase.TWO, "The cache only contains positions of the second phase"
+        value(root)
+    return values
+
+
+def write_endgame_cache(path: str, engine: GamePlayEngine, values: Dict[int, int]) -> None:
+    """
+    Write solved positions to a file, which can be read with an EndgameCache.
+    The file consists of a header, the keys in increasing order as unsigned 64 bit integers, and the values as signed bytes, all little-endian.
+
+    :param path: the file to write
+    :param engine: the engine with the rules the positions were solved for
+    :param values: the values of the positions, by key, as returned by solve_positions
+    """
+    keys = np.array(sorted(values), dtype='<u8')
+    table_values = np.array([values[int(key)] for key in keys], dtype=np.int8)
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(_MAGIC, EndgameCacheEncoder(engine).num_cards, len(keys)))
+        file.write(keys.tobytes())
+        file.write(table_values.tobytes())
+
+
+def build_endgame_cache(path: str, engine: GamePlayEngine, roots: Iterable[GameState]) -> int:
+    """
+    Solve all phase two positions which can be reached from the roots, and write them to a file, which can be read with an EndgameCache.
+    Positions which cannot be reached from the roots are not in the file.
+
+    :param path: the file to write
+    :param engine: the engine with the rules of the game
+    :param roots: positions in the second phase, at the start of a trick
+    :returns: the number of positions written
+    """
+    values = solve_positions(engine, roots)
+    write_endgame_cache(path, engine, values)
+    return len(values)
+
+
+class EndgameCache:
+    """
+    Reads the values of phase two positions from a file written by build_endgame_cache. The file is memory-mapped, so it is not read into memory
+    by every process using it. A position is found with a binary search over the keys.
+    Only the positions reachable from the roots the cache was built from are in it, so lookups can miss; value, move_values and best_move
+    then return None.
+    An EndgameCache can be pickled, for example to give it to worker processes. These then map the same file again.
+    """
+
+    def __init__(self, path: str, engine: GamePlayEngine) -> None:
+        """
+        Open an endgame cache.
+
+        :param path: the file written by build_endgame_cache
+        :param engine: the engine with the rules of the game, this must be the one the cache was built for
+        """
+        self.path = path
+        self.engine = engine
+        self.__encoder = EndgameCacheEncoder(engine)
+        with open(path, "rb") as file:
+            self.__map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, num_cards, size = _HEADER.unpack_from(self.__map)
+        if magic != _MAGIC:
+            raise ValueError(f"The file {path} is not an endgame cache")
+        if num_cards != self.__encoder.num_cards:
+            raise ValueError(f"The endgame cache in {path} is for a deck of {num_cards} cards, while the engine uses {self.__encoder.num_cards} cards")
+        self.__keys = np.frombuffer(self.__map, dtype='<u8', count=size, offset=_HEADER.size)
+        self.__values = np.frombuffer(self.__map, dtype=np.int8, count=size, offset=_HEADER.size + 8 * size)
+
+    def __len__(self) -> int:
+        return len(self.__keys)
+
+    def value(self, game_state: GameState) -> Optional[int]:
+        """
+        The value of a position in the second phase, at the start of a trick.
+
+        :param game_state: the position
+        :returns: the number of game points the leader wins, or minus the points it loses, or None if the position is not in the cache.
+        """
+        winner = self.engine.trick_scorer.declare_winner(game_state)
+        if winner is not None:
+            winning_bot, points = winner
+            return points if winning_bot is game_state.leader else -points
+        key = np.uint64(self.__encoder.key(game_state))
+        index = int(np.searchsorted(self.__keys, key))
+        if index == len(self.__keys) or self.__keys[index] != key:
+            return None
+        return int(self.__values[index])
+
+    def move_values(self, game_state: GameState, leader_move: Optional[Move] = None) -> Optional[List[Tuple[Move, int]]]:
+        """
+        The values of the moves of the player to move, by looking up the positions after the moves.
+        The game_state is modified during the lookup, but restored afterwards.
+
+        :param game_state: a position in the second phase
+        :param leader_move: if provided, the move the leader already played in the current trick, and the follower is the player to move.
+        :returns: the valid moves, each with the number of game points the player to move wins, or minus the points it loses, when playing it.
+            None if a position after one of the moves is not in the cache.
+        """
+        engine = self.engine
+        if leader_move is None:
+            result: List[Tuple[Move, int]] = []
+            for move in engine.move_validator.get_legal_leader_moves(engine, game_state):
+                # the leader's value of the move is minus the value of the best reply of the follower
+                replies = self.move_values(game_state, move)
+                if replies is None:
+                    return None
+                result.append((move, -max(value for _, value in replies)))
+            return result
+        result = []
+        me = game_state.follower
+        for move in engine.move_validator.get_legal_follower_moves(engine, game_state, leader_move):
+            game_state.apply_trick(engine, leader_move, move.as_regular_move())
+            value = self.value(game_state)
+            if value is not None and game_state.leader is not me:
+                value = -value
+            game_state.undo()
+            if value is None:
+                return None
+            result.append((move, value))
+        return result
+
+    def best_move(self, game_state: GameState, leader_move: Optional[Move] = None) -> Optional[Move]:
+        """
+        The best move for the player to move, see move_values.
+
+        :returns: the move with the highest value, or None if not all positions after the moves are in the cache.
+        """
+        move_values = self.move_values(game_state, leader_move)
+        if move_values is None:
+            return None
+        best_move, _ = max(move_values, key=lambda move_value: move_value[1])
+        return best_move
+
+    def close(self) -> None:
+        """Unmap the file"""
+        del self.__keys
+        del self.__values
+        self.__map.close()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # the mapping cannot be pickled, the file is mapped again when unpickling
+        return {"path": self.path, "engine": self.engine}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["path"], state["engine"])  # type: ignore[misc]
+
+    def __repr__(self) -> str:
+        return f"EndgameCache(path={self.path!r}, engine={self.engine})"
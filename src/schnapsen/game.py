@@ -1,10 +1,14 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
+from functools import cached_property
 from enum import Enum
 from random import Random
-from typing import Iterable, List, Optional, Tuple, Union, cast, Any
-from .deck import CardCollection, OrderedCardCollection, Card, Rank, Suit
+from typing import Callable, Dict, Iterable, Iterator, List, Literal, Optional, Sequence, Tuple, Union, cast, overload, Any
+from .deck import CardCollection, CardSet, OrderedCardCollection, Card, Rank, Suit
 import itertools
+import math
+import struct
 
 
 class Bot(ABC):
@@ -44,9 +48,6 @@ class Move(ABC):
     A single move during a game. There are several types of move possible: normal moves, trump exchanges, and marriages. They are implmented in classes inheriting from this class.
     """
 
-    cards: List[Card]  # implementation detail: The creation of this list is defered to the derived classes in _cards()
-    """The cards played in this move"""
-
     def is_marriage(self) -> bool:
         """
         Is this Move a marriage?
@@ -63,11 +64,30 @@ class Move(ABC):
         """
         return False
 
-    def __getattribute__(self, __name: str) -> Any:
-        if __name == "cards":
-            # We call the method to compute the card list
-            return object.__getattribute__(self, "_cards")()
-        return object.__getattribute__(self, __name)
+    def is_regular_move(self) -> bool:
+        """
+        Is this Move a regular move (not a mariage or trump exchange)?
+
+        :returns: a bool indicating whether this move is a regular move
+        """
+        return False
+
+    def as_regular_move(self) -> 'RegularMove':
+        """Returns this same move but as a RegularMove. Raises an Exception if this is not a regular move."""
+        raise AssertionError("as_regular_move called on a Move which is not a regular move. Check with is_regular_move first.")
+
+    def as_marriage(self) -> 'Marriage':
+        """Returns this same move but as a Marriage. Raises an Exception if this is not a marriage."""
+        raise AssertionError("as_marriage called on a Move which is not a Marriage. Check with is_marriage first.")
+
+    def as_trump_exchange(self) -> 'Trump_Exchange':
+        """Returns this same move but as a Trump_Exchange. Raises an Exception if this is not a trump exchange."""
+        raise AssertionError("as_trump_exchange called on a Move which is not a Trump_Exchange. Check with is_trump_exchange first.")
+
+    @property
+    def cards(self) -> List[Card]:
+        """The cards played in this move"""
+        return list(self._cards())
 
     @abstractmethod
     def _cards(self) -> Iterable[Card]:
@@ -87,6 +107,9 @@ class Trump_Exchange(Move):
     def is_trump_exchange(self) -> bool:
         return True
 
+    def as_trump_exchange(self) -> 'Trump_Exchange':
+        return self
+
     def _cards(self) -> Iterable[Card]:
         return [self.jack]
 
@@ -109,6 +132,9 @@ class RegularMove(Move):
         """Create an iterable of Moves from an iterable of cards."""
         return [RegularMove(card) for card in cards]
 
+    def is_regular_move(self) -> bool:
+        return True
+
     def as_regular_move(self) -> 'RegularMove':
         return self
 
@@ -140,10 +166,17 @@ class Marriage(Move):
     def is_marriage(self) -> bool:
         return True
 
-    def as_regular_move(self) -> RegularMove:
+    def as_marriage(self) -> 'Marriage':
+        return self
+
+    def underlying_regular_move(self) -> RegularMove:
+        """The regular move which is played as part of this marriage, i.e., playing the queen"""
         # TODO this limits you to only have the queen to play after a marriage, while in general you would ahve a choice
         return RegularMove(self.queen_card)
 
+    def as_regular_move(self) -> RegularMove:
+        return self.underlying_regular_move()
+
     def _cards(self) -> Iterable[Card]:
         return [self.queen_card, self.king_card]
 
@@ -151,6 +184,133 @@ class Marriage(Move):
         return f"Marriage(queen_card={self.queen_card}, king_card={self.king_card})"
 
 
+class ActionSpace:
+    """
+    A fixed integer encoding of all moves which can be played with a deck. Each move has one interned Move object.
+    With n the number of cards in the deck:
+    action c < n is the regular move playing the card with index c in the deck, action n + s is the trump exchange with the jack of suit s,
+    and action n + 4 + s is the marriage in suit s. Here, s is the index of the suit in Suit.
+    Actions for which the deck does not have the cards, e.g., a marriage when there are no kings, have no move.
+
+    A set of actions, like the valid moves, can be represented as a bitmask, in which bit a is set if action a is in the set.
+    """
+
+    def __init__(self, deck: Iterable[Card]) -> None:
+        """
+        Create the ActionSpace for the cards in the deck.
+
+        :param deck: The cards of the deck. Their order determines the actions of the regular moves.
+        """
+        self.cards: List[Card] = list(deck)
+        """The cards of the deck, in the order of their actions"""
+        self.size = len(self.cards) + 8
+        """The number of actions"""
+        suits = list(Suit)
+        n = len(self.cards)
+        self.__moves: List[Optional[Move]] = [RegularMove(card) for card in self.cards] + [None] * 8
+        for suit_index, suit in enumerate(suits):
+            jack, queen, king = (Card.get_card(rank, suit) for rank in (Rank.JACK, Rank.QUEEN, Rank.KING))
+            if jack in self.cards:
+                self.__moves[n + suit_index] = Trump_Exchange(jack)
+            if queen in self.cards and king in self.cards:
+                self.__moves[n + 4 + suit_index] = Marriage(queen, king)
+        self.__actions = {move: action for action, move in enumerate(self.__moves) if move is not None}
+        self.__regular_moves = {card.bit: cast(RegularMove, self.__moves[action]) for action, card in enumerate(self.cards)}
+
+    def move(self, action: int) -> Move:
+        """
+        Get the interned Move of the action.
+
+        :param action: The action
+        :returns: The Move represented by the action.
+        :raises ValueError: If there is no move for the action.
+        """
+        move = self.__moves[action] if 0 <= action < self.size else None
+        if move is None:
+            raise ValueError(f"There is no move for action {action}")
+        return move
+
+    def action(self, move: Move) -> int:
+        """
+        Get the action of a Move. The move does not have to be the interned one.
+
+        :param move: The Move
+        :returns: The action representing the move
+        :raises ValueError: If the move cannot be played with the cards of the deck.
+        """
+        action = self.__actions.get(move)
+        if action is None:
+            raise ValueError(f"The move {move} is not in this action space")
+        return action
+
+    def intern(self, move: Move) -> Move:
+        """Get the interned Move equal to the move, or the move itself if it is not in this action space"""
+        action = self.__actions.get(move)
+        if action is None:
+            return move
+        return cast(Move, self.__moves[action])
+
+    def regular_move(self, card: Card) -> RegularMove:
+        """Get the interned RegularMove playing the card. For a card which is not in the deck, a new RegularMove is created."""
+        return self.__regular_moves.get(card.bit) or RegularMove(card)
+
+    def regular_moves(self, cards: Iterable[Card]) -> List[Move]:
+        """Get the interned RegularMoves playing the cards, in the same order."""
+        return [self.regular_move(card) for card in cards]
+
+    def mask(self, moves: Iterable[Move]) -> int:
+        """Get the bitmask of the actions of the moves"""
+        mask = 0
+        for move in moves:
+            mask |= 1 << self.action(move)
+        return mask
+
+    def moves_in_mask(self, mask: int) -> List[Move]:
+        """Get the interned moves of the actions in the bitmask, in the order of their actions"""
+        moves: List[Move] = []
+        while mask:
+            lowest = mask & -mask
+            moves.append(self.move(lowest.bit_length() - 1))
+            mask ^= lowest
+        return moves
+
+    def __repr__(self) -> str:
+        return f"ActionSpace(cards={self.cards})"
+
+
+class _ZobristKeys:
+    """
+    The random keys which are combined into Zobrist hashes, see GameState.zobrist_hash and PlayerPerspective.zobrist_hash.
+    The keys are generated from a fixed seed, so the hashes are the same in every process.
+    """
+
+    def __init__(self) -> None:
+        rand = Random(0x5C4A9)
+        cards = list(Card)
+        self.hand = {card: rand.getrandbits(64) for card in cards}
+        """The key of a card being in a hand"""
+        self.talon = [{card: rand.getrandbits(64) for card in cards} for _ in range(len(cards))]
+        """The key of a card being at a position in the talon, counted from the bottom"""
+        self.trump_suit = {suit: rand.getrandbits(64) for suit in Suit}
+        self.direct_points = [rand.getrandbits(64) for _ in range(256)]
+        self.pending_points = [rand.getrandbits(64) for _ in range(256)]
+        self.past_card = {card: rand.getrandbits(64) for card in cards}
+        """The key of a card which was played in a past trick"""
+        self.known_card = {card: rand.getrandbits(64) for card in cards}
+        """The key of a card which is known to be in the hand of the opponent"""
+        self.trump_card = {card: rand.getrandbits(64) for card in cards}
+        self.talon_size = [rand.getrandbits(64) for _ in range(len(cards) + 1)]
+        self.leader = rand.getrandbits(64)
+
+    @staticmethod
+    def other_player(key: int) -> int:
+        """The key rotated by one bit, to distinguish the parts of the hash for the two players"""
+        return ((key << 1) | (key >> 63)) & 0xFFFFFFFFFFFFFFFF
+
+
+_ZOBRIST_KEYS = _ZobristKeys()
+
+
 class Hand(CardCollection):
     """Representing the cards in the hand of a player. These are the cards which the player can see and which he can play with in the turn."""
 
@@ -165,13 +325,33 @@ class Hand(CardCollection):
         cards = list(cards)
         assert len(cards) <= max_size, f"The number of cards {len(cards)} is larger than the maximum number fo allowed cards {max_size}"
         self.cards = cards
+        # Copies of a Hand share the list of cards until one of them gets modified, see copy()
+        self._shared = False
+        # The membership of cards is kept in a bitmask, see CardSet. The list keeps the order of the cards.
+        self._mask = 0
+        # A Hand does not assume uniqueness. Only if there are duplicates, the mask has to be recomputed on removal.
+        self._has_duplicates = False
+        # The Zobrist hash of the cards, see GameState.zobrist_hash
+        self._zobrist = 0
+        hand_keys = _ZOBRIST_KEYS.hand
+        for card in cards:
+            if self._mask & card.bit:
+                self._has_duplicates = True
+            self._mask |= card.bit
+            self._zobrist ^= hand_keys[card]
 
     def remove(self, card: Card) -> None:
         """Remove one occurence of the card from this hand"""
+        self._unshare()
         try:
             self.cards.remove(card)
         except ValueError:
             raise Exception(f"Trying to remove a card from the hand which is not in the hand. Hand is {self.cards}, trying to remove {card}")
+        if self._has_duplicates:
+            self._mask = CardSet(self.cards).mask
+        else:
+            self._mask &= ~card.bit
+        self._zobrist ^= _ZOBRIST_KEYS.hand[card]
 
     def add(self, card: Card) -> None:
         """
@@ -180,7 +360,12 @@ class Hand(CardCollection):
         :param card:  The card to be added to the hand
         """
         assert len(self.cards) < self.max_size, "Adding one more card to the hand will cause a hand with too many cards"
+        self._unshare()
         self.cards.append(card)
+        if self._mask & card.bit:
+            self._has_duplicates = True
+        self._mask |= card.bit
+        self._zobrist ^= _ZOBRIST_KEYS.hand[card]
 
     def has_cards(self, cards: Iterable[Card]) -> bool:
         """
@@ -189,15 +374,61 @@ class Hand(CardCollection):
         :param cards: An iterable of cards which need to be checked
         :returns: Whether all cards in the provided iterable are in this Hand
         """
-        return all([card in self.cards for card in cards])
+        return CardSet(cards).mask & ~self._mask == 0
+
+    def card_set(self) -> CardSet:
+        """
+        The cards in this hand as a CardSet. Duplicates are only contained once.
+
+        :returns: A CardSet with the cards in this Hand
+        """
+        return CardSet.from_mask(self._mask)
 
     def copy(self) -> 'Hand':
         """
-        Create a deep copy of this Hand
+        Create a deep copy of this Hand.
+        The copy shares the list of cards with this Hand, the first one of the two to get modified takes a private copy of the list.
+        Hence, modify a Hand only through add and remove, not by changing its cards list directly.
 
         :returns: A deep copy of this hand. Changes to the original will not affect the copy and vice versa.
         """
-        return Hand(list(self.cards), max_size=self.max_size)
+        self._shared = True
+        new_hand = Hand.__new__(Hand)
+        new_hand.max_size = self.max_size
+        new_hand.cards = self.cards
+        new_hand._shared = True
+        new_hand._mask = self._mask
+        new_hand._has_duplicates = self._has_duplicates
+        new_hand._zobrist = self._zobrist
+        return new_hand
+
+    def _restore(self, length: int, index: int, card: Card) -> None:
+        """
+        Undo removing the card from the index, after which cards were added at the end until now, see GameState.undo.
+
+        :param length: The number of cards before the card was removed.
+        :param index: The position the card had.
+        :param card: The removed card.
+        """
+        self._unshare()
+        cards = self.cards
+        hand_keys = _ZOBRIST_KEYS.hand
+        while len(cards) >= length:
+            added = cards.pop()
+            self._mask &= ~added.bit
+            self._zobrist ^= hand_keys[added]
+        cards.insert(index, card)
+        self._zobrist ^= hand_keys[card]
+        if self._has_duplicates:
+            self._mask = CardSet(cards).mask
+        else:
+            self._mask |= card.bit
+
+    def _unshare(self) -> None:
+        """Take a private copy of the list of cards in case it is shared with another Hand"""
+        if self._shared:
+            self.cards = list(self.cards)
+            self._shared = False
 
     def is_empty(self) -> bool:
         """
@@ -211,13 +442,27 @@ class Hand(CardCollection):
         return list(self.cards)
 
     def filter_suit(self, suit: Suit) -> Iterable[Card]:
+        if not self._mask & CardSet.suit_mask(suit):
+            return []
         results = [card for card in self.cards if card.suit is suit]
         return results
 
     def filter_rank(self, rank: Rank) -> Iterable[Card]:
+        if not self._mask & CardSet.rank_mask(rank):
+            return []
         results = [card for card in self.cards if card.rank is rank]
         return results
 
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def __iter__(self) -> Iterator[Card]:
+        return self.cards.__iter__()
+
+    def __contains__(self, item: Any) -> bool:
+        assert isinstance(item, Card), "Only cards can be contained in a card collection"
+        return self._mask & item.bit != 0
+
     def __repr__(self) -> str:
         return f"Hand(cards={self.cards}, max_size={self.max_size})"
 
@@ -244,10 +489,23 @@ class Talon(OrderedCardCollection):
             self.__trump_suit = trump_suit
 
         super().__init__(cards)
+        # The Zobrist hash of the cards and their positions, see GameState.zobrist_hash. Positions are counted from the bottom, so they do not change when cards are drawn.
+        self._zobrist = 0
+        for position, card in enumerate(reversed(self._cards)):
+            self._zobrist ^= _ZOBRIST_KEYS.talon[position][card]
 
     def copy(self) -> 'Talon':
-        # We do not need to make a copy of the cards as this happend in the constructor of Talon.
-        return Talon(self._cards, self.__trump_suit)
+        # The list of cards is never modified in place, only replaced, so the copy can share it.
+        new_talon = Talon.__new__(Talon)
+        new_talon._cards = self._cards
+        new_talon.__trump_suit = self.__trump_suit
+        new_talon._zobrist = self._zobrist
+        return new_talon
+
+    def _restore(self, cards: List[Card], zobrist: int) -> None:
+        """Put back a former list of cards with its Zobrist hash, see GameState.undo"""
+        self._cards = cards
+        self._zobrist = zobrist
 
     def trump_exchange(self, new_trump: Card) -> Card:
         """
@@ -262,14 +520,19 @@ class Talon(OrderedCardCollection):
         assert new_trump.rank is Rank.JACK
         assert len(self._cards) >= 2
         assert new_trump.suit is self._cards[-1].suit
-        old_trump = self._cards.pop(len(self._cards) - 1)
-        self._cards.append(new_trump)
+        old_trump = self._cards[-1]
+        # We replace the list rather than modifying it, because it might be shared with copies of this Talon
+        self._cards = self._cards[:-1] + [new_trump]
+        self._zobrist ^= _ZOBRIST_KEYS.talon[0][old_trump] ^ _ZOBRIST_KEYS.talon[0][new_trump]
         return old_trump
 
     def draw_cards(self, amount: int) -> Iterable[Card]:
         """Draw a card from this Talon. This does not change the talon, btu rather returns a talon with the change applied and the card drawn"""
         assert len(self._cards) >= amount, f"There are only {len(self._cards)} on the Talon, but {amount} cards are requested"
         draw = self._cards[:amount]
+        top = len(self._cards) - 1
+        for index, card in enumerate(draw):
+            self._zobrist ^= _ZOBRIST_KEYS.talon[top - index][card]
         self._cards = self._cards[amount:]
         return draw
 
@@ -431,7 +694,7 @@ class BotState:
     implementation: Bot
     hand: Hand
     score: Score = field(default_factory=Score)
-    won_cards: List[Card] = field(default_factory=list)
+    won_cards: CardSet = field(default_factory=CardSet)
 
     def get_move(self, state: 'PlayerPerspective', leader_move: Optional[Move]) -> Move:
         """
@@ -451,6 +714,7 @@ class BotState:
     def copy(self) -> 'BotState':
         """
         Makes a deep copy of the current state.
+        The score and won cards are immutable and the hand is copied on write, so this does not copy any cards.
 
         :returns: The deep copy.
         """
@@ -458,7 +722,7 @@ class BotState:
             implementation=self.implementation,
             hand=self.hand.copy(),
             score=self.score,  # does not need a copy because it is not mutable
-            won_cards=list(self.won_cards),
+            won_cards=self.won_cards,  # does not need a copy because it is not mutable
         )
         return new_bot
 
@@ -482,6 +746,88 @@ class Previous:
     """Did the leader of remain the leader."""
 
 
+class _HistoryLog:
+    """
+    The Previous records which led to a GameState, as a persistent linked list: each log is the log of the previous state with one record
+    appended, and points to that log as its parent. The logs of the successive states of a game, and of branches continuing from the same
+    state, therefore share their common part, and nothing is copied or kept alive beyond the states which are still referenced.
+    Besides the last record, information which is often needed about all records is kept in each log.
+    """
+
+    __slots__ = ("parent", "last", "length", "_leader_changes", "_past_cards", "_past_cards_hash")
+
+    def __init__(self, parent: Optional['_HistoryLog'] = None, last: Optional[Previous] = None) -> None:
+        """
+        Create the empty log, or the log with a record appended to a parent log.
+
+        :param parent: The log of the previous state, or None for the empty log.
+        :param last: The record to append to the parent. Must be provided if and only if the parent is.
+        """
+        self.parent = parent
+        self.last = last
+        if parent is None or last is None:
+            assert parent is None and last is None, "A record is appended to a parent log"
+            self.length = 0
+            # whether the leader changed an odd number of times in the records
+            self._leader_changes = False
+            # the mask of all cards played in the records, see CardSet
+            self._past_cards = 0
+            # the Zobrist hash of the cards in _past_cards, see PlayerPerspective.zobrist_hash
+            self._past_cards_hash = 0
+            return
+        self.length = parent.length + 1
+        self._leader_changes = parent._leader_changes ^ (not last.leader_remained_leader)
+        mask, past_cards_hash = parent._past_cards, parent._past_cards_hash
+        for card in last.trick.cards:
+            if not card.bit & mask:
+                mask |= card.bit
+                past_cards_hash ^= _ZOBRIST_KEYS.past_card[card]
+        self._past_cards = mask
+        self._past_cards_hash = past_cards_hash
+
+    def __prefix(self, length: int) -> '_HistoryLog':
+        """The log of the first length records"""
+        assert 0 <= length <= self.length
+        log = self
+        for _ in range(self.length - length):
+            assert log.parent is not None
+            log = log.parent
+        return log
+
+    def record(self, index: int) -> Previous:
+        """Get the record of the trick with the index, 0 being the first trick played"""
+        assert 0 <= index < self.length
+        last = self.__prefix(index + 1).last
+        assert last is not None
+        return last
+
+    def leader_changed(self, index: int) -> bool:
+        """Whether the leader changed an odd number of times from the state before the trick with the index until the last state"""
+        return self.__prefix(index)._leader_changes ^ self._leader_changes
+
+    def records(self) -> List[Tuple[Previous, bool]]:
+        """
+        All records in order, each with whether the leader changed an odd number of times from the state before its trick until the last state.
+        This walks the log once, while calling record and leader_changed for each index walks it again every time.
+        """
+        records = []
+        log = self
+        while log.parent is not None:
+            assert log.last is not None
+            records.append((log.last, log.parent._leader_changes ^ self._leader_changes))
+            log = log.parent
+        records.reverse()
+        return records
+
+    def past_cards_mask(self) -> int:
+        """The mask of all cards played in the tricks of this history, including the cards of marriages and trump exchanges"""
+        return self._past_cards
+
+    def past_cards_hash(self) -> int:
+        """The Zobrist hash of the cards in past_cards_mask"""
+        return self._past_cards_hash
+
+
 @dataclass
 class GameState:
     """
@@ -497,8 +843,12 @@ class GameState:
     """The trump suit in this game. This information is also in the Talon."""
     talon: Talon
     """The talon, containing the cards not yet in the hand of the player and the trump card at the bottom"""
+    _history_log: Optional[_HistoryLog] = field(default=None, init=False, repr=False, compare=False)
+    """The log of the Previous records which led to this GameState, created when it is first needed, see _history."""
     previous: Optional[Previous]
     """The events which led to this GameState, or None, if this is the initial GameState (or previous tricks and states are unknown)"""
+    _undo_stack: List[Tuple[Any, ...]] = field(default_factory=list, init=False, repr=False, compare=False)
+    """The records to revert the tricks applied with apply_trick, the last one is reverted first."""
 
     def __getattribute__(self, __name: str) -> Any:
         if __name == "trump_suit":
@@ -506,10 +856,21 @@ class GameState:
             return self.talon.trump_suit()
         return object.__getattribute__(self, __name)
 
+    @property
+    def _history(self) -> _HistoryLog:
+        """The Previous records which led to this GameState. The log extends the one of the previous state, and is made again if previous was replaced."""
+        log = self._history_log
+        previous = self.previous
+        if log is None or log.last is not previous:
+            log = _HistoryLog() if previous is None else _HistoryLog(previous.state._history, previous)
+            self._history_log = log
+        return log
+
     def copy_for_next(self) -> 'GameState':
         """
         Make a copy of the gamestate, modified such that the previous state is this state, but the previous trick is not filled yet.
         This is used to create a GameState which will be modified to become the next gamestate.
+        The copy shares the cards of the hands and the talon with this state until they get modified.
         """
         # We intentionally do no initialize the previous information. It is not known yet
         new_state = GameState(
@@ -535,6 +896,57 @@ class GameState:
         new_state.follower.implementation = new_follower
         return new_state
 
+    def apply_trick(self, game_engine: 'GamePlayEngine', leader_move: Move, follower_move: Optional[RegularMove] = None) -> None:
+        """
+        Play a trick by modifying this state in place. The trick can be reverted exactly with undo().
+        This is meant for search algorithms which explore alternatives depth-first, without copying the state for every trick.
+
+        The trick is applied using the trick implementer and trick scorer of the game engine, but the moves are not validated,
+        no bots are asked for moves or notified, and the previous state is not updated.
+
+        :param game_engine: The engine with the rules of the game.
+        :param leader_move: The move of the leader.
+        :param follower_move: The move of the follower, or None in case the leader_move is a trump exchange.
+        """
+        leader, follower, talon = self.leader, self.follower, self.talon
+        leader_hand, follower_hand = leader.hand.cards, follower.hand.cards
+        if type(leader_move) is RegularMove:
+            leader_card = leader_move.card
+        elif leader_move.is_trump_exchange():
+            leader_card = cast(Trump_Exchange, leader_move).jack
+        else:
+            leader_card = cast(Marriage, leader_move).queen_card
+        # Only what the trick changes is recorded: the cards leaving the hands and their positions, the former lengths of the hands, since
+        # cards are only added at the end, the scores and won cards, which are immutable, and the list of the talon, which is only replaced.
+        self._undo_stack.append((
+            leader, follower,
+            leader.score, follower.score,
+            leader.won_cards, follower.won_cards,
+            leader_hand.index(leader_card), leader_card, len(leader_hand),
+            follower_hand.index(follower_move.card) if follower_move else -1, follower_move.card if follower_move else None, len(follower_hand),
+            talon._cards, talon._zobrist,
+        ))
+        game_engine.trick_implementer.apply_trick_in_place(game_engine, self, leader_move, follower_move)
+
+    def undo(self) -> None:
+        """
+        Revert the last trick applied with apply_trick, restoring hands, scores, won cards, talon and leader exactly.
+        """
+        assert self._undo_stack, "There is no trick applied with apply_trick to undo"
+        (leader, follower,
+         leader_score, follower_score,
+         leader_won_cards, follower_won_cards,
+         leader_index, leader_card, leader_length,
+         follower_index, follower_card, follower_length,
+         talon_cards, talon_zobrist) = self._undo_stack.pop()
+        leader.score, follower.score = leader_score, follower_score
+        leader.won_cards, follower.won_cards = leader_won_cards, follower_won_cards
+        leader.hand._restore(leader_length, leader_index, leader_card)
+        if follower_card is not None:
+            follower.hand._restore(follower_length, follower_index, follower_card)
+        self.leader, self.follower = leader, follower
+        self.talon._restore(talon_cards, talon_zobrist)
+
     def game_phase(self) -> GamePhase:
         """What is the current phase of the game
 
@@ -545,6 +957,20 @@ class GameState:
         else:
             return GamePhase.ONE
 
+    def zobrist_hash(self) -> int:
+        """
+        A 64-bit Zobrist hash of the position: the hands of the leader and the follower, the order of the talon, the trump suit and the scores.
+        The parts of the hash for the hands and the talon are kept up to date as cards are added, removed and drawn, so this takes constant time.
+        Equal positions have equal hashes, also in different processes. The hash does not depend on the bots, the won cards, or the history.
+
+        :returns: The hash, an int from 0 to 2**64 - 1
+        """
+        keys = _ZOBRIST_KEYS
+        leader, follower = self.leader, self.follower
+        leader_part = leader.hand._zobrist ^ keys.direct_points[leader.score.direct_points] ^ keys.pending_points[leader.score.pending_points]
+        follower_part = follower.hand._zobrist ^ keys.direct_points[follower.score.direct_points] ^ keys.pending_points[follower.score.pending_points]
+        return leader_part ^ keys.other_player(follower_part) ^ self.talon._zobrist ^ keys.trump_suit[self.trump_suit]
+
     def are_all_cards_played(self) -> bool:
         """Returns True in case the players have played all their cards and the game is has come to an end
 
@@ -578,44 +1004,23 @@ class PlayerPerspective(ABC):
         """
         pass
 
-    def get_game_history(self) -> list[tuple['PlayerPerspective', Optional[Trick]]]:
+    def valid_moves_mask(self) -> int:
+        """
+        Get the valid moves as a bitmask of their actions in the ActionSpace of the engine, see ActionSpace.
+        This is, e.g., useful as an action mask for machine learning models.
+        """
+        return self.__engine.action_space.mask(self.valid_moves())
+
+    def get_game_history(self) -> 'GameHistory':
         """
         The game history from the perspective of the player. This means all the past PlayerPerspective this bot has seen, and the Tricks played.
         This only provides access to cards the Bot is allowed to see.
 
         :returns: The PlayerPerspective and Tricks in chronological order, index 0 is the first round played. Only the last Trick will be None.
         The last pair will contain the current PlayerGameState.
+        The history is a read-only sequence, which creates the past perspectives only when they are accessed.
         """
-
-        # We reconstruct the history backwards.
-        game_state_history: List[Tuple[PlayerPerspective, Optional[Trick]]] = []
-        # We first push the current state to the end
-        game_state_history.insert(0, (self, None))
-
-        current_leader = self.am_i_leader()
-        current = self.__game_state.previous
-
-        while current:
-            # If we were leader, and we remained, then we were leader before
-            # If we were follower, and we remained, then we were follower before
-            # If we were leader, and we did not remain, then we were follower before
-            # If we were follower, and we did not remain, then we were leader before
-            # This logic gets reflected by the negation of a xor
-            current_leader = not current_leader ^ current.leader_remained_leader
-
-            current_player_state: PlayerPerspective
-            if current_leader:
-                current_player_state = LeaderPerspective(current.state, self.__engine)
-            else:  # We are following
-                if current.trick.is_trump_exchange():
-                    current_player_state = ExchangeFollowerPerspective(current.state, self.__engine)
-                else:
-                    current_player_state = FollowerPerspective(current.state, self.__engine, current.trick.as_partial().leader_move)
-            history_record = (current_player_state, current.trick)
-            game_state_history.insert(0, history_record)
-
-            current = current.state.previous
-        return game_state_history
+        return GameHistory(self, self.__game_state._history, self.__engine)
 
     @abstractmethod
     def get_hand(self) -> Hand:
@@ -695,33 +1100,23 @@ class PlayerPerspective(ABC):
 
         :param leader_move: The move made by the leader of the trick. These cards have also been seen until now.
         """
-        bot = self.__get_own_bot_state()
-
-        seen_cards: set[Card] = set()  # We make it a set to remove duplicates
+        return CardSet.from_mask(self.__seen_cards_mask(leader_move))
 
+    def __seen_cards_mask(self, leader_move: Optional[Move]) -> int:
         # in own hand
-        seen_cards.update(bot.hand)
+        seen_cards = self.__get_own_bot_state().hand.card_set().mask
 
         # the trump card
         trump = self.get_trump_card()
         if trump:
-            seen_cards.add(trump)
+            seen_cards |= trump.bit
 
         # all cards which were played in Tricks (icludes marriages and Trump exchanges)
-
-        seen_cards.update(self.__past_tricks_cards())
+        seen_cards |= self.__game_state._history.past_cards_mask()
         if leader_move is not None:
-            seen_cards.update(leader_move.cards)
-
-        return OrderedCardCollection(seen_cards)
-
-    def __past_tricks_cards(self) -> set[Card]:
-        past_cards: set[Card] = set()
-        prev = self.__game_state.previous
-        while prev:
-            past_cards.update(prev.trick.cards)
-            prev = prev.state.previous
-        return past_cards
+            for card in leader_move.cards:
+                seen_cards |= card.bit
+        return seen_cards
 
     def get_known_cards_of_opponent_hand(self) -> CardCollection:
         """Get all cards which are in the opponents hand, but known to your Bot. This includes cards earlier used in marriages, or a trump exchange.
@@ -730,8 +1125,44 @@ class PlayerPerspective(ABC):
         if self.get_phase() == GamePhase.TWO:
             return opponent_hand
         # We only disclose cards which have been part of a move, i.e., an Exchange or a Marriage
-        past_trick_cards = self.__past_tricks_cards()
-        return OrderedCardCollection(filter(lambda c: c in past_trick_cards, opponent_hand))
+        past_trick_cards = self.__game_state._history.past_cards_mask()
+        if opponent_hand.card_set().mask & past_trick_cards == 0:
+            return OrderedCardCollection()
+        return OrderedCardCollection([card for card in opponent_hand if card.bit & past_trick_cards])
+
+    def zobrist_hash(self) -> int:
+        """
+        A 64-bit Zobrist hash of the information set, which covers only what this player can see: its own hand, the cards played in past tricks,
+        the cards known to be in the hand of the opponent, the trump card (or suit, once the talon is empty), the size of the talon,
+        the scores, and whether this player is the leader. States which this player cannot tell apart have the same hash.
+        This takes constant time, see also GameState.zobrist_hash.
+
+        :returns: The hash, an int from 0 to 2**64 - 1
+        """
+        keys = _ZOBRIST_KEYS
+        me, opponent = self.__get_own_bot_state(), self.__get_opponent_bot_state()
+        game_state = self.__game_state
+        my_part = me.hand._zobrist ^ keys.direct_points[me.score.direct_points] ^ keys.pending_points[me.score.pending_points]
+        opponent_part = keys.direct_points[opponent.score.direct_points] ^ keys.pending_points[opponent.score.pending_points]
+        past_cards = game_state._history.past_cards_mask()
+        for card in opponent.hand.cards:
+            if card.bit & past_cards:
+                opponent_part ^= keys.known_card[card]
+        trump_card = game_state.talon.trump_card()
+        result = my_part ^ keys.other_player(opponent_part) ^ game_state._history.past_cards_hash() ^ keys.talon_size[len(game_state.talon)]
+        result ^= keys.trump_suit[game_state.trump_suit] if trump_card is None else keys.trump_card[trump_card]
+        if self.am_i_leader():
+            result ^= keys.leader
+        return result
+
+    def _relabeled(self, relabeling: 'SuitRelabeling', leader_move: Optional[Move]) -> Tuple['PlayerPerspective', Optional[Move]]:
+        """The perspective of this player after renaming the suits of the game, see SuitRelabeling.perspective"""
+        engine = self.__engine
+        game_state = relabeling.state(self.__game_state, engine)
+        renamed_leader_move = None if leader_move is None else engine.action_space.intern(relabeling.move(leader_move))
+        if self.am_i_leader():
+            return LeaderPerspective(game_state, engine), renamed_leader_move
+        return FollowerPerspective(game_state, engine, renamed_leader_move), renamed_leader_move
 
     def get_engine(self) -> 'GamePlayEngine':
         """
@@ -765,54 +1196,128 @@ class PlayerPerspective(ABC):
 
         :returns: A perfect information state object.
         """
-        opponent_hand = self.__get_opponent_bot_state().hand.copy()
+        return self.make_assumptions(leader_move, rand, 1)[0]
+
+    @overload
+    def make_assumptions(self, leader_move: Optional[Move], rand: Random, n: int, lazy: Literal[False] = False) -> List[GameState]:
+        ...
+
+    @overload
+    def make_assumptions(self, leader_move: Optional[Move], rand: Random, n: int, lazy: Literal[True]) -> Iterator[GameState]:
+        ...
+
+    def make_assumptions(self, leader_move: Optional[Move], rand: Random, n: int, lazy: bool = False) -> Union[List[GameState], Iterator[GameState]]:
+        """
+        Make n random guesses as to the position of the unknown cards, like make_assumption does.
+        The cards which are unknown are only determined once for all guesses.
+        The guesses are the same as the ones from calling make_assumption n times with the same rand.
+
+        :param leader_move: the optional already executed leader_move in the current trick. This card is guaranteed to be in the hand of the leader in the returned GameStates.
+        :param rand: the source of random numbers to do the random assignment of unknown cards
+        :param n: the number of guesses to make
+        :param lazy: if True, an iterator is returned which makes each guess only when it is requested.
+            The random numbers are then taken from rand at that moment. The game must not continue before the iterator is exhausted.
+
+        :returns: n perfect information state objects.
+        """
+        assumptions = self.__generate_assumptions(leader_move, rand, n)
+        if lazy:
+            return assumptions
+        return list(assumptions)
+
+    def __generate_assumptions(self, leader_move: Optional[Move], rand: Random, n: int) -> Iterator[GameState]:
+        opponent_hand = self.__get_opponent_bot_state().hand.get_cards()
 
         if leader_move is not None:
-            self.__game_state.leader.hand.get_cards()
             assert all([card in opponent_hand for card in leader_move.cards]), f"The specified leader_move {leader_move} is not in the hand of the opponent {opponent_hand}"
 
-        full_state = self.__game_state.copy_with_other_bots(_DummyBot(), _DummyBot())
         if self.get_phase() == GamePhase.TWO:
-            return full_state
+            for _ in range(n):
+                yield self.__game_state.copy_with_other_bots(_DummyBot(), _DummyBot())
+            return
 
-        seen_cards = self.seen_cards(leader_move)
-        full_deck = self.__engine.deck_generator.get_initial_deck()
+        seen_cards, unseen_pool = self.__unseen_cards(leader_move)
+        talon = self.__game_state.talon.get_cards()
 
-        opponent_hand = self.__get_opponent_bot_state().hand.copy()
-        unseen_opponent_hand = list(filter(lambda card: card not in seen_cards, opponent_hand))
+        for _ in range(n):
+            full_state = self.__game_state.copy_with_other_bots(_DummyBot(), _DummyBot())
+            unseen_cards = list(unseen_pool)
+            rand.shuffle(unseen_cards)
 
-        talon = full_state.talon
-        unseen_talon = list(filter(lambda card: card not in seen_cards, talon))
+            # unseen cards in the talon take one of the random cards, then the ones in the hand of the opponent
+            new_talon = [unseen_cards.pop() if not card.bit & seen_cards else card for card in talon]
+            full_state.talon = Talon(new_talon)
 
-        unseen_cards = list(filter(lambda card: card not in seen_cards, full_deck))
-        rand.shuffle(unseen_cards)
+            new_opponent_hand = [unseen_cards.pop() if not card.bit & seen_cards else card for card in opponent_hand]
+            if self.am_i_leader():
+                full_state.follower.hand = Hand(new_opponent_hand)
+            else:
+                full_state.leader.hand = Hand(new_opponent_hand)
 
-        assert len(unseen_talon) + len(unseen_opponent_hand) == len(unseen_cards), "Logical error. The number of unseen cards in the opponents hand and in the talon must be equal to the number of unseen cards"
+            assert len(unseen_cards) == 0, "All cards must be consumed by wither the opponent hand or talon by now"
+            yield full_state
 
-        new_talon = []
-        for card in talon:
-            if card in unseen_talon:
-                # take one of the random cards
-                new_talon.append(unseen_cards.pop())
-            else:
-                new_talon.append(card)
+    def count_assumptions(self, leader_move: Optional[Move]) -> int:
+        """
+        Count the distinct assumptions which make_assumption can make. These differ in the set of cards in the hand of the opponent,
+        or in the order of the talon. In phase two, there is only one.
 
-        full_state.talon = Talon(new_talon)
+        :param leader_move: the optional already executed leader_move in the current trick.
+        :returns: The number of distinct assumptions, which are all equally likely.
+        """
+        if self.get_phase() == GamePhase.TWO:
+            return 1
+        seen_cards, unseen_pool = self.__unseen_cards(leader_move)
+        unseen_in_talon = sum(1 for card in self.__game_state.talon.get_cards() if not card.bit & seen_cards)
+        return math.comb(len(unseen_pool), unseen_in_talon) * math.factorial(unseen_in_talon)
 
-        new_opponent_hand = []
-        for card in opponent_hand:
-            if card in unseen_opponent_hand:
-                new_opponent_hand.append(unseen_cards.pop())
-            else:
-                new_opponent_hand.append(card)
-        if self.am_i_leader():
-            full_state.follower.hand = Hand(new_opponent_hand)
-        else:
-            full_state.leader.hand = Hand(new_opponent_hand)
+    def enumerate_assumptions(self, leader_move: Optional[Move]) -> Iterator[Tuple[GameState, float]]:
+        """
+        Make every distinct assumption as to the position of the unknown cards, together with its probability.
+        This is an alternative to make_assumptions when count_assumptions is small, such that random guesses would mostly be duplicates.
+        The cards in the hand of the opponent are taken in the order of the initial deck, the probabilities add up to one.
 
-        assert len(unseen_cards) == 0, "All cards must be consumed by wither the opponent hand or talon by now"
+        This removes the real bots from the GameStates. If you want to continue the game, provide new Bots. See copy_with_other_bots in the GameState class.
 
-        return full_state
+        :param leader_move: the optional already executed leader_move in the current trick. This card is guaranteed to be in the hand of the leader in the returned GameStates.
+        :returns: The count_assumptions perfect information state objects, each with the probability that it is the real state.
+        """
+        if self.get_phase() == GamePhase.TWO:
+            yield self.__game_state.copy_with_other_bots(_DummyBot(), _DummyBot()), 1.0
+            return
+
+        opponent_hand = self.__get_opponent_bot_state().hand.get_cards()
+        seen_cards, unseen_pool = self.__unseen_cards(leader_move)
+        talon = self.__game_state.talon.get_cards()
+        unseen_in_talon = sum(1 for card in talon if not card.bit & seen_cards)
+        probability = 1.0 / self.count_assumptions(leader_move)
+
+        for talon_pool in itertools.combinations(unseen_pool, unseen_in_talon):
+            talon_mask = 0
+            for card in talon_pool:
+                talon_mask |= card.bit
+            hand_cards = iter([card for card in unseen_pool if not card.bit & talon_mask])
+            new_opponent_hand = [next(hand_cards) if not card.bit & seen_cards else card for card in opponent_hand]
+            for talon_order in itertools.permutations(talon_pool):
+                talon_cards = iter(talon_order)
+                full_state = self.__game_state.copy_with_other_bots(_DummyBot(), _DummyBot())
+                full_state.talon = Talon([next(talon_cards) if not card.bit & seen_cards else card for card in talon])
+                if self.am_i_leader():
+                    full_state.follower.hand = Hand(list(new_opponent_hand))
+                else:
+                    full_state.leader.hand = Hand(list(new_opponent_hand))
+                yield full_state, probability
+
+    def __unseen_cards(self, leader_move: Optional[Move]) -> Tuple[int, List[Card]]:
+        """The mask of the cards seen by this player, and the cards it has not seen, which are in the talon or the hand of the opponent, in the order of the initial deck"""
+        seen_cards = self.__seen_cards_mask(leader_move)
+        unseen_pool = [card for card in self.__engine.action_space.cards if not card.bit & seen_cards]
+
+        talon = self.__game_state.talon.get_cards()
+        opponent_hand = self.__get_opponent_bot_state().hand.get_cards()
+        unseen_count = sum(1 for card in itertools.chain(talon, opponent_hand) if not card.bit & seen_cards)
+        assert unseen_count == len(unseen_pool), "Logical error. The number of unseen cards in the opponents hand and in the talon must be equal to the number of unseen cards"
+        return seen_cards, unseen_pool
 
 
 class _DummyBot(Bot):
@@ -856,10 +1361,10 @@ class LeaderPerspective(PlayerPerspective):
         return True
 
     def get_won_cards(self) -> CardCollection:
-        return OrderedCardCollection(self.__game_state.leader.won_cards)
+        return self.__game_state.leader.won_cards
 
     def get_opponent_won_cards(self) -> CardCollection:
-        return OrderedCardCollection(self.__game_state.follower.won_cards)
+        return self.__game_state.follower.won_cards
 
     def __repr__(self) -> str:
         return f"LeaderPerspective(state={self.__game_state}, engine={self.__engine})"
@@ -893,10 +1398,10 @@ class FollowerPerspective(PlayerPerspective):
         return False
 
     def get_won_cards(self) -> CardCollection:
-        return OrderedCardCollection(self.__game_state.follower.won_cards)
+        return self.__game_state.follower.won_cards
 
     def get_opponent_won_cards(self) -> CardCollection:
-        return OrderedCardCollection(self.__game_state.leader.won_cards)
+        return self.__game_state.leader.won_cards
 
     def __repr__(self) -> str:
         return f"FollowerGameState(state={self.__game_state}, engine={self.__engine}, "
@@ -938,10 +1443,10 @@ class ExchangeFollowerPerspective(PlayerPerspective):
         return self.__game_state.leader.hand.copy()
 
     def get_opponent_won_cards(self) -> CardCollection:
-        return OrderedCardCollection(self.__game_state.leader.won_cards)
+        return self.__game_state.leader.won_cards
 
     def get_won_cards(self) -> CardCollection:
-        return OrderedCardCollection(self.__game_state.follower.won_cards)
+        return self.__game_state.follower.won_cards
 
     def am_i_leader(self) -> bool:
         return False
@@ -977,6 +1482,339 @@ class LoserPerspective(FollowerPerspective):
         return f"LoserGameState(state={self.__game_state}, engine={self.__engine})"
 
 
+class GameHistory(Sequence[Tuple[PlayerPerspective, Optional[Trick]]]):
+    """
+    The game history from the perspective of a player, as returned by PlayerPerspective.get_game_history.
+    Element i is the PlayerPerspective of the player before trick i and that trick. The last element is the current perspective and None.
+    The perspectives of past states are only created when they are accessed.
+    """
+
+    def __init__(self, current: PlayerPerspective, log: _HistoryLog, engine: 'GamePlayEngine') -> None:
+        self.__current = current
+        self.__log = log
+        self.__engine = engine
+
+    def __len__(self) -> int:
+        return self.__log.length + 1
+
+    @overload
+    def __getitem__(self, index: int) -> Tuple[PlayerPerspective, Optional[Trick]]:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Tuple[PlayerPerspective, Optional[Trick]]]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Tuple[PlayerPerspective, Optional[Trick]], List[Tuple[PlayerPerspective, Optional[Trick]]]]:
+        if isinstance(index, slice):
+            entries = self.__entries()
+            return [self.__entry(*entries[i]) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("game history index out of range")
+        if index == self.__log.length:
+            return (self.__current, None)
+        return self.__entry(self.__log.record(index), self.__log.leader_changed(index))
+
+    def __iter__(self) -> Iterator[Tuple[PlayerPerspective, Optional[Trick]]]:
+        for record, leader_changed in self.__log.records():
+            yield self.__entry(record, leader_changed)
+        yield (self.__current, None)
+
+    def __entries(self) -> List[Tuple[Optional[Previous], bool]]:
+        """The arguments of __entry for each element, from a single walk over the log"""
+        entries: List[Tuple[Optional[Previous], bool]] = list(self.__log.records())
+        entries.append((None, False))
+        return entries
+
+    def __entry(self, record: Optional[Previous] = None, leader_changed: bool = False) -> Tuple[PlayerPerspective, Optional[Trick]]:
+        """The element for a record and whether the leader changed an odd number of times since, or the current element if there is no record"""
+        if record is None:
+            return (self.__current, None)
+        # We were leader before the trick if we are leader now and the leader changed an even number of times since, or the other way around
+        was_leader = self.__current.am_i_leader() ^ leader_changed
+        perspective: PlayerPerspective
+        if was_leader:
+            perspective = LeaderPerspective(record.state, self.__engine)
+        elif record.trick.is_trump_exchange():
+            perspective = ExchangeFollowerPerspective(record.state, self.__engine)
+        else:
+            perspective = FollowerPerspective(record.state, self.__engine, record.trick.as_partial().leader_move)
+        return (perspective, record.trick)
+
+    def __repr__(self) -> str:
+        return f"GameHistory(length={len(self)})"
+
+
+class GameStateCodec:
+    """
+    A compact binary encoding of GameStates, much smaller and faster than pickling them, which also pickles the bots
+    and the chain of previous states. This is meant for sending states to other processes and for storing positions.
+    A GameState contains all cards, so there is intentionally no way to encode a PlayerPerspective: that would reveal the hand of the opponent
+    and the talon to the bot. Bots can only encode the states they have themselves, like the assumptions from make_assumptions.
+
+    All numbers are unsigned and little-endian. The encoding starts with a header of fixed size, see _HEADER, with the format version, flags,
+    the trump suit, the direct and pending points of the leader and the follower, the sizes of the hands and the talon, the maximum sizes of
+    the hands, and the won cards of the leader and the follower as CardSet masks.
+    Then come the cards of the hand of the leader, of the hand of the follower and of the talon, from top to bottom, as their indices in
+    the ActionSpace of the engine, one byte each. Hence, the start of a game with 20 cards takes 48 bytes.
+
+    If the history is included, the state is the first state of the history, and the cards are followed by the number of tricks, and the actions
+    of the leader and the follower for each trick, see ActionSpace. The follower action is NO_ACTION after a trump exchange.
+    The current state is then recreated by applying the tricks with the trick implementer of the engine.
+    """
+
+    VERSION = 1
+    NO_ACTION = 255
+    """The action written where there is no move"""
+    _HEADER = struct.Struct("<BBBBBBBBBBBBQQ")
+    # the flags in the header
+    _WITH_HISTORY = 1
+    # whether the leader of the first state of the history is the follower of the current state
+    _LEADER_CHANGED = 2
+
+    def __init__(self, engine: 'GamePlayEngine') -> None:
+        """
+        Create the codec for the cards and moves of an engine.
+
+        :param engine: The engine, the cards and moves are encoded by their index in its ActionSpace.
+        """
+        self.engine = engine
+        self.__action_space = engine.action_space
+        self.__cards = engine.action_space.cards
+        assert len(self.__cards) < self.NO_ACTION - 8, f"The cards are encoded in a byte, there are too many cards: {len(self.__cards)}"
+        self.__card_indices = {card: index for index, card in enumerate(self.__cards)}
+        self.__suits = list(Suit)
+
+    def encode(self, game_state: GameState, history: bool = False) -> bytes:
+        """
+        Encode a GameState. The bots are not encoded.
+
+        :param game_state: The state to encode.
+        :param history: Whether to include the tricks which led to the state, as far as they are known.
+        :returns: The encoded state.
+        """
+        log = game_state._history
+        first_state = game_state
+        flags = 0
+        if history and log.length > 0:
+            first_state = log.record(0).state
+            flags |= self._WITH_HISTORY
+            if log.leader_changed(0):
+                flags |= self._LEADER_CHANGED
+        card_indices = self.__card_indices
+        leader, follower, talon = first_state.leader, first_state.follower, first_state.talon.get_cards()
+        header = self._HEADER.pack(
+            self.VERSION, flags, self.__suits.index(first_state.trump_suit),
+            leader.score.direct_points, leader.score.pending_points, follower.score.direct_points, follower.score.pending_points,
+            len(leader.hand), len(follower.hand), len(first_state.talon), leader.hand.max_size, follower.hand.max_size,
+            leader.won_cards.mask, follower.won_cards.mask)
+        cards = bytes([card_indices[card] for card in itertools.chain(leader.hand.cards, follower.hand.cards, talon)])
+        if not flags & self._WITH_HISTORY:
+            return header + cards
+        actions = [log.length]
+        for index in range(log.length):
+            trick = log.record(index).trick
+            if trick.is_trump_exchange():
+                actions += (self.__action_space.action(cast(ExchangeTrick, trick).exchange), self.NO_ACTION)
+            else:
+                regular_trick = cast(RegularTrick, trick)
+                actions += (self.__action_space.action(regular_trick.leader_move), self.__action_space.action(regular_trick.follower_move))
+        return header + cards + bytes(actions)
+
+    def decode(self, data: Union[bytes, bytearray, memoryview], leader: Optional[Bot] = None, follower: Optional[Bot] = None) -> GameState:
+        """
+        Decode a GameState. The data is read in place, without copying it.
+
+        :param data: The encoded state.
+        :param leader: The bot which is the leader in the decoded state. If not provided, a bot is used which cannot play, like in make_assumption.
+        :param follower: The bot which is the follower in the decoded state. If not provided, a bot is used which cannot play.
+        :returns: The decoded state. If the history was encoded, its previous states are recreated as well.
+        """
+        leader = leader or _DummyBot()
+        follower = follower or _DummyBot()
+        (version, flags, trump_suit,
+         leader_direct, leader_pending, follower_direct, follower_pending,
+         leader_size, follower_size, talon_size, leader_max_size, follower_max_size,
+         leader_won, follower_won) = self._HEADER.unpack_from(data)
+        if version != self.VERSION:
+            raise ValueError(f"Cannot decode version {version} of the encoding, only version {self.VERSION}")
+        offset = self._HEADER.size
+        cards = self.__cards
+        hands_end = offset + leader_size + follower_size
+        if flags & self._LEADER_CHANGED:
+            # the bots are those of the current state
+            leader, follower = follower, leader
+        game_state = GameState(
+            leader=BotState(leader, Hand([cards[index] for index in data[offset:offset + leader_size]], leader_max_size),
+                            Score(leader_direct, leader_pending), CardSet.from_mask(leader_won)),
+            follower=BotState(follower, Hand([cards[index] for index in data[offset + leader_size:hands_end]], follower_max_size),
+                              Score(follower_direct, follower_pending), CardSet.from_mask(follower_won)),
+            talon=Talon([cards[index] for index in data[hands_end:hands_end + talon_size]], self.__suits[trump_suit]),
+            previous=None)
+        if flags & self._WITH_HISTORY:
+            offset = hands_end + talon_size
+            for trick in range(data[offset]):
+                follower_action = data[offset + 2 + 2 * trick]
+                follower_move = None if follower_action == self.NO_ACTION else cast(RegularMove, self.__action_space.move(follower_action))
+                game_state = _replay_trick(self.engine, game_state, self.__action_space.move(data[offset + 1 + 2 * trick]), follower_move)
+        return game_state
+
+    def __repr__(self) -> str:
+        return f"GameStateCodec(engine={self.engine})"
+
+
+def _replay_trick(engine: 'GamePlayEngine', game_state: GameState, leader_move: Move, follower_move: Optional[RegularMove]) -> GameState:
+    """The state after a trick with known moves, with the game_state as its previous state. The bots are not asked for moves, nor notified."""
+    next_state = game_state.copy_for_next()
+    trick: Trick
+    if follower_move is None:
+        old_trump_card = game_state.talon.trump_card()
+        assert old_trump_card is not None, "A trump exchange needs a trump card"
+        leader_remained_leader = engine.trick_implementer.apply_trick_in_place(engine, next_state, leader_move, None)
+        trick = ExchangeTrick(exchange=cast(Trump_Exchange, leader_move), trump_card=old_trump_card)
+    else:
+        leader_remained_leader = engine.trick_implementer.apply_trick_in_place(engine, next_state, leader_move, follower_move)
+        trick = RegularTrick(leader_move=cast(Union[Marriage, RegularMove], leader_move), follower_move=follower_move)
+    next_state.previous = Previous(game_state, trick, leader_remained_leader)
+    return next_state
+
+
+class SuitRelabeling:
+    """
+    A renaming of the suits. The rules of Schnapsen do not depend on the names of the suits, so a position with renamed suits, in which the trump
+    suit is renamed as well, is equivalent to the original. In particular, the non-trump suits can be permuted in any way.
+    Caches like transposition tables and endgame caches can therefore store positions in a canonical form, see canonical_for_state and
+    canonical_for_perspective, which all equivalent positions share. The moves found for the canonical position are mapped back with the inverse.
+    """
+
+    def __init__(self, mapping: Dict[Suit, Suit]) -> None:
+        """
+        Create the relabeling.
+
+        :param mapping: The new name of each suit, a permutation of Suit. Suits which are not in the mapping keep their name.
+        """
+        self.mapping = {suit: mapping.get(suit, suit) for suit in Suit}
+        """The new name of each suit"""
+        assert len(set(self.mapping.values())) == len(self.mapping), f"The mapping {mapping} is not a permutation of the suits"
+        self.__cards = {card: Card.get_card(card.rank, self.mapping[card.suit]) for card in Card}
+
+    @staticmethod
+    def canonical_for_state(game_state: GameState, include_won_cards: bool = True) -> 'SuitRelabeling':
+        """
+        Get the relabeling to the canonical form of a state. The trump suit becomes the first suit of Suit, and the other suits are ordered by
+        where their cards are, i.e., in which hand, in the won cards of which player, or at which position in the talon.
+        Equivalent states have the same canonical form, up to the order of the cards in the hands. Hence, GameState.zobrist_hash of the
+        canonical form can be used as a key for all of them.
+
+        :param game_state: The state
+        :param include_won_cards: Whether the won cards are used to order the suits. Caches which do not store the won cards, because the rest
+            of the game does not depend on them, use False, such that states which only differ in the won cards get the same canonical form.
+        :returns: The relabeling, which is the identity if the state is in canonical form already.
+        """
+        locations: Dict[Card, int] = {}
+        card_groups: Tuple[Iterable[Card], ...] = (game_state.leader.hand, game_state.follower.hand)
+        if include_won_cards:
+            card_groups += (game_state.leader.won_cards, game_state.follower.won_cards)
+        for location, cards in enumerate(card_groups, start=1):
+            for card in cards:
+                locations[card] = location
+        for position, card in enumerate(game_state.talon.get_cards(), start=5):
+            locations[card] = position
+        return SuitRelabeling.__canonical(game_state.trump_suit, locations)
+
+    @staticmethod
+    def canonical_for_perspective(perspective: PlayerPerspective, leader_move: Optional[Move] = None) -> 'SuitRelabeling':
+        """
+        Get the relabeling to the canonical form of the perspective of a player, like canonical_for_state.
+        This only depends on what the player knows: its hand, the won cards, the known cards of the opponent, and the move of the leader.
+        Hence, all states in the information set of the player get the same relabeling, and PlayerPerspective.zobrist_hash of the
+        canonical form can be used as a key for the information set.
+
+        :param perspective: The perspective of the player
+        :param leader_move: The move of the leader, if the player is the follower.
+        :returns: The relabeling
+        """
+        locations: Dict[Card, int] = {}
+        for location, cards in enumerate((perspective.get_hand(), perspective.get_known_cards_of_opponent_hand(), perspective.get_won_cards(),
+                                          perspective.get_opponent_won_cards(), leader_move.cards if leader_move else ()), start=1):
+            for card in cards:
+                locations[card] = location
+        return SuitRelabeling.__canonical(perspective.get_trump_suit(), locations)
+
+    @staticmethod
+    def __canonical(trump_suit: Suit, locations: Dict[Card, int]) -> 'SuitRelabeling':
+        """The relabeling which orders the non-trump suits by the locations of their cards. Suits with the same locations are interchangeable."""
+        suits = list(Suit)
+        signatures = {suit: tuple(locations.get(Card.get_card(rank, suit), 0) for rank in Rank) for suit in suits}
+        others = sorted((suit for suit in suits if suit is not trump_suit), key=lambda suit: signatures[suit], reverse=True)
+        return SuitRelabeling(dict(zip([trump_suit] + others, suits)))
+
+    def inverse(self) -> 'SuitRelabeling':
+        """The relabeling which restores the original names"""
+        return SuitRelabeling({new: old for old, new in self.mapping.items()})
+
+    def card(self, card: Card) -> Card:
+        """The card with its suit renamed"""
+        return self.__cards[card]
+
+    def move(self, move: Move) -> Move:
+        """The move with the suits of its cards renamed"""
+        if move.is_trump_exchange():
+            return Trump_Exchange(self.__cards[move.as_trump_exchange().jack])
+        if move.is_marriage():
+            marriage = move.as_marriage()
+            return Marriage(self.__cards[marriage.queen_card], self.__cards[marriage.king_card])
+        return RegularMove(self.__cards[move.as_regular_move().card])
+
+    def state(self, game_state: GameState, engine: Optional['GamePlayEngine'] = None) -> GameState:
+        """
+        Rename the suits in a state. The bots are kept.
+
+        :param game_state: The state
+        :param engine: If provided, the history of the state is renamed as well, by replaying the renamed tricks with this engine.
+            Otherwise, the renamed state has no previous state.
+        :returns: A new state with the suits renamed
+        """
+        log = game_state._history
+        if engine is None or log.length == 0:
+            return self.__state_without_history(game_state)
+        renamed = self.__state_without_history(log.record(0).state)
+        for index in range(log.length):
+            trick = log.record(index).trick
+            if trick.is_trump_exchange():
+                renamed = _replay_trick(engine, renamed, self.move(cast(ExchangeTrick, trick).exchange), None)
+            else:
+                regular_trick = cast(RegularTrick, trick)
+                renamed = _replay_trick(engine, renamed, self.move(regular_trick.leader_move), cast(RegularMove, self.move(regular_trick.follower_move)))
+        return renamed
+
+    def __state_without_history(self, game_state: GameState) -> GameState:
+        cards = self.__cards
+        leader, follower = game_state.leader, game_state.follower
+        return GameState(
+            leader=BotState(leader.implementation, Hand([cards[card] for card in leader.hand.cards], leader.hand.max_size),
+                            leader.score, CardSet(cards[card] for card in leader.won_cards)),
+            follower=BotState(follower.implementation, Hand([cards[card] for card in follower.hand.cards], follower.hand.max_size),
+                              follower.score, CardSet(cards[card] for card in follower.won_cards)),
+            talon=Talon([cards[card] for card in game_state.talon.get_cards()], self.mapping[game_state.trump_suit]),
+            previous=None)
+
+    def perspective(self, perspective: PlayerPerspective, leader_move: Optional[Move] = None) -> Tuple[PlayerPerspective, Optional[Move]]:
+        """
+        Rename the suits in the perspective of a player, including its history.
+
+        :param perspective: The perspective
+        :param leader_move: The move of the leader, if the player is the follower.
+        :returns: The LeaderPerspective or FollowerPerspective of the player in the renamed state, and the renamed move of the leader.
+        """
+        return perspective._relabeled(self, leader_move)
+
+    def __repr__(self) -> str:
+        return f"SuitRelabeling(mapping={self.mapping})"
+
+
 class DeckGenerator(ABC):
     @ abstractmethod
     def get_initial_deck(self) -> OrderedCardCollection:
@@ -1026,6 +1864,19 @@ class TrickImplementer(ABC):
                                           leader_move: Move) -> GameState:
         pass
 
+    @ abstractmethod
+    def apply_trick_in_place(self, game_engine: 'GamePlayEngine', game_state: GameState, leader_move: Move, follower_move: Optional[RegularMove]) -> bool:
+        """
+        Apply the effect of a trick directly to the game_state, without asking or notifying any bots and without updating the previous state.
+        This is used by GameState.apply_trick, which can only revert the trick if the hands are changed with Hand.remove and Hand.add,
+        the talon with its methods, and the scores and won cards by assigning new ones to the same BotStates.
+
+        :param leader_move: The move of the leader.
+        :param follower_move: The move of the follower, or None in case the leader_move is a trump exchange.
+        :returns: Whether the leader remained the leader.
+        """
+        pass
+
 
 class SchnapsenTrickImplementer(TrickImplementer):
 
@@ -1059,30 +1910,44 @@ class SchnapsenTrickImplementer(TrickImplementer):
         # The next game state will be modified during this trick. We start from the previous state
         next_game_state = game_state.copy_for_next()
 
+        leader_remained_leader = self._play_regular_trick(game_engine, next_game_state, trick)
+
+        next_game_state.previous = Previous(game_state, trick=trick, leader_remained_leader=leader_remained_leader)
+
+        return next_game_state
+
+    def _play_regular_trick(self, game_engine: 'GamePlayEngine', game_state: GameState, trick: RegularTrick) -> bool:
+        """Apply the regular trick to the game_state, which gets modified. Returns whether the leader remained the leader."""
         if trick.leader_move.is_marriage():
             marriage_move: Marriage = cast(Marriage, trick.leader_move)
-            self._play_marriage(game_engine, next_game_state, marriage_move=marriage_move)
+            self._play_marriage(game_engine, game_state, marriage_move=marriage_move)
             regular_leader_move: RegularMove = cast(Marriage, trick.leader_move).as_regular_move()
         else:
             regular_leader_move = cast(RegularMove, trick.leader_move)
 
         # # apply changes in the hand and talon
-        next_game_state.leader.hand.remove(regular_leader_move.card)
-        next_game_state.follower.hand.remove(trick.follower_move.card)
+        game_state.leader.hand.remove(regular_leader_move.card)
+        game_state.follower.hand.remove(trick.follower_move.card)
 
         # We set the leader for the next state based on what the scorer decides
-        next_game_state.leader, next_game_state.follower, leader_remained_leader = game_engine.trick_scorer.score(trick, next_game_state.leader, next_game_state.follower, next_game_state.trump_suit)
+        game_state.leader, game_state.follower, leader_remained_leader = game_engine.trick_scorer.score(trick, game_state.leader, game_state.follower, game_state.trump_suit)
 
         # important: the winner takes the first card of the talon, the loser the second one.
         # this also ensures that the loser of the last trick of the first phase gets the face up trump
-        if not next_game_state.talon.is_empty():
-            drawn = iter(next_game_state.talon.draw_cards(2))
-            next_game_state.leader.hand.add(next(drawn))
-            next_game_state.follower.hand.add(next(drawn))
-
-        next_game_state.previous = Previous(game_state, trick=trick, leader_remained_leader=leader_remained_leader)
+        if not game_state.talon.is_empty():
+            drawn = iter(game_state.talon.draw_cards(2))
+            game_state.leader.hand.add(next(drawn))
+            game_state.follower.hand.add(next(drawn))
+        return leader_remained_leader
 
-        return next_game_state
+    def apply_trick_in_place(self, game_engine: 'GamePlayEngine', game_state: GameState, leader_move: Move, follower_move: Optional[RegularMove]) -> bool:
+        if leader_move.is_trump_exchange():
+            assert follower_move is None, "A trump exchange is not followed by a move of the follower"
+            self._exchange_trump(game_state, cast(Trump_Exchange, leader_move))
+            return True
+        assert follower_move is not None, "The follower must play a move, unless the leader did a trump exchange"
+        trick = RegularTrick(leader_move=cast(Union[Marriage, RegularMove], leader_move), follower_move=follower_move)
+        return self._play_regular_trick(game_engine, game_state, trick)
 
     def get_leader_move(self, game_engine: 'GamePlayEngine', game_state: 'GameState') -> Move:
         # ask first players move trough the requester
@@ -1097,11 +1962,14 @@ class SchnapsenTrickImplementer(TrickImplementer):
         assert trump_exchange.jack.suit is game_state.trump_suit, \
             f"A trump exchange can only be done with a Jack of the same suit as the current trump. Got a {trump_exchange.jack} while the  Trump card is a {game_state.trump_suit}"
         # apply the changes in the gamestate
+        self._exchange_trump(game_state, trump_exchange)
+        # We notify the other bot that an exchange happened
+        game_state.follower.implementation.notify_trump_exchange(trump_exchange)
+
+    def _exchange_trump(self, game_state: GameState, trump_exchange: Trump_Exchange) -> None:
         game_state.leader.hand.remove(trump_exchange.jack)
         old_trump = game_state.talon.trump_exchange(trump_exchange.jack)
         game_state.leader.hand.add(old_trump)
-        # We notify the other bot that an exchange happened
-        game_state.follower.implementation.notify_trump_exchange(trump_exchange)
 
     def _play_marriage(self, game_engine: 'GamePlayEngine', game_state: GameState, marriage_move: Marriage) -> None:
         score = game_engine.trick_scorer.marriage(marriage_move, game_state)
@@ -1146,38 +2014,152 @@ class MoveValidator(ABC):
         return move in self.get_legal_leader_moves(game_engine, game_state)
 
 
+class FollowerLegalityTable:
+    """
+    Precomputed information for the phase two rules of the SchnapsenMoveValidator, using the points of the cards according to a TrickScorer.
+    With it, the cards the follower is allowed to play are found with a few bitmask operations, see CardSet for the masks.
+    """
+
+    def __init__(self, trick_scorer: 'TrickScorer') -> None:
+        """
+        Create the table for the points of the trick_scorer. Cards with a rank the trick_scorer does not give points for are not in the table.
+
+        :param trick_scorer: The TrickScorer determining the points of the cards.
+        """
+        points: Dict[Card, int] = {}
+        for card in Card:
+            try:
+                points[card] = trick_scorer.rank_to_points(card.rank)
+            except KeyError:
+                continue
+        self.__higher_same_suit = {
+            card.bit: sum(other.bit for other in points if other.suit is card.suit and points[other] > card_points)
+            for card, card_points in points.items()
+        }
+
+    def higher_same_suit_mask(self, card: Card) -> int:
+        """The mask of the cards of the same suit as the card which are worth more points"""
+        return self.__higher_same_suit[card.bit]
+
+    def legal_follower_mask(self, hand_mask: int, leader_card: Card, trump_suit: Suit) -> int:
+        """
+        Get the cards the follower is allowed to play in phase two.
+
+        :param hand_mask: The mask of the cards in the hand of the follower.
+        :param leader_card: The card played by the leader.
+        :param trump_suit: The trump suit.
+        :returns: The mask of the cards in the hand which are legal to play.
+        """
+        # you must play a higher card of the same suit if you can
+        higher_same_suit = hand_mask & self.__higher_same_suit[leader_card.bit]
+        if higher_same_suit:
+            return higher_same_suit
+        # failing this, you must play a lower card of the same suit
+        same_suit = hand_mask & CardSet.suit_mask(leader_card.suit)
+        if same_suit:
+            return same_suit
+        # failing this, if the opponent did not play a trump, you must play a trump
+        if leader_card.suit is not trump_suit:
+            trumps = hand_mask & CardSet.suit_mask(trump_suit)
+            if trumps:
+                return trumps
+        # failing this, you can play anything
+        return hand_mask
+
+
+class TrickOutcomeTable:
+    """
+    The outcome of every regular trick according to the rules of the SchnapsenTrickScorer, precomputed for the points of the cards of a TrickScorer.
+    With it, a trick is resolved with a single lookup, instead of comparing the suits and points of the cards.
+    """
+
+    def __init__(self, trick_scorer: 'TrickScorer') -> None:
+        """
+        Create the table for the points of the trick_scorer. Cards with a rank the trick_scorer does not give points for are not in the table.
+
+        :param trick_scorer: The TrickScorer determining the points of the cards.
+        """
+        points: Dict[Card, int] = {}
+        for card in Card:
+            try:
+                points[card] = trick_scorer.rank_to_points(card.rank)
+            except KeyError:
+                continue
+        self.num_cards = len(Card)
+        self.__outcomes: Dict[Suit, List[Optional[Tuple[bool, int]]]] = {}
+        for trump in Suit:
+            outcomes: List[Optional[Tuple[bool, int]]] = [None] * (self.num_cards * self.num_cards)
+            for leader_card, leader_points in points.items():
+                for follower_card, follower_points in points.items():
+                    if leader_card.suit is follower_card.suit:
+                        # the higher card of the suit wins, whether it is trump or not
+                        leader_wins = leader_points > follower_points
+                    else:
+                        # the follower only wins with a trump if it did not follow suit
+                        leader_wins = follower_card.suit is not trump
+                    outcomes[leader_card.index * self.num_cards + follower_card.index] = (leader_wins, leader_points + follower_points)
+            self.__outcomes[trump] = outcomes
+
+    def outcome(self, leader_card: Card, follower_card: Card, trump_suit: Suit) -> Tuple[bool, int]:
+        """
+        Get the outcome of a trick.
+
+        :param leader_card: The card played by the leader, for a marriage the queen.
+        :param follower_card: The card played by the follower.
+        :param trump_suit: The trump suit.
+        :returns: Whether the leader wins the trick, and the points of the two cards.
+        """
+        outcome = self.__outcomes[trump_suit][leader_card.index * self.num_cards + follower_card.index]
+        assert outcome is not None, f"The trick scorer does not give points for {leader_card} or {follower_card}"
+        return outcome
+
+    def outcomes(self, trump_suit: Suit) -> List[Optional[Tuple[bool, int]]]:
+        """
+        Get all outcomes for a trump suit, for loops which resolve many tricks.
+
+        :param trump_suit: The trump suit.
+        :returns: The outcome of the trick with leader card l and follower card f at index l.index * num_cards + f.index, see outcome.
+            It is None if the scorer does not give points for one of the cards.
+        """
+        return self.__outcomes[trump_suit]
+
+
 class SchnapsenMoveValidator(MoveValidator):
 
     def get_legal_leader_moves(self, game_engine: 'GamePlayEngine', game_state: GameState) -> Iterable[Move]:
         # all cards in the hand can be played
         cards_in_hand = game_state.leader.hand
-        valid_moves: List[Move] = [RegularMove(card) for card in cards_in_hand]
+        hand_mask = cards_in_hand.card_set().mask
+        action_space = game_engine.action_space
+        valid_moves: List[Move] = action_space.regular_moves(cards_in_hand)
         # trump exchanges
         if not game_state.talon.is_empty():
             trump_jack = Card.get_card(Rank.JACK, game_state.trump_suit)
-            if trump_jack in cards_in_hand:
-                valid_moves.append(Trump_Exchange(trump_jack))
+            if hand_mask & trump_jack.bit:
+                valid_moves.append(action_space.intern(Trump_Exchange(trump_jack)))
         # mariages
-        for card in cards_in_hand.filter_rank(Rank.QUEEN):
-            king_card = Card.get_card(Rank.KING, card.suit)
-            if king_card in cards_in_hand:
-                valid_moves.append(Marriage(card, king_card))
+        if hand_mask & CardSet.rank_mask(Rank.KING):
+            for card in cards_in_hand.filter_rank(Rank.QUEEN):
+                king_card = Card.get_card(Rank.KING, card.suit)
+                if hand_mask & king_card.bit:
+                    valid_moves.append(action_space.intern(Marriage(card, king_card)))
         return valid_moves
 
     def is_legal_leader_move(self, game_engine: 'GamePlayEngine', game_state: GameState, move: Move) -> bool:
-        cards_in_hand = game_state.leader.hand
+        hand_mask = game_state.leader.hand.card_set().mask
         if move.is_marriage():
             marriage_move = cast(Marriage, move)
             # we do not have to check whether they are the same suit because of the implementation of Marriage
-            return marriage_move.queen_card in cards_in_hand and marriage_move.king_card in cards_in_hand
+            marriage_mask = marriage_move.queen_card.bit | marriage_move.king_card.bit
+            return hand_mask & marriage_mask == marriage_mask
         if move.is_trump_exchange():
             if game_state.talon.is_empty():
                 return False
             trump_move: Trump_Exchange = cast(Trump_Exchange, move)
-            return trump_move.jack in cards_in_hand
+            return hand_mask & trump_move.jack.bit != 0
         # it has to be a regular move
         regular_move = cast(RegularMove, move)
-        return regular_move.card in cards_in_hand
+        return hand_mask & regular_move.card.bit != 0
 
     def get_legal_follower_moves(self, game_engine: 'GamePlayEngine', game_state: GameState, partial_trick: Move) -> Iterable[Move]:
         hand = game_state.follower.hand
@@ -1187,7 +2169,7 @@ class SchnapsenMoveValidator(MoveValidator):
             leader_card = cast(RegularMove, partial_trick).card
         if game_state.game_phase() is GamePhase.ONE:
             # no need to follow, any card in the hand is a legal move
-            return RegularMove.from_cards(hand.get_cards())
+            return game_engine.action_space.regular_moves(hand.get_cards())
         else:
             # information from https://www.pagat.com/marriage/schnaps.html
             # ## original formulation ##
@@ -1205,26 +2187,12 @@ class SchnapsenMoveValidator(MoveValidator):
             # failing this, you must play a lower card of the same suit;
             # --new--> failing this, if the opponen did not play a trump, you must play a trump
             # failing this, you can play anything
-            leader_card_score = game_engine.trick_scorer.rank_to_points(leader_card.rank)
-            # you must play a higher card of the same suit if you can;
-            same_suit_cards = hand.filter_suit(leader_card.suit)
-            if same_suit_cards:
-                higher_same_suit, lower_same_suit = [], []
-                for card in same_suit_cards:
-                    # TODO this is slightly ambigousm should this be >= ??
-                    higher_same_suit.append(card) if game_engine.trick_scorer.rank_to_points(card.rank) > leader_card_score else lower_same_suit.append(card)
-                if higher_same_suit:
-                    return RegularMove.from_cards(higher_same_suit)
-            # failing this, you must play a lower card of the same suit;
-                elif lower_same_suit:
-                    return RegularMove.from_cards(lower_same_suit)
-                raise AssertionError("Somethign is wrong in the logic here. There should be cards, but they are neither placed in the low, nor higher list")
-            # failing this, if the opponen did not play a trump, you must play a trump
-            trump_cards = hand.filter_suit(game_state.trump_suit)
-            if leader_card.suit != game_state.trump_suit and trump_cards:
-                return RegularMove.from_cards(trump_cards)
-            # failing this, you can play anything
-            return RegularMove.from_cards(hand.get_cards())
+            # These rules are precomputed in the FollowerLegalityTable of the engine
+            hand_mask = hand.card_set().mask
+            legal_mask = game_engine.follower_legality_table.legal_follower_mask(hand_mask, leader_card, game_state.trump_suit)
+            if legal_mask == hand_mask:
+                return game_engine.action_space.regular_moves(hand.get_cards())
+            return game_engine.action_space.regular_moves([card for card in hand if card.bit & legal_mask])
 
 
 class TrickScorer(ABC):
@@ -1264,6 +2232,14 @@ class SchnapsenTrickScorer(TrickScorer):
     def rank_to_points(self, rank: Rank) -> int:
         return SchnapsenTrickScorer.SCORES[rank]
 
+    @cached_property
+    def trick_outcomes(self) -> TrickOutcomeTable:
+        """
+        The outcomes of all tricks for the points of this scorer, used by score. Subclasses which only change rank_to_points get their own table.
+        It is built when the GamePlayEngine using this scorer is created.
+        """
+        return TrickOutcomeTable(self)
+
     def marriage(self, move: Marriage, gamestate: GameState) -> 'Score':
         if move.suit is gamestate.trump_suit:
             # royal marriage
@@ -1282,32 +2258,13 @@ class SchnapsenTrickScorer(TrickScorer):
         leader_card = regular_leader_move.card
         follower_card = trick.follower_move.card
         assert leader_card != follower_card
-        leader_card_points = self.rank_to_points(leader_card.rank)
-        follower_card_points = self.rank_to_points(follower_card.rank)
-
-        if leader_card.suit is follower_card.suit:
-            # same suit, either trump or not
-            if leader_card_points > follower_card_points:
-                leader_wins = True
-            else:
-                leader_wins = False
-        elif leader_card.suit is trump:
-            # the follower suit cannot be trumps as per the previous condition
-            leader_wins = True
-        elif follower_card.suit is trump:
-            # the leader suit cannot be trumps because of the previous conditions
-            leader_wins = False
-        else:
-            # the follower did not follow the suit of the leader and did not play trumps, hence the leader wins
-            leader_wins = True
+        leader_wins, points_gained = self.trick_outcomes.outcome(leader_card, follower_card, trump)
         winner, loser = (leader, follower) if leader_wins else (follower, leader)
         # record the win
-        winner.won_cards.extend([leader_card, follower_card])
-        # apply the points
-        points_gained = leader_card_points + follower_card_points
-        winner.score += Score(direct_points=points_gained)
-        # add winner's total of direct and pending points as their new direct points
-        winner.score = winner.score.redeem_pending_points()
+        winner.won_cards = CardSet.from_mask(winner.won_cards.mask | leader_card.bit | follower_card.bit)
+        # apply the points, and add the pending points of the winner to its direct points
+        score = winner.score
+        winner.score = Score(direct_points=score.direct_points + points_gained + score.pending_points)
         return winner, loser, leader_wins
 
     def declare_winner(self, game_state: GameState) -> Optional[Tuple[BotState, int]]:
@@ -1350,6 +2307,26 @@ class GamePlayEngine:
     move_validator: MoveValidator
     trick_scorer: TrickScorer
 
+    def __post_init__(self) -> None:
+        if isinstance(self.trick_scorer, SchnapsenTrickScorer):
+            # build the table now, rather than during the first game
+            self.trick_scorer.trick_outcomes
+
+    @cached_property
+    def action_space(self) -> ActionSpace:
+        """The ActionSpace of the initial deck of this engine. The MoveValidator returns the interned moves of this ActionSpace."""
+        return ActionSpace(self.deck_generator.get_initial_deck())
+
+    @cached_property
+    def state_codec(self) -> GameStateCodec:
+        """The GameStateCodec for the cards and moves of this engine."""
+        return GameStateCodec(self)
+
+    @cached_property
+    def follower_legality_table(self) -> FollowerLegalityTable:
+        """The FollowerLegalityTable for the points of the trick scorer of this engine, used by the SchnapsenMoveValidator."""
+        return FollowerLegalityTable(self.trick_scorer)
+
     def play_game(self, bot1: Bot, bot2: Bot, rng: Random) -> Tuple[Bot, int, Score]:
         """
         Play a game between bot1 and bot2, using the rng to create the game.
@@ -1376,6 +2353,39 @@ class GamePlayEngine:
         winner, points, score = self.play_game_from_state(game_state=game_state, leader_move=None)
         return winner, points, score
 
+    def play_games(self, bot_factory1: 'BotFactory', bot_factory2: 'BotFactory', seeds: Iterable[int],
+                   workers: int = 1, chunksize: Optional[int] = None) -> List[Tuple[bool, int, Score]]:
+        """
+        Play a game between new bots for each of the seeds, using random.Random(seed) to create the game.
+        The bots change seats like in a serial loop which swaps the leader and follower before every even game:
+        bot1 leads the first game, bot2 the second and third, bot1 the fourth and fifth, and so on.
+
+        For each game, new bots are created by calling the factories with seeds derived from the seed of the game, see bot_seeds.
+        Hence, the results do not depend on the number of workers, nor on the order in which the games are played,
+        but they differ from those of a loop in which a single pair of bots plays all the games.
+
+        :param bot_factory1: Creates the first bot for a game. When using more than one worker, it must be picklable, e.g., a class or a module level function.
+        :param bot_factory2: Creates the second bot for a game, with the same requirements as bot_factory1.
+        :param seeds: The seeds of the games to play.
+        :param workers: The number of processes used to play the games. With 1, all games are played in this process.
+        :param chunksize: The number of games sent to a worker at once. If not provided, the games are split in about 4 chunks per worker.
+
+        :returns: For each game, in the order of the seeds, whether bot1 won, the number of points obtained from this game and the score attained by the winner.
+        """
+        assert workers >= 1, "At least one worker is needed to play games"
+        games = [(seed, (game_number // 2) % 2 == 1) for game_number, seed in enumerate(seeds, start=1)]
+        if workers == 1:
+            return _play_games_chunk(self, bot_factory1, bot_factory2, games)
+        if chunksize is None:
+            chunksize = max(1, -(-len(games) // (4 * workers)))
+        chunks = [games[start:start + chunksize] for start in range(0, len(games), chunksize)]
+        results: List[Tuple[bool, int, Score]] = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk_results in executor.map(_play_games_chunk, itertools.repeat(self), itertools.repeat(bot_factory1),
+                                              itertools.repeat(bot_factory2), chunks):
+                results.extend(chunk_results)
+        return results
+
     def play_game_from_state_with_new_bots(self, game_state: GameState, new_leader: Bot, new_follower: Bot, leader_move: Optional[Move]) -> Tuple[Bot, int, Score]:
         """
         Continue a game  which might have started before with other bots, with new bots.
@@ -1465,6 +2475,35 @@ class GamePlayEngine:
                f"trick_scorer={self.trick_scorer})"
 
 
+BotFactory = Callable[[int], Bot]
+"""A function creating a Bot with the given seed, as used by GamePlayEngine.play_games. A Bot class taking a seed, like RandBot, is one."""
+
+
+def bot_seeds(game_seed: int) -> Tuple[int, int]:
+    """
+    The seeds for the two bots of the game with the given seed in GamePlayEngine.play_games.
+    They are derived from the seed of the game, but differ from it and from each other, such that the bots do not draw the same random numbers
+    as each other or as the deal of the cards.
+
+    :param game_seed: The seed of the game.
+    :returns: The seeds for the first and the second bot.
+    """
+    return Random(f"bot1-{game_seed}").getrandbits(32), Random(f"bot2-{game_seed}").getrandbits(32)
+
+
+def _play_games_chunk(engine: GamePlayEngine, bot_factory1: BotFactory, bot_factory2: BotFactory,
+                      games: List[Tuple[int, bool]]) -> List[Tuple[bool, int, Score]]:
+    """Play the games for GamePlayEngine.play_games. Each game is given by its seed and whether bot2 leads it."""
+    results: List[Tuple[bool, int, Score]] = []
+    for seed, bot2_leads in games:
+        seed1, seed2 = bot_seeds(seed)
+        bot1, bot2 = bot_factory1(seed1), bot_factory2(seed2)
+        leader, follower = (bot2, bot1) if bot2_leads else (bot1, bot2)
+        winner, points, score = engine.play_game(leader, follower, Random(seed))
+        results.append((winner is bot1, points, score))
+    return results
+
+
 class SchnapsenGamePlayEngine(GamePlayEngine):
     def __init__(self) -> None:
         super().__init__(
@@ -1478,3 +2517,276 @@ class SchnapsenGamePlayEngine(GamePlayEngine):
 
     def __repr__(self) -> str:
         return super().__repr__()
+
+
+class FastGameState:
+    """
+    The mutable state of a game played by the FastSimulator.
+    Cards are plain integers, namely their index in the initial deck of the engine (see FastSimulator.cards),
+    and suits are the index of the suit in Suit.
+    The players are 0 and 1. Lists indexed by player contain the information of that player.
+    """
+
+    def __init__(self, hands: List[List[int]], talon: List[int], trump_suit: int, leader: int = 0,
+                 direct_points: Optional[List[int]] = None, pending_points: Optional[List[int]] = None) -> None:
+        self.hands = hands
+        """The cards in the hand of each player, in the same order as in a Hand."""
+        self.talon = talon
+        """The cards on the talon. The first one is the top card, the last one is the trump card."""
+        self.trump_suit = trump_suit
+        """The trump suit"""
+        self.leader = leader
+        """The player leading the current trick"""
+        self.direct_points = direct_points if direct_points is not None else [0, 0]
+        """The direct points of each player"""
+        self.pending_points = pending_points if pending_points is not None else [0, 0]
+        """The pending points of each player"""
+        self.leader_action: Optional[int] = None
+        """The action played by the leader in the current trick, or None if the leader still has to play"""
+
+    def copy(self) -> 'FastGameState':
+        """Create a deep copy of this state"""
+        state = FastGameState([list(self.hands[0]), list(self.hands[1])], list(self.talon), self.trump_suit, self.leader,
+                              list(self.direct_points), list(self.pending_points))
+        state.leader_action = self.leader_action
+        return state
+
+    def __repr__(self) -> str:
+        return f"FastGameState(hands={self.hands}, talon={self.talon}, trump_suit={self.trump_suit}, leader={self.leader}, "\
+               f"direct_points={self.direct_points}, pending_points={self.pending_points})"
+
+
+FastPolicy = Callable[[FastGameState, List[int]], int]
+"""
+A policy for the FastSimulator. It gets the state and the list of legal actions, and returns one of these actions.
+The player to move is the leader of the state if its leader_action is None, and the other player otherwise.
+A policy should only look at the information its player is allowed to see.
+"""
+
+
+class FastSimulator:
+    """
+    Plays games with the rules of SchnapsenTrickImplementer, SchnapsenMoveValidator and SchnapsenTrickScorer,
+    without the overhead of perspectives, Move objects, validation and history which the GamePlayEngine has.
+    The deck, the dealing and the card points are taken from the engine, so this also works for, e.g., the TwentyFourSchnapsenGamePlayEngine.
+
+    Moves are represented by the integer actions of the ActionSpace of the engine. With n the number of cards in the deck:
+    action c < n is the regular move playing card c, action n + s is the trump exchange with the jack of suit s,
+    and action n + 4 + s is the marriage in suit s.
+
+    Legal actions are listed in the same order as the MoveValidator lists the moves. Hence, a policy making the same choices as a bot,
+    e.g., a random policy using the same Random as a RandBot, results in the same game.
+    """
+
+    def __init__(self, engine: GamePlayEngine) -> None:
+        assert isinstance(engine.trick_implementer, SchnapsenTrickImplementer), "The FastSimulator implements the rules of the SchnapsenTrickImplementer"
+        assert isinstance(engine.move_validator, SchnapsenMoveValidator), "The FastSimulator implements the rules of the SchnapsenMoveValidator"
+        assert isinstance(engine.trick_scorer, SchnapsenTrickScorer), "The FastSimulator implements the rules of the SchnapsenTrickScorer"
+        self.engine = engine
+        self.cards: List[Card] = list(engine.deck_generator.get_initial_deck())
+        """The cards of the deck, the integer representing a card is its index in this list"""
+        self.__card_index = {card.bit: index for index, card in enumerate(self.cards)}
+        suits = list(Suit)
+        self.__num_cards = len(self.cards)
+        self.__standard_dealing = type(engine.hand_generator) is SchnapsenHandGenerator \
+            and getattr(type(engine.deck_generator).shuffle_deck, "__func__", None) is getattr(DeckGenerator.shuffle_deck, "__func__")
+        self.__suit = [suits.index(card.suit) for card in self.cards]
+        self.__is_queen = [card.rank is Rank.QUEEN for card in self.cards]
+        self.__points = [engine.trick_scorer.rank_to_points(card.rank) for card in self.cards]
+        self.__jack: List[Optional[int]] = [None] * 4
+        self.__queen: List[Optional[int]] = [None] * 4
+        self.__king: List[Optional[int]] = [None] * 4
+        for index, card in enumerate(self.cards):
+            if card.rank is Rank.JACK:
+                self.__jack[self.__suit[index]] = index
+            elif card.rank is Rank.QUEEN:
+                self.__queen[self.__suit[index]] = index
+            elif card.rank is Rank.KING:
+                self.__king[self.__suit[index]] = index
+        # The score obtained from a marriage, indexed by [marriage suit][trump suit]
+        self.__marriage_score: List[List[Score]] = [[Score()] * 4 for _ in range(4)]
+        for suit in range(4):
+            queen, king = self.__queen[suit], self.__king[suit]
+            if queen is None or king is None:
+                continue
+            marriage = Marriage(self.cards[queen], self.cards[king])
+            for trump in range(4):
+                empty_state = GameState(leader=BotState(_DummyBot(), Hand([])), follower=BotState(_DummyBot(), Hand([])),
+                                        talon=Talon([], suits[trump]), previous=None)
+                self.__marriage_score[suit][trump] = engine.trick_scorer.marriage(marriage, empty_state)
+        # The outcome of each trick, whether the leader wins and the points of the cards, indexed by [trump suit][leader card * n + follower card]
+        trick_outcomes = engine.trick_scorer.trick_outcomes
+        self.__trick_outcomes = [[trick_outcomes.outcome(leader_card, follower_card, trump) for leader_card in self.cards for follower_card in self.cards]
+                                 for trump in suits]
+
+    @staticmethod
+    def random_policy(rand: Random) -> FastPolicy:
+        """A policy choosing uniformly at random among the legal actions. It plays like a RandBot using the same Random."""
+        def policy(state: FastGameState, legal_actions: List[int]) -> int:
+            return rand.choice(legal_actions)
+        return policy
+
+    def marriage_score(self, suit: int, trump_suit: int) -> Score:
+        """The score the leader obtains from a marriage in the suit, when trump_suit is the trump suit"""
+        return self.__marriage_score[suit][trump_suit]
+
+    def move_to_action(self, move: Move) -> int:
+        """Get the action representing the move"""
+        return self.engine.action_space.action(move)
+
+    def action_to_move(self, action: int) -> Move:
+        """Get the interned Move represented by the action"""
+        return self.engine.action_space.move(action)
+
+    def deal(self, rng: Random) -> FastGameState:
+        """Shuffle and deal the cards like the engine does in play_game. Player 0 leads the first trick."""
+        deck_generator = self.engine.deck_generator
+        if self.__standard_dealing:
+            # Shuffling only depends on the number of cards, so we can shuffle the integers instead of the cards
+            cards = list(range(self.__num_cards))
+            rng.shuffle(cards)
+            return FastGameState(hands=[cards[0:10:2], cards[1:11:2]], talon=cards[10:], trump_suit=self.__suit[cards[-1]])
+        shuffled = deck_generator.shuffle_deck(deck_generator.get_initial_deck(), rng)
+        hand1, hand2, talon = self.engine.hand_generator.generateHands(shuffled)
+        index = self.__card_index
+        suits = list(Suit)
+        return FastGameState(hands=[[index[card.bit] for card in hand1], [index[card.bit] for card in hand2]],
+                             talon=[index[card.bit] for card in talon], trump_suit=suits.index(talon.trump_suit()))
+
+    def from_game_state(self, game_state: GameState) -> FastGameState:
+        """Convert a GameState to a FastGameState. The leader of the game_state becomes player 0."""
+        index = self.__card_index
+        suits = list(Suit)
+        leader, follower = game_state.leader, game_state.follower
+        return FastGameState(hands=[[index[card.bit] for card in leader.hand], [index[card.bit] for card in follower.hand]],
+                             talon=[index[card.bit] for card in game_state.talon], trump_suit=suits.index(game_state.trump_suit),
+                             direct_points=[leader.score.direct_points, follower.score.direct_points],
+                             pending_points=[leader.score.pending_points, follower.score.pending_points])
+
+    def legal_leader_actions(self, state: FastGameState) -> List[int]:
+        """The legal actions of the leader, in the order of SchnapsenMoveValidator.get_legal_leader_moves"""
+        hand = state.hands[state.leader]
+        legal_actions = list(hand)
+        if state.talon:
+            trump_jack = self.__jack[state.trump_suit]
+            if trump_jack in hand:
+                legal_actions.append(self.__num_cards + state.trump_suit)
+        is_queen = self.__is_queen
+        for card in hand:
+            if is_queen[card]:
+                suit = self.__suit[card]
+                if self.__king[suit] in hand:
+                    legal_actions.append(self.__num_cards + 4 + suit)
+        return legal_actions
+
+    def legal_follower_actions(self, state: FastGameState, leader_card: int) -> List[int]:
+        """The legal actions of the follower when the leader played leader_card, in the order of SchnapsenMoveValidator.get_legal_follower_moves"""
+        hand = state.hands[1 - state.leader]
+        if state.talon:
+            return list(hand)
+        suit = self.__suit
+        leader_suit = suit[leader_card]
+        same_suit = [card for card in hand if suit[card] == leader_suit]
+        if same_suit:
+            leader_points = self.__points[leader_card]
+            higher = [card for card in same_suit if self.__points[card] > leader_points]
+            return higher or same_suit
+        if leader_suit != state.trump_suit:
+            trumps = [card for card in hand if suit[card] == state.trump_suit]
+            if trumps:
+                return trumps
+        return list(hand)
+
+    def play(self, state: FastGameState, policies: Tuple[FastPolicy, FastPolicy],
+             max_tricks: Optional[int] = None, leader_action: Optional[int] = None) -> Optional[Tuple[int, int]]:
+        """
+        Continue the game in the state, which gets modified, until it ends or max_tricks tricks have been played.
+        Like in the GamePlayEngine, a trump exchange counts as a trick.
+
+        :param state: The state to play from.
+        :param policies: The policies of player 0 and player 1.
+        :param max_tricks: If provided, at most this many tricks are played.
+        :param leader_action: If provided, the leader plays this action in the first trick, without asking its policy.
+        :returns: The winning player and the game points won, or None if the game has not ended.
+        """
+        n = self.__num_cards
+        trick_outcomes = self.__trick_outcomes[state.trump_suit]
+        hands = state.hands
+        talon = state.talon
+        direct_points = state.direct_points
+        pending_points = state.pending_points
+        tricks_played = 0
+        while max_tricks is None or tricks_played < max_tricks:
+            tricks_played += 1
+            leader = state.leader
+            follower = 1 - leader
+            state.leader_action = None
+            if leader_action is None:
+                action = policies[leader](state, self.legal_leader_actions(state))
+            else:
+                action, leader_action = leader_action, None
+            if n <= action < n + 4:
+                # trump exchange, this ends the trick
+                jack = self.__jack[action - n]
+                assert jack is not None
+                hands[leader].remove(jack)
+                hands[leader].append(talon[-1])
+                talon[-1] = jack
+                continue
+            if action >= n:
+                # marriage, the queen is played
+                marriage_suit = action - n - 4
+                marriage_score = self.__marriage_score[marriage_suit][state.trump_suit]
+                direct_points[leader] += marriage_score.direct_points
+                pending_points[leader] += marriage_score.pending_points
+                leader_card = self.__queen[marriage_suit]
+                assert leader_card is not None
+            else:
+                leader_card = action
+            state.leader_action = action
+            follower_card = policies[follower](state, self.legal_follower_actions(state, leader_card))
+            state.leader_action = None
+            hands[leader].remove(leader_card)
+            hands[follower].remove(follower_card)
+
+            leader_wins, trick_points = trick_outcomes[leader_card * n + follower_card]
+            winner = leader if leader_wins else follower
+            loser = 1 - winner
+            direct_points[winner] += trick_points + pending_points[winner]
+            pending_points[winner] = 0
+            state.leader = winner
+            if talon:
+                hands[winner].append(talon[0])
+                hands[loser].append(talon[1])
+                del talon[:2]
+
+            # the same as SchnapsenTrickScorer.declare_winner, the winner of the trick is the leader now
+            if direct_points[winner] >= 66:
+                loser_points = direct_points[loser]
+                if loser_points == 0:
+                    return winner, 3
+                elif loser_points >= 33:
+                    return winner, 1
+                return winner, 2
+            if not hands[winner] and not hands[loser] and not talon:
+                return winner, 1
+        return None
+
+    def play_game(self, policy1: FastPolicy, policy2: FastPolicy, rng: Random) -> Tuple[int, int, Score]:
+        """
+        Play a game between policy1 and policy2, using the rng to create the game, like GamePlayEngine.play_game does.
+
+        :param policy1: The policy of player 0, which leads the first trick.
+        :param policy2: The policy of player 1.
+        :param rng: The random number generator used to shuffle the deck.
+
+        :returns: A tuple with the player (0 or 1) which won the game, the number of points obtained from this game and the score attained.
+        """
+        state = self.deal(rng)
+        result = self.play(state, (policy1, policy2))
+        assert result is not None
+        winner, game_points = result
+        return winner, game_points, Score(state.direct_points[winner], state.pending_points[winner])
+
+    def __repr__(self) -> str:
+        return f"FastSimulator(engine={self.engine})"
@@ -0,0 +1,45 @@
+from random import Random
+from typing import Iterator, List
+from unittest import TestCase
+
+import numpy as np
+
+from schnapsen.batched import BatchedSimulator
+from schnapsen.game import FastGameState, FastPolicy, SchnapsenGamePlayEngine
+from schnapsen.twenty_four_card_schnapsen import TwentyFourSchnapsenGamePlayEngine
+
+
+def _replay_policy(actions: Iterator[int], test: TestCase) -> FastPolicy:
+    """A policy which plays the recorded actions, checking that each of them is legal"""
+    def policy(state: FastGameState, legal_actions: List[int]) -> int:
+        action = next(actions)
+        test.assertIn(action, legal_actions)
+        return action
+    return policy
+
+
+class BatchedSimulatorTest(TestCase):
+
+    def test_same_rules_as_fast_simulator(self) -> None:
+        for engine in [SchnapsenGamePlayEngine(), TwentyFourSchnapsenGamePlayEngine()]:
+            simulator = BatchedSimulator(engine)
+            results = simulator.play_random_games(range(500), record_actions=True)
+            assert results.actions is not None
+            for game in range(500):
+                recorded = iter([int(action) for action in results.actions[game].ravel() if action >= 0])
+                policy = _replay_policy(recorded, self)
+                winner, points, score = simulator.fast_simulator.play_game(policy, policy, Random(game))
+                self.assertIsNone(next(recorded, None))
+                self.assertEqual(winner, results.winners[game])
+                self.assertEqual(points, results.game_points[game])
+                self.assertEqual(score.direct_points, results.direct_points[game, winner])
+                self.assertEqual(score.pending_points, results.pending_points[game, winner])
+
+    def test_reproducible(self) -> None:
+        simulator = BatchedSimulator(SchnapsenGamePlayEngine())
+        results1 = simulator.play_random_games(range(100))
+        results2 = simulator.play_random_games(range(100))
+        self.assertTrue(np.array_equal(results1.winners, results2.winners))
+        self.assertTrue(np.array_equal(results1.direct_points, results2.direct_points))
+        self.assertTrue(np.all(results1.game_points >= 1))
+        self.assertTrue(np.all(results1.game_points <= 3))
@@ -1,7 +1,77 @@
-from unittest import TestCase
-from schnapsen.bots import RandBot, AlphaBetaBot
-from schnapsen.game import SchnapsenGamePlayEngine
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+from unittest import TestCase, mock
+from schnapsen.bots import RandBot, AlphaBetaBot, ISMCTSBot, PIMCBot, RdeepBot
+from schnapsen.bots.alphabeta import AlphaBetaSolver, ParallelAlphaBetaSolver
+from schnapsen.bots.ismcts import _Node, _iterate
+from schnapsen.deck import Card, Suit
+from schnapsen.game import Bot, BotState, GamePhase, GamePlayEngine, GameState, Hand, LeaderPerspective, Move, PlayerPerspective, RegularMove, SchnapsenGamePlayEngine, Score, Talon
+from schnapsen.twenty_four_card_schnapsen import TwentyFourSchnapsenGamePlayEngine
 import random
+import time
+
+
+class _PhaseTwoBot(Bot):
+    """Plays with the first bot in phase one, and with the second bot in phase two"""
+
+    def __init__(self, phase_one_bot: Bot, phase_two_bot: Bot) -> None:
+        self.phase_one_bot = phase_one_bot
+        self.phase_two_bot = phase_two_bot
+
+    def get_move(self, state: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        if state.get_phase() == GamePhase.TWO:
+            return self.phase_two_bot.get_move(state, leader_move)
+        return self.phase_one_bot.get_move(state, leader_move)
+
+
+class _FakeClock:
+    """Replaces the time module of schnapsen.bots.rdeep. Its time only advances by a fixed step for each rollout, which always scores 0.5."""
+
+    def __init__(self, step: float) -> None:
+        self.step = step
+        self.now = 0.0
+
+    def perf_counter(self) -> float:
+        return self.now
+
+    def rollout(self, *args: object) -> float:
+        self.now += self.step
+        return 0.5
+
+
+class _BudgetBot(Bot):
+    """Keeps the number of valid moves, the size of the hand and the talon, and the time on the fake clock, for each move of the bot"""
+
+    def __init__(self, bot: Bot, clock: _FakeClock) -> None:
+        self.bot = bot
+        self.clock = clock
+        self.moves: List[Tuple[int, int, int, float]] = []
+
+    def get_move(self, state: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        start = self.clock.now
+        move = self.bot.get_move(state, leader_move)
+        self.moves.append((len(state.valid_moves()), len(state.get_hand()), state.get_talon_size(), self.clock.now - start))
+        return move
+
+    def notify_game_end(self, won: bool, state: PlayerPerspective) -> None:
+        self.bot.notify_game_end(won, state)
+
+
+class _SearchStatisticsBot(Bot):
+    """Keeps the root visits and reused visits of the ISMCTSBot after each move it searched"""
+
+    def __init__(self, bot: ISMCTSBot) -> None:
+        self.bot = bot
+        self.statistics: List[Tuple[Dict[Move, int], int]] = []
+
+    def get_move(self, state: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        move = self.bot.get_move(state, leader_move)
+        if len(state.valid_moves()) > 1:
+            self.statistics.append((dict(self.bot.get_root_visits()), self.bot.get_reused_visits()))
+        return move
+
+    def notify_game_end(self, won: bool, state: PlayerPerspective) -> None:
+        self.bot.notify_game_end(won, state)
 
 
 class RandBotTest(TestCase):
@@ -22,5 +92,367 @@ class AlphaBetaBotTest(TestCase):
         self.bot2 = AlphaBetaBot()
 
     def test_run(self) -> None:
-        # TODO
-        pass
+        for i in range(5):
+            self.engine.play_game(_PhaseTwoBot(RandBot(i), self.bot1), _PhaseTwoBot(RandBot(i + 1), self.bot2), random.Random(i))
+
+    def test_same_value_as_minimax(self) -> None:
+        solver = AlphaBetaSolver(self.engine)
+        solved = 0
+        for seed in range(60):
+            state = self.__phase_two_state(seed)
+            if state is None:
+                continue
+            value, move = solver.solve(state)
+            self.assertEqual(value, self.__minimax(state, None))
+            # after the best move, the follower cannot do better than the value for the leader
+            self.assertEqual(-solver.solve(state, move)[0], value)
+            solved += 1
+        self.assertGreater(solved, 20)
+
+    def test_move_values(self) -> None:
+        solver = AlphaBetaSolver(self.engine)
+        for seed in range(20):
+            state = self.__phase_two_state(seed)
+            if state is None:
+                continue
+            move_values = solver.move_values(state)
+            self.assertEqual(max(value for _, value in move_values), solver.solve(state)[0])
+            for move, value in move_values:
+                self.assertEqual(-self.__minimax(state, move), value)
+
+    def test_value_of_bot(self) -> None:
+        for seed in range(10):
+            state = self.__phase_two_state(seed)
+            if state is None:
+                continue
+            value = self.bot1.value(LeaderPerspective(state, self.engine), None)
+            self.assertEqual(value, self.__minimax(state, None))
+
+    def test_positions_with_other_trump(self) -> None:
+        # the same hands and points, in games with different trump suits, have different values
+        leader_hand = [Card.ACE_HEARTS, Card.TEN_CLUBS, Card.KING_CLUBS, Card.JACK_SPADES, Card.QUEEN_DIAMONDS]
+        follower_hand = [Card.TEN_HEARTS, Card.ACE_SPADES, Card.QUEEN_SPADES, Card.JACK_CLUBS, Card.KING_DIAMONDS]
+        states = [GameState(leader=BotState(RandBot(1), Hand(leader_hand), Score(30, 0)), follower=BotState(RandBot(2), Hand(follower_hand), Score(30, 0)),
+                            talon=Talon([], trump_suit), previous=None) for trump_suit in Suit]
+        values = [AlphaBetaSolver(self.engine).solve(state)[0] for state in states]
+        self.assertGreater(len(set(values)), 1)
+        # a solver which is kept across games does not mix up the positions
+        solver = AlphaBetaSolver(self.engine)
+        for _ in range(2):
+            self.assertEqual([solver.solve(state)[0] for state in states], values)
+            self.assertEqual([-solver.solve(state, RegularMove(Card.ACE_HEARTS))[0] for state in states], values)
+
+    def test_parallel_solver(self) -> None:
+        solver = AlphaBetaSolver(self.engine)
+        one_worker = ParallelAlphaBetaSolver(self.engine, workers=1)
+        self.addCleanup(one_worker.close)
+        # with more workers than moves, the replies of the follower are searched separately
+        many_workers = ParallelAlphaBetaSolver(self.engine, workers=6)
+        self.addCleanup(many_workers.close)
+        for seed in range(8):
+            state = self.__phase_two_state(seed)
+            if state is None:
+                continue
+            value, move = one_worker.solve(state)
+            self.assertEqual(value, solver.solve(state)[0])
+            self.assertEqual(many_workers.solve(state), (value, move))
+            reply_value, reply = one_worker.solve(state, move)
+            self.assertEqual(reply_value, -value)
+            self.assertEqual(many_workers.solve(state, move), (reply_value, reply))
+
+    def test_parallel_bot(self) -> None:
+        bot = AlphaBetaBot(workers=2)
+        self.addCleanup(bot.close)
+        for seed in range(5):
+            state = self.__phase_two_state(seed)
+            if state is None:
+                continue
+            perspective = LeaderPerspective(state, self.engine)
+            self.assertEqual(bot.value(perspective, None), self.bot1.value(perspective, None))
+
+    def __phase_two_state(self, seed: int) -> Optional[GameState]:
+        deck = self.engine.deck_generator.shuffle_deck(self.engine.deck_generator.get_initial_deck(), random.Random(seed))
+        hand1, hand2, talon = self.engine.hand_generator.generateHands(deck)
+        state = GameState(leader=BotState(RandBot(seed), hand1), follower=BotState(RandBot(seed + 1), hand2), talon=talon, previous=None)
+        state, _ = self.engine.play_at_most_n_tricks(state, RandBot(seed), RandBot(seed + 1), n=5)
+        if self.engine.trick_scorer.declare_winner(state) or not state.talon.is_empty():
+            return None
+        return state
+
+    def __minimax(self, state: GameState, leader_move: Optional[Move]) -> float:
+        """The value for the player to move, without any pruning"""
+        engine = self.engine
+        if leader_move is None:
+            winner = engine.trick_scorer.declare_winner(state)
+            if winner is not None:
+                return winner[1] if winner[0] is state.leader else -winner[1]
+            return max(-self.__minimax(state, move) for move in engine.move_validator.get_legal_leader_moves(engine, state))
+        values = []
+        for move in engine.move_validator.get_legal_follower_moves(engine, state, leader_move):
+            me = state.follower
+            state.apply_trick(engine, leader_move, move.as_regular_move())
+            value = self.__minimax(state, None)
+            values.append(value if state.leader is me else -value)
+            state.undo()
+        return max(values)
+
+
+class PIMCBotTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+
+    def test_run(self) -> None:
+        for i in range(2):
+            self.engine.play_game(PIMCBot(num_samples=3, rand=random.Random(i), max_depth=2), RandBot(i), random.Random(i))
+            self.engine.play_game(RandBot(i), PIMCBot(num_samples=3, rand=random.Random(i), max_depth=2, vote=True), random.Random(i))
+
+    def test_time_budget(self) -> None:
+        bot = PIMCBot(num_samples=10000, rand=random.Random(1), time_budget=0.02)
+        start = time.perf_counter()
+        self.engine.play_game(bot, RandBot(1), random.Random(1))
+        # searching an assumption can go over the budget, but not by much
+        self.assertLess(time.perf_counter() - start, 5.0)
+
+    def test_scores_of_searched_assumptions(self) -> None:
+        deck = list(self.engine.deck_generator.shuffle_deck(self.engine.deck_generator.get_initial_deck(), random.Random(2)))
+        state = GameState(leader=BotState(RandBot(1), Hand(deck[:5])), follower=BotState(RandBot(2), Hand(deck[5:10])), talon=Talon(deck[10:]), previous=None)
+        perspective = LeaderPerspective(state, self.engine)
+        for vote in (False, True):
+            # the time budget stops the search after the first of the many assumptions
+            stopped = PIMCBot(num_samples=10000, rand=random.Random(4), vote=vote, time_budget=1e-9)
+            single = PIMCBot(num_samples=1, rand=random.Random(4), vote=vote)
+            self.assertEqual(stopped.get_move(perspective, None), single.get_move(perspective, None))
+            # the scores are those of the searched assumption, not divided by the number of samples which could have been searched
+            stopped_scores, single_scores = stopped.get_move_scores(), single.get_move_scores()
+            self.assertEqual(stopped_scores.keys(), single_scores.keys())
+            for move, score in single_scores.items():
+                self.assertAlmostEqual(stopped_scores[move], score)
+            if vote:
+                self.assertAlmostEqual(sum(stopped.get_move_scores().values()), 1.0)
+
+
+class ISMCTSBotTest(TestCase):
+    def test_run(self) -> None:
+        for engine in (SchnapsenGamePlayEngine(), TwentyFourSchnapsenGamePlayEngine()):
+            for i in range(2):
+                engine.play_game(ISMCTSBot(num_iterations=50, rand=random.Random(i)), RandBot(i), random.Random(i))
+                engine.play_game(RandBot(i), ISMCTSBot(num_iterations=50, rand=random.Random(i), reuse_tree=False), random.Random(i))
+
+    def test_workers_are_deterministic(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        results = []
+        for _ in range(2):
+            bot = ISMCTSBot(num_iterations=40, rand=random.Random(7), workers=2)
+            results.append(engine.play_game(bot, RandBot(7), random.Random(7)))
+            bot.close()
+        self.assertEqual(results[0][1:], results[1][1:])
+        self.assertEqual(type(results[0][0]), type(results[1][0]))
+
+    def test_reused_subtree(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        for reuse_tree in (True, False):
+            bot = _SearchStatisticsBot(ISMCTSBot(num_iterations=200, rand=random.Random(3), reuse_tree=reuse_tree))
+            engine.play_game(bot, RandBot(3), random.Random(3))
+            self.assertGreater(len(bot.statistics), 2)
+            # the first search starts from a new tree
+            self.assertEqual(bot.statistics[0][1], 0)
+            for root_visits, reused in bot.statistics:
+                self.assertEqual(sum(root_visits.values()), reused + 200)
+            if reuse_tree:
+                # after a trick, the iterations which went through the new information set are kept
+                self.assertTrue(any(reused > 0 for _, reused in bot.statistics[1:]))
+            else:
+                self.assertTrue(all(reused == 0 for _, reused in bot.statistics))
+
+    def test_branches_split_by_drawn_card(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        deck = engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), random.Random(4))
+        hand1, hand2, talon = engine.hand_generator.generateHands(deck)
+        perspective = LeaderPerspective(GameState(leader=BotState(RandBot(1), hand1), follower=BotState(RandBot(2), hand2), talon=talon, previous=None), engine)
+        unseen = set(engine.deck_generator.get_initial_deck()) - set(hand1) - {talon.trump_card()}
+        rand = random.Random(4)
+        root = _Node(mine=False)
+        for assumption in perspective.make_assumptions(None, rand, 500, lazy=True):
+            _iterate(engine, root, assumption, None, rand, 0.7)
+        drawn_cards: Set[Optional[Card]] = set()
+        for leader_move, leader_node in root.children.items():
+            if leader_move.is_trump_exchange():
+                continue
+            for follower_node in leader_node.children.values():
+                # the first iteration through the follower move ends in that node, the others continue in the branch of the card we drew
+                self.assertEqual(sum(child.visits for draw_node in follower_node.draws.values() for child in draw_node.children.values()),
+                                 follower_node.visits - 1)
+                drawn_cards.update(follower_node.draws)
+        self.assertGreater(len(drawn_cards), 1)
+        self.assertLessEqual(drawn_cards, unseen)
+
+    def test_workers_merge_root_visits(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        runs = []
+        for _ in range(2):
+            ismcts = ISMCTSBot(num_iterations=41, rand=random.Random(5), workers=2)
+            self.addCleanup(ismcts.close)
+            bot = _SearchStatisticsBot(ismcts)
+            engine.play_game(bot, RandBot(5), random.Random(5))
+            # the visits of the two trees are added up, only the tree of this process is reused
+            for root_visits, reused in bot.statistics:
+                self.assertEqual(sum(root_visits.values()), reused + 41)
+            runs.append(bot.statistics)
+        self.assertTrue(any(reused > 0 for _, reused in runs[0]))
+        self.assertEqual(runs[0], runs[1])
+
+
+class RdeepBotTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+
+    def test_run(self) -> None:
+        for i in range(3):
+            self.engine.play_game(RdeepBot(num_samples=4, depth=4, rand=random.Random(i)), RandBot(i), random.Random(i))
+
+    def test_workers_do_not_change_play(self) -> None:
+        results = []
+        for workers in (1, 2):
+            bot = RdeepBot(num_samples=4, depth=4, rand=random.Random(7), workers=workers)
+            opponent = RandBot(8)
+            games = [self.engine.play_game(bot, opponent, random.Random(i)) for i in range(3)]
+            results.append([(winner is bot, points, score) for winner, points, score in games])
+            bot.close()
+        self.assertEqual(results[0], results[1])
+
+    def test_time_budget(self) -> None:
+        step = 0.001
+        positions: List[Tuple[int, int, int, float]] = []
+        for time_budget, game_time_budget in ((0.02, None), (None, 0.2), (0.02, 0.2)):
+            clock = _FakeClock(step)
+            bot = _BudgetBot(RdeepBot(num_samples=10000, depth=4, rand=random.Random(1), time_budget=time_budget, game_time_budget=game_time_budget), clock)
+            with mock.patch("schnapsen.bots.rdeep.time", clock), mock.patch("schnapsen.bots.rdeep._rollout", side_effect=clock.rollout):
+                for i in range(3):
+                    self.engine.play_game(bot, RandBot(i), random.Random(i))
+                    self._check_move_budgets(bot.moves, step, time_budget, game_time_budget)
+                    positions.extend(bot.moves)
+                    bot.moves.clear()
+        # some positions have fewer valid moves than cards in the hand, and get a smaller share of the budget
+        self.assertTrue(any(1 < num_moves < hand_size for num_moves, hand_size, _, _ in positions))
+
+    def _check_move_budgets(self, moves: List[Tuple[int, int, int, float]], step: float, time_budget: Optional[float], game_time_budget: Optional[float]) -> None:
+        """Check the time used on the fake clock for each move of a game, see _BudgetBot"""
+        self.assertGreater(len(moves), 1)
+        game_time_used = 0.0
+        for num_moves, hand_size, talon_size, elapsed in moves:
+            if num_moves == 1:
+                self.assertEqual(elapsed, 0.0)
+                continue
+            # the budget of the move, as specified by the time budgets
+            budget = float('inf') if time_budget is None else time_budget
+            if game_time_budget is not None:
+                budget = min(budget, max(0.0, game_time_budget - game_time_used) / max(1, hand_size + talon_size // 2))
+            budget *= min(1.0, num_moves / hand_size)
+            # every round plays one rollout for each move, and the bot stops after the round which uses up the budget
+            round_time = num_moves * step
+            rounds = round(elapsed / round_time)
+            self.assertGreaterEqual(rounds, 1)
+            self.assertAlmostEqual(elapsed, rounds * round_time)
+            self.assertGreaterEqual(elapsed, budget - 1e-9)
+            if rounds > 1:
+                self.assertLess(elapsed - round_time, budget + 1e-9)
+            game_time_used += elapsed
+
+    def test_forced_move_is_not_sampled(self) -> None:
+        state = GameState(leader=BotState(RandBot(1), Hand([Card.ACE_HEARTS])), follower=BotState(RandBot(2), Hand([Card.TEN_CLUBS])),
+                          talon=Talon([], Suit.HEARTS), previous=None)
+        perspective = LeaderPerspective(state, self.engine)
+        self.assertEqual(len(perspective.valid_moves()), 1)
+        rand = random.Random(1)
+        random_state = rand.getstate()
+        with mock.patch("schnapsen.bots.rdeep._rollout") as rollout:
+            for bot in (RdeepBot(num_samples=10000, depth=4, rand=rand, time_budget=10.0),
+                        RdeepBot(num_samples=10000, depth=4, rand=rand, game_time_budget=100.0)):
+                self.assertEqual(bot.get_move(perspective, None), RegularMove(Card.ACE_HEARTS))
+            rollout.assert_not_called()
+        # not even a random number is drawn
+        self.assertEqual(rand.getstate(), random_state)
+
+    def test_common_random_numbers(self) -> None:
+        bot = RdeepBot(num_samples=6, depth=3, rand=random.Random(3), common_random_numbers=True)
+        self.assertEqual(bot.get_paired_differences(), {})
+        deck = list(self.engine.deck_generator.shuffle_deck(self.engine.deck_generator.get_initial_deck(), random.Random(5)))
+        state = GameState(leader=BotState(bot, Hand(deck[:5])), follower=BotState(RandBot(1), Hand(deck[5:10])), talon=Talon(deck[10:]), previous=None)
+        perspective = LeaderPerspective(state, self.engine)
+        move = bot.get_move(perspective, None)
+        differences = bot.get_paired_differences()
+        self.assertEqual(set(differences), set(perspective.valid_moves()))
+        self.assertEqual(differences[move], [0.0] * 6)
+        for move_differences in differences.values():
+            self.assertEqual(len(move_differences), 6)
+            # the chosen move has the best average score
+            self.assertGreaterEqual(sum(move_differences), 0.0)
+
+    def test_rollout_budget(self) -> None:
+        bot = RdeepBot(num_samples=1, depth=3, rand=random.Random(4), rollout_budget=40, common_random_numbers=True)
+        deck = list(self.engine.deck_generator.shuffle_deck(self.engine.deck_generator.get_initial_deck(), random.Random(6)))
+        state = GameState(leader=BotState(bot, Hand(deck[:5])), follower=BotState(RandBot(1), Hand(deck[5:10])), talon=Talon(deck[10:]), previous=None)
+        perspective = LeaderPerspective(state, self.engine)
+        move = bot.get_move(perspective, None)
+        differences = bot.get_paired_differences()
+        lengths = {other: len(move_differences) for other, move_differences in differences.items()}
+        # the chosen move survived all rounds, so no move got more rollouts, and weak moves were dropped early
+        self.assertEqual(lengths[move], max(lengths.values()))
+        self.assertLess(min(lengths.values()), lengths[move])
+        self.assertLessEqual(sum(lengths.values()), 40 + len(lengths) * 3)
+        for i in range(2):
+            self.engine.play_game(RdeepBot(num_samples=1, depth=4, rand=random.Random(i), rollout_budget=30), RandBot(i), random.Random(i))
+
+    def test_enumeration_threshold(self) -> None:
+        for i in range(2):
+            bot = RdeepBot(num_samples=4, depth=4, rand=random.Random(i), enumeration_threshold=50, common_random_numbers=True)
+            self.engine.play_game(bot, RandBot(i), random.Random(i))
+
+    def test_enumeration(self) -> None:
+        state = self.__late_phase_one_state()
+        perspective = LeaderPerspective(state, self.engine)
+        moves = perspective.valid_moves()
+        assumptions = list(perspective.enumerate_assumptions(None))
+        self.assertEqual(len(assumptions), 6)
+        rollouts: List[Tuple[int, Move]] = []
+
+        def score(engine: GamePlayEngine, game_state: GameState, leader_move: Optional[Move], my_move: Move, depth: int, rand: random.Random) -> float:
+            # a score which only depends on the assumption and the move, such that the expected scores are known
+            rollouts.append((game_state.zobrist_hash(), my_move))
+            return (game_state.zobrist_hash() % 97 + engine.action_space.action(my_move)) / 200
+
+        with mock.patch("schnapsen.bots.rdeep._rollout", score):
+            bot = RdeepBot(num_samples=12, depth=4, rand=random.Random(1), enumeration_threshold=6, common_random_numbers=True)
+            move = bot.get_move(perspective, None)
+            # every distinct assumption is rolled out, its num_samples / 6 rollouts are shared by all random samples making it
+            expected_rollouts = Counter({(assumption.zobrist_hash(), other): 2 for assumption, _ in assumptions for other in moves})
+            self.assertEqual(Counter(rollouts), expected_rollouts)
+            # the scores are weighted with the probabilities of the assumptions
+            expected = {other: sum(probability * score(self.engine, assumption, None, other, 4, random.Random()) for assumption, probability in assumptions)
+                        for other in moves}
+            self.assertEqual(move, max(moves, key=lambda other: expected[other]))
+            for other, differences in bot.get_paired_differences().items():
+                self.assertEqual(len(differences), 1)
+                self.assertAlmostEqual(differences[0], expected[move] - expected[other])
+
+            # the rollout budget is spread over the assumptions and moves
+            rollouts.clear()
+            RdeepBot(num_samples=12, depth=4, rand=random.Random(1), enumeration_threshold=6, rollout_budget=20 * len(moves)).get_move(perspective, None)
+            self.assertEqual(len(rollouts), 18 * len(moves))
+            # with a time budget which is used up immediately, there is one round with a rollout for each assumption and move
+            rollouts.clear()
+            RdeepBot(num_samples=12, depth=4, rand=random.Random(1), enumeration_threshold=6, time_budget=1e-9).get_move(perspective, None)
+            self.assertEqual(Counter(rollouts), Counter({(assumption.zobrist_hash(), other): 1 for assumption, _ in assumptions for other in moves}))
+            # above the threshold, num_samples random samples are used, instead of at least one rollout for each assumption
+            rollouts.clear()
+            RdeepBot(num_samples=3, depth=4, rand=random.Random(1), enumeration_threshold=5).get_move(perspective, None)
+            self.assertEqual(len(rollouts), 3 * len(moves))
+
+    def __late_phase_one_state(self) -> GameState:
+        """A state with two cards on the talon, where the leader has several moves"""
+        deck = self.engine.deck_generator.shuffle_deck(self.engine.deck_generator.get_initial_deck(), random.Random(0))
+        hand1, hand2, talon = self.engine.hand_generator.generateHands(deck)
+        state = GameState(leader=BotState(RandBot(0), hand1), follower=BotState(RandBot(1), hand2), talon=talon, previous=None)
+        state, _ = self.engine.play_at_most_n_tricks(state, RandBot(0), RandBot(1), n=4)
+        assert len(state.talon) == 2 and not self.engine.trick_scorer.declare_winner(state)
+        return state
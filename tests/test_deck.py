@@ -4,6 +4,7 @@ from schnapsen.deck import (
     Suit,
     Rank,
     Card,
+    CardSet,
     OrderedCardCollection,
 )
 
@@ -129,3 +130,46 @@ class CollectionTest(TestCase):
                 for card in removed:
                     self.assertNotEqual(card.rank, rank)
                     self.assertIn(card, collection)
+
+
+class CardSetTest(TestCase):
+
+    def test_empty(self) -> None:
+        card_set = CardSet()
+        self.assertTrue(card_set.is_empty())
+        self.assertEqual(len(card_set), 0)
+        self.assertEqual(card_set.mask, 0)
+        for card in Card:
+            self.assertNotIn(card, card_set)
+
+    def test_membership_and_order(self) -> None:
+        card_set = CardSet([Card.QUEEN_HEARTS, Card.ACE_CLUBS, Card.FOUR_DIAMONDS, Card.ACE_CLUBS])
+        self.assertEqual(len(card_set), 3)
+        # iteration follows the order in which the cards are defined
+        self.assertEqual(card_set.get_cards(), [Card.QUEEN_HEARTS, Card.ACE_CLUBS, Card.FOUR_DIAMONDS])
+        for card in Card:
+            self.assertEqual(card in card_set, card in [Card.QUEEN_HEARTS, Card.ACE_CLUBS, Card.FOUR_DIAMONDS])
+        self.assertEqual(CardSet.from_mask(card_set.mask), card_set)
+
+    def test_set_operations(self) -> None:
+        first = CardSet([Card.ACE_CLUBS, Card.FOUR_DIAMONDS, Card.QUEEN_HEARTS])
+        second = CardSet([Card.FOUR_DIAMONDS, Card.KING_SPADES])
+        self.assertEqual(first | second, CardSet([Card.ACE_CLUBS, Card.FOUR_DIAMONDS, Card.QUEEN_HEARTS, Card.KING_SPADES]))
+        self.assertEqual(first & second, CardSet([Card.FOUR_DIAMONDS]))
+        self.assertEqual(first - second, CardSet([Card.ACE_CLUBS, Card.QUEEN_HEARTS]))
+        self.assertEqual(first ^ second, CardSet([Card.ACE_CLUBS, Card.QUEEN_HEARTS, Card.KING_SPADES]))
+        self.assertTrue(CardSet([Card.FOUR_DIAMONDS]).issubset(first))
+        self.assertFalse(second.issubset(first))
+
+    def test_filters_and_masks(self) -> None:
+        card_set = CardSet(Card)
+        for suit in Suit:
+            filtered = card_set.filter_suit(suit)
+            self.assertEqual(len(filtered), 13)
+            self.assertTrue(all(card.suit is suit for card in filtered))
+            self.assertEqual(filtered.mask, CardSet.suit_mask(suit))
+        for rank in Rank:
+            filtered = card_set.filter_rank(rank)
+            self.assertEqual(len(filtered), 4)
+            self.assertTrue(all(card.rank is rank for card in filtered))
+            self.assertEqual(filtered.mask, CardSet.rank_mask(rank))
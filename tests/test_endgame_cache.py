@@ -0,0 +1,72 @@
+import os
+import pickle
+import random
+import tempfile
+from typing import List
+from unittest import TestCase
+
+from schnapsen.bots import AlphaBetaBot, RandBot
+from schnapsen.bots.alphabeta import AlphaBetaSolver
+from schnapsen.deck import Card, Suit
+from schnapsen.game import BotState, GameState, Hand, LeaderPerspective, SchnapsenGamePlayEngine, Talon
+from schnapsen.endgame_cache import EndgameCache, EndgameCacheEncoder, build_endgame_cache
+
+
+class EndgameCacheTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+        self.roots: List[GameState] = []
+        for seed in range(30):
+            deck = self.engine.deck_generator.shuffle_deck(self.engine.deck_generator.get_initial_deck(), random.Random(seed))
+            hand1, hand2, talon = self.engine.hand_generator.generateHands(deck)
+            state = GameState(leader=BotState(RandBot(seed), hand1), follower=BotState(RandBot(seed + 1), hand2), talon=talon, previous=None)
+            state, _ = self.engine.play_at_most_n_tricks(state, RandBot(seed), RandBot(seed + 1), n=5)
+            if state.talon.is_empty() and not self.engine.trick_scorer.declare_winner(state):
+                self.roots.append(state)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "endgame_cache.bin")
+        self.positions = build_endgame_cache(self.path, self.engine, self.roots)
+        self.cache = EndgameCache(self.path, self.engine)
+        self.addCleanup(self.cache.close)
+
+    def test_same_values_as_solver(self) -> None:
+        self.assertEqual(len(self.cache), self.positions)
+        solver = AlphaBetaSolver(self.engine)
+        for root in self.roots:
+            value, _ = solver.solve(root)
+            self.assertEqual(self.cache.value(root), value)
+            move_values = self.cache.move_values(root)
+            assert move_values is not None
+            self.assertEqual(max(move_value for _, move_value in move_values), value)
+            for move, move_value in move_values:
+                if not move.is_trump_exchange():
+                    # the value of the best reply of the follower
+                    self.assertEqual(-solver.solve(root, move)[0], move_value)
+
+    def test_suit_symmetry(self) -> None:
+        encoder = EndgameCacheEncoder(self.engine)
+        # swapping two non-trump suits does not change the key
+        hand1 = [Card.ACE_HEARTS, Card.TEN_CLUBS, Card.KING_CLUBS, Card.JACK_SPADES, Card.QUEEN_DIAMONDS]
+        hand2 = [Card.TEN_HEARTS, Card.ACE_SPADES, Card.QUEEN_SPADES, Card.JACK_CLUBS, Card.KING_DIAMONDS]
+        swapped1 = [Card.ACE_HEARTS, Card.TEN_SPADES, Card.KING_SPADES, Card.JACK_CLUBS, Card.QUEEN_DIAMONDS]
+        swapped2 = [Card.TEN_HEARTS, Card.ACE_CLUBS, Card.QUEEN_CLUBS, Card.JACK_SPADES, Card.KING_DIAMONDS]
+        state = GameState(leader=BotState(RandBot(1), Hand(hand1)), follower=BotState(RandBot(2), Hand(hand2)), talon=Talon([], Suit.HEARTS), previous=None)
+        swapped = GameState(leader=BotState(RandBot(1), Hand(swapped1)), follower=BotState(RandBot(2), Hand(swapped2)), talon=Talon([], Suit.HEARTS), previous=None)
+        self.assertEqual(encoder.key(state), encoder.key(swapped))
+        other_trump = GameState(leader=BotState(RandBot(1), Hand(hand1)), follower=BotState(RandBot(2), Hand(hand2)), talon=Talon([], Suit.CLUBS), previous=None)
+        self.assertNotEqual(encoder.key(state), encoder.key(other_trump))
+        # the cache is sampled, a position without any points is not reachable from the roots
+        self.assertIsNone(self.cache.value(state))
+        self.assertIsNone(self.cache.best_move(state))
+
+    def test_pickle_and_bot(self) -> None:
+        copy = pickle.loads(pickle.dumps(self.cache))
+        self.addCleanup(copy.close)
+        self.assertEqual(len(copy), len(self.cache))
+        bot = AlphaBetaBot(endgame_cache=copy)
+        solver_bot = AlphaBetaBot()
+        for root in self.roots:
+            self.assertEqual(copy.value(root), self.cache.value(root))
+            perspective = LeaderPerspective(root, self.engine)
+            self.assertEqual(bot.value(perspective, None), solver_bot.value(perspective, None))
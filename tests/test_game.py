@@ -1,6 +1,18 @@
-from unittest import TestCase
-from schnapsen.deck import Card, Rank, Suit
+import gc
+import itertools
+from random import Random
+from typing import Iterable, List, Optional, Set, Tuple, cast
+from unittest import TestCase, mock
+import weakref
+from schnapsen.deck import Card, CardSet, Rank, Suit
 from schnapsen.game import (
+    Bot,
+    ExchangeFollowerPerspective,
+    FastSimulator,
+    GamePhase,
+    Move,
+    PlayerPerspective,
+    SchnapsenMoveValidator,
     Trump_Exchange,
     Marriage,
     Hand,
@@ -12,8 +24,15 @@ from schnapsen.game import (
     LeaderPerspective,
     RegularMove,
     FollowerPerspective,
+    SuitRelabeling,
+    RegularTrick,
+    SchnapsenTrickScorer,
+    Trick,
+    bot_seeds,
+    _HistoryLog,
 )
 from schnapsen.bots.rand import RandBot
+from schnapsen.twenty_four_card_schnapsen import TwentyFourSchnapsenGamePlayEngine
 
 
 class MoveTest(TestCase):
@@ -206,6 +225,15 @@ class TalonTest(TestCase):
         self.assertEqual(t.get_cards(), copy)
         self.assertEqual(t.trump_suit(), Suit.DIAMONDS)
 
+    def test_copy(self) -> None:
+        t = Talon(self.ten_cards)
+        copy = t.copy()
+        copy.trump_exchange(Card.JACK_DIAMONDS)
+        copy.draw_cards(2)
+        # modifying the copy must not modify the original
+        self.assertEqual(t.get_cards(), self.ten_cards)
+        self.assertEqual(copy.get_cards(), self.ten_cards[2:9] + [Card.JACK_DIAMONDS])
+
     def test_draw_cards(self) -> None:
         t = Talon(self.ten_cards)
         drawn = list(t.draw_cards(4))
@@ -249,7 +277,7 @@ class GameTest(TestCase):
             cards=[Card.ACE_CLUBS, Card.FIVE_CLUBS, Card.NINE_HEARTS, Card.SEVEN_CLUBS]
         )
         score = Score(direct_points=4, pending_points=2)
-        won_cards = [Card.ACE_DIAMONDS]
+        won_cards = CardSet([Card.ACE_DIAMONDS])
         foo = BotState(
             implementation=bot,
             hand=hand,
@@ -268,7 +296,7 @@ class GameTest(TestCase):
             cards=[Card.ACE_CLUBS, Card.FIVE_CLUBS, Card.NINE_HEARTS, Card.SEVEN_CLUBS]
         )
         score0 = Score(direct_points=4, pending_points=2)
-        won_cards0 = [Card.ACE_DIAMONDS]
+        won_cards0 = CardSet([Card.ACE_DIAMONDS])
         leader = BotState(
             implementation=bot0,
             hand=hand0,
@@ -286,7 +314,7 @@ class GameTest(TestCase):
             ]
         )
         score1 = Score(direct_points=2, pending_points=4)
-        won_cards1 = [Card.NINE_DIAMONDS]
+        won_cards1 = CardSet([Card.NINE_DIAMONDS])
         follower = BotState(
             implementation=bot1,
             hand=hand1,
@@ -300,13 +328,30 @@ class GameTest(TestCase):
         )
         self.assertFalse(gs.are_all_cards_played())
 
+    def test_GameState_copy_for_next(self) -> None:
+        leader = BotState(implementation=RandBot(seed=42), hand=Hand([Card.ACE_CLUBS, Card.TEN_CLUBS]))
+        follower = BotState(implementation=RandBot(seed=43), hand=Hand([Card.KING_CLUBS, Card.JACK_HEARTS]))
+        talon = Talon(cards=[Card.QUEEN_SPADES, Card.ACE_HEARTS], trump_suit=Suit.HEARTS)
+        gs = GameState(leader=leader, follower=follower, talon=talon, previous=None)
+        next_gs = gs.copy_for_next()
+        next_gs.leader.hand.remove(Card.ACE_CLUBS)
+        next_gs.follower.hand.remove(Card.KING_CLUBS)
+        next_gs.leader.hand.add(next(iter(next_gs.talon.draw_cards(1))))
+        # modifying the copy must not modify the original
+        self.assertEqual(gs.leader.hand.cards, [Card.ACE_CLUBS, Card.TEN_CLUBS])
+        self.assertEqual(gs.follower.hand.cards, [Card.KING_CLUBS, Card.JACK_HEARTS])
+        self.assertEqual(gs.talon.get_cards(), [Card.QUEEN_SPADES, Card.ACE_HEARTS])
+        self.assertEqual(next_gs.leader.hand.cards, [Card.TEN_CLUBS, Card.QUEEN_SPADES])
+        self.assertNotIn(Card.ACE_CLUBS, next_gs.leader.hand)
+        self.assertIn(Card.ACE_CLUBS, gs.leader.hand)
+
     def test_LeaderGameState(self) -> None:
         bot0 = RandBot(seed=42)
         hand0 = Hand(
             cards=[Card.ACE_CLUBS, Card.FIVE_CLUBS, Card.NINE_HEARTS, Card.SEVEN_CLUBS]
         )
         score0 = Score(direct_points=4, pending_points=2)
-        won_cards0 = [Card.ACE_DIAMONDS]
+        won_cards0 = CardSet([Card.ACE_DIAMONDS])
         leader = BotState(
             implementation=bot0,
             hand=hand0,
@@ -324,7 +369,7 @@ class GameTest(TestCase):
             ]
         )
         score1 = Score(direct_points=2, pending_points=4)
-        won_cards1 = [Card.NINE_DIAMONDS]
+        won_cards1 = CardSet([Card.NINE_DIAMONDS])
         follower = BotState(
             implementation=bot1,
             hand=hand1,
@@ -363,7 +408,7 @@ class GameTest(TestCase):
             cards=[Card.ACE_CLUBS, Card.FIVE_CLUBS, Card.NINE_HEARTS, Card.SEVEN_CLUBS]
         )
         score0 = Score(direct_points=4, pending_points=2)
-        won_cards0 = [Card.ACE_DIAMONDS]
+        won_cards0 = CardSet([Card.ACE_DIAMONDS])
         leader = BotState(
             implementation=bot0,
             hand=hand0,
@@ -381,7 +426,7 @@ class GameTest(TestCase):
             ]
         )
         score1 = Score(direct_points=2, pending_points=4)
-        won_cards1 = [Card.NINE_DIAMONDS]
+        won_cards1 = CardSet([Card.NINE_DIAMONDS])
         follower = BotState(
             implementation=bot1,
             hand=hand1,
@@ -430,3 +475,522 @@ class GameTest(TestCase):
         # make sure marriage poits are applied
         #        assert
         pass
+
+
+class _FixedMoveBot(Bot):
+    def __init__(self, move: Move) -> None:
+        self.move = move
+
+    def get_move(self, state: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        return self.move
+
+
+class ApplyTrickTest(TestCase):
+
+    def _deal(self, engine: SchnapsenGamePlayEngine, seed: int) -> GameState:
+        deck = engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), Random(seed))
+        hand1, hand2, talon = engine.hand_generator.generateHands(deck)
+        return GameState(leader=BotState(RandBot(seed=1), hand1), follower=BotState(RandBot(seed=2), hand2), talon=talon, previous=None)
+
+    def test_apply_and_undo(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        validator = SchnapsenMoveValidator()
+        for seed in range(50):
+            rng = Random(seed)
+            state = self._deal(engine, seed)
+            reference = state.copy_with_other_bots(state.leader.implementation, state.follower.implementation)
+            history: list[str] = []
+            while not engine.trick_scorer.declare_winner(state):
+                history.append(repr(state))
+                leader_move = rng.choice(list(validator.get_legal_leader_moves(engine, state)))
+                follower_move: Optional[RegularMove] = None
+                if not leader_move.is_trump_exchange():
+                    follower_move = cast(RegularMove, rng.choice(list(validator.get_legal_follower_moves(engine, state, leader_move))))
+                    reference.follower.implementation = _FixedMoveBot(follower_move)
+                reference = engine.trick_implementer.play_trick_with_fixed_leader_move(engine, reference, leader_move)
+                state.apply_trick(engine, leader_move, follower_move)
+                # the in place trick must have the same effect as the engine
+                self.assertEqual(repr(state.leader.hand), repr(reference.leader.hand))
+                self.assertEqual(repr(state.follower.hand), repr(reference.follower.hand))
+                self.assertEqual(state.leader.score, reference.leader.score)
+                self.assertEqual(state.follower.score, reference.follower.score)
+                self.assertEqual(state.leader.won_cards, reference.leader.won_cards)
+                self.assertEqual(repr(state.talon), repr(reference.talon))
+            # a copy shares the cards, undo must not change it
+            copy = state.copy_for_next()
+            copy_repr = repr(copy)
+            hands = {id(state.leader.hand), id(state.follower.hand)}
+            talon = state.talon
+            while history:
+                state.undo()
+                self.assertEqual(repr(state), history.pop())
+                # the hands and the talon are restored in place, and their masks and hashes are kept up to date
+                self.assertEqual({id(state.leader.hand), id(state.follower.hand)}, hands)
+                self.assertIs(state.talon, talon)
+                for hand in (state.leader.hand, state.follower.hand):
+                    self.assertEqual(hand.card_set(), CardSet(hand.cards))
+                    self.assertEqual(hand._zobrist, Hand(hand.cards)._zobrist)
+                self.assertEqual(talon._zobrist, Talon(talon.get_cards(), talon.trump_suit())._zobrist)
+            self.assertEqual(repr(copy), copy_repr)
+            with self.assertRaises(AssertionError):
+                state.undo()
+
+
+class FastSimulatorTest(TestCase):
+
+    def test_same_games_as_engine(self) -> None:
+        for engine in [SchnapsenGamePlayEngine(), TwentyFourSchnapsenGamePlayEngine()]:
+            simulator = FastSimulator(engine)
+            bot1, bot2 = RandBot(seed=1), RandBot(seed=2)
+            policy1, policy2 = FastSimulator.random_policy(Random(1)), FastSimulator.random_policy(Random(2))
+            for i in range(300):
+                winner, points, score = engine.play_game(bot1, bot2, Random(i))
+                fast_winner, fast_points, fast_score = simulator.play_game(policy1, policy2, Random(i))
+                self.assertEqual(fast_winner, 0 if winner is bot1 else 1)
+                self.assertEqual(fast_points, points)
+                self.assertEqual(fast_score, score)
+
+    def test_play_from_state(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        simulator = FastSimulator(engine)
+        for i in range(100):
+            deck = engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), Random(i))
+            hand1, hand2, talon = engine.hand_generator.generateHands(deck)
+            state = GameState(leader=BotState(RandBot(seed=1), hand1), follower=BotState(RandBot(seed=2), hand2), talon=talon, previous=None)
+            leader_move = Random(i).choice(list(SchnapsenMoveValidator().get_legal_leader_moves(engine, state)))
+            reference, _ = engine.play_at_most_n_tricks(state, _FixedMoveBot(leader_move), RandBot(seed=3), n=1)
+            reference, _ = engine.play_at_most_n_tricks(reference, RandBot(seed=4), RandBot(seed=5), n=3)
+
+            fast_state = simulator.from_game_state(state)
+            policies = (FastSimulator.random_policy(Random(3)), FastSimulator.random_policy(Random(3)))
+            simulator.play(fast_state, policies, max_tricks=1, leader_action=simulator.move_to_action(leader_move))
+            policies = (FastSimulator.random_policy(Random(4)), FastSimulator.random_policy(Random(5)))
+            if fast_state.leader == 1:
+                policies = (policies[1], policies[0])
+            simulator.play(fast_state, policies, max_tricks=3)
+            leader = fast_state.leader
+            self.assertEqual([simulator.cards[card] for card in fast_state.hands[leader]], reference.leader.hand.cards)
+            self.assertEqual([simulator.cards[card] for card in fast_state.hands[1 - leader]], reference.follower.hand.cards)
+            self.assertEqual(fast_state.direct_points[leader], reference.leader.score.direct_points)
+            self.assertEqual(fast_state.pending_points[1 - leader], reference.follower.score.pending_points)
+            self.assertEqual([simulator.cards[card] for card in fast_state.talon], reference.talon.get_cards())
+
+    def test_action_conversion(self) -> None:
+        simulator = FastSimulator(TwentyFourSchnapsenGamePlayEngine())
+        for action in range(len(simulator.cards) + 8):
+            self.assertEqual(simulator.move_to_action(simulator.action_to_move(action)), action)
+
+
+class PlayGamesTest(TestCase):
+
+    def test_same_results_as_serial_loop(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        results = engine.play_games(RandBot, RandBot, seeds=range(1, 21))
+        lead_is_bot1 = True
+        for i in range(1, 21):
+            if i % 2 == 0:
+                lead_is_bot1 = not lead_is_bot1
+            seed1, seed2 = bot_seeds(i)
+            self.assertEqual(len({i, seed1, seed2}), 3)
+            bot1, bot2 = RandBot(seed=seed1), RandBot(seed=seed2)
+            leader, follower = (bot1, bot2) if lead_is_bot1 else (bot2, bot1)
+            winner, points, score = engine.play_game(leader, follower, Random(i))
+            self.assertEqual(results[i - 1], (winner is bot1, points, score))
+
+    def test_independent_of_workers(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        serial = engine.play_games(RandBot, RandBot, seeds=range(40))
+        parallel = engine.play_games(RandBot, RandBot, seeds=range(40), workers=2, chunksize=3)
+        self.assertEqual(serial, parallel)
+
+
+class ActionSpaceTest(TestCase):
+
+    def test_actions_and_moves(self) -> None:
+        for engine, num_cards in [(SchnapsenGamePlayEngine(), 20), (TwentyFourSchnapsenGamePlayEngine(), 24)]:
+            action_space = engine.action_space
+            self.assertEqual(action_space.size, num_cards + 8)
+            for action in range(action_space.size):
+                move = action_space.move(action)
+                self.assertEqual(action_space.action(move), action)
+                self.assertIs(action_space.intern(move.as_regular_move() if move.is_regular_move() else move), move)
+            jack = Card.get_card(Rank.JACK, Suit.HEARTS)
+            self.assertIs(action_space.intern(Trump_Exchange(jack)), action_space.move(num_cards + list(Suit).index(Suit.HEARTS)))
+            self.assertEqual(action_space.moves_in_mask(action_space.mask([action_space.move(3), action_space.move(0)])),
+                             [action_space.move(0), action_space.move(3)])
+        with self.assertRaises(ValueError):
+            SchnapsenGamePlayEngine().action_space.action(RegularMove(Card.NINE_HEARTS))
+
+    def test_valid_moves_are_interned(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        for i in range(20):
+            deck = engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), Random(i))
+            hand1, hand2, talon = engine.hand_generator.generateHands(deck)
+            state = GameState(leader=BotState(RandBot(seed=1), hand1), follower=BotState(RandBot(seed=2), hand2), talon=talon, previous=None)
+            perspective = LeaderPerspective(state, engine)
+            moves = perspective.valid_moves()
+            for move, again in zip(moves, perspective.valid_moves()):
+                self.assertIs(move, again)
+            self.assertEqual(engine.action_space.moves_in_mask(perspective.valid_moves_mask()),
+                             sorted(moves, key=engine.action_space.action))
+
+
+class FollowerLegalityTableTest(TestCase):
+
+    def test_same_as_rules(self) -> None:
+        rand = Random(42)
+        for engine in [SchnapsenGamePlayEngine(), TwentyFourSchnapsenGamePlayEngine()]:
+            table = engine.follower_legality_table
+            deck = list(engine.deck_generator.get_initial_deck())
+            points = engine.trick_scorer.rank_to_points
+            for _ in range(500):
+                leader_card, *hand = rand.sample(deck, 6)
+                trump_suit = rand.choice(list(Suit))
+                # the rules as described by SchnapsenMoveValidator.get_legal_follower_moves
+                same_suit = [card for card in hand if card.suit is leader_card.suit]
+                higher = [card for card in same_suit if points(card.rank) > points(leader_card.rank)]
+                trumps = [card for card in hand if card.suit is trump_suit]
+                expected = higher or same_suit or (trumps if leader_card.suit is not trump_suit else []) or hand
+                legal_mask = table.legal_follower_mask(CardSet(hand).mask, leader_card, trump_suit)
+                self.assertEqual(legal_mask, CardSet(expected).mask)
+
+
+class TrickOutcomeTableTest(TestCase):
+
+    def test_same_as_rules(self) -> None:
+        for engine in [SchnapsenGamePlayEngine(), TwentyFourSchnapsenGamePlayEngine()]:
+            scorer = cast(SchnapsenTrickScorer, engine.trick_scorer)
+            table = scorer.trick_outcomes
+            points = scorer.rank_to_points
+            deck = list(engine.deck_generator.get_initial_deck())
+            for trump_suit in Suit:
+                for leader_card in deck:
+                    for follower_card in deck:
+                        if leader_card.suit is follower_card.suit:
+                            leader_wins = points(leader_card.rank) > points(follower_card.rank)
+                        else:
+                            leader_wins = follower_card.suit is not trump_suit
+                        expected = (leader_wins, points(leader_card.rank) + points(follower_card.rank))
+                        self.assertEqual(table.outcome(leader_card, follower_card, trump_suit), expected)
+
+    def test_score(self) -> None:
+        scorer = SchnapsenTrickScorer()
+        leader = BotState(RandBot(seed=1), Hand([]), Score(20, 20), CardSet([Card.ACE_CLUBS, Card.TEN_CLUBS]))
+        follower = BotState(RandBot(seed=2), Hand([]), Score(10, 0))
+        trick = RegularTrick(leader_move=RegularMove(Card.TEN_HEARTS), follower_move=RegularMove(Card.JACK_SPADES))
+        winner, loser, leader_wins = scorer.score(trick, leader, follower, Suit.SPADES)
+        self.assertFalse(leader_wins)
+        self.assertIs(winner, follower)
+        self.assertIs(loser, leader)
+        self.assertEqual(follower.score, Score(22, 0))
+        self.assertEqual(follower.won_cards, CardSet([Card.TEN_HEARTS, Card.JACK_SPADES]))
+        # the winner of the trick gets its pending points
+        trick = RegularTrick(leader_move=RegularMove(Card.TEN_HEARTS), follower_move=RegularMove(Card.ACE_DIAMONDS))
+        scorer.score(trick, leader, follower, Suit.SPADES)
+        self.assertEqual(leader.score, Score(61, 0))
+        self.assertEqual(leader.won_cards, CardSet([Card.ACE_CLUBS, Card.TEN_CLUBS, Card.TEN_HEARTS, Card.ACE_DIAMONDS]))
+
+
+class GameHistoryTest(TestCase):
+
+    def _play(self, engine: SchnapsenGamePlayEngine, state: GameState) -> List[GameState]:
+        states = [state]
+        while not engine.trick_scorer.declare_winner(states[-1]):
+            states.append(engine.trick_implementer.play_trick(engine, states[-1]))
+        return states
+
+    def _check_history(self, engine: SchnapsenGamePlayEngine, states: List[GameState], bot: Bot) -> None:
+        current = states[-1]
+        perspective: PlayerPerspective = LeaderPerspective(current, engine) if current.leader.implementation is bot else ExchangeFollowerPerspective(current, engine)
+        history = perspective.get_game_history()
+        self.assertEqual(len(history), len(states))
+        self.assertIs(history[-1][0], perspective)
+        self.assertIsNone(history[-1][1])
+        for index, (past_perspective, trick) in enumerate(history[:-1]):
+            past_state, next_state = states[index], states[index + 1]
+            assert next_state.previous is not None
+            self.assertIs(trick, next_state.previous.trick)
+            bot_state = past_state.leader if past_state.leader.implementation is bot else past_state.follower
+            self.assertEqual(past_perspective.am_i_leader(), bot_state is past_state.leader)
+            self.assertEqual(past_perspective.get_hand().cards, bot_state.hand.cards)
+
+    def test_history_and_branches(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        for seed in range(20):
+            bot1, bot2 = RandBot(seed=seed), RandBot(seed=seed + 1)
+            deck = engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), Random(seed))
+            hand1, hand2, talon = engine.hand_generator.generateHands(deck)
+            states = self._play(engine, GameState(leader=BotState(bot1, hand1), follower=BotState(bot2, hand2), talon=talon, previous=None))
+            # a branch continuing from a state in the middle of the game, the bots continue with another random state
+            middle = len(states) // 2
+            branch = states[:middle] + self._play(engine, states[middle].copy_with_other_bots(states[middle].leader.implementation, states[middle].follower.implementation))
+            for bot in (bot1, bot2):
+                self._check_history(engine, states, bot)
+                self._check_history(engine, branch, bot)
+
+    def test_iteration_and_slices(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        bot1, bot2 = RandBot(seed=5), RandBot(seed=6)
+        deck = engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), Random(5))
+        hand1, hand2, talon = engine.hand_generator.generateHands(deck)
+        states = self._play(engine, GameState(leader=BotState(bot1, hand1), follower=BotState(bot2, hand2), talon=talon, previous=None))
+        current = states[-2]
+        history = LeaderPerspective(current, engine).get_game_history()
+        indexed = [history[index] for index in range(len(history))]
+
+        def summary(elements: Iterable[Tuple[PlayerPerspective, Optional[Trick]]]) -> List[Tuple[bool, List[Card], Optional[Trick]]]:
+            return [(perspective.am_i_leader(), perspective.get_hand().cards, trick) for perspective, trick in elements]
+
+        # iterating and slicing walk the log once, instead of once per element
+        with mock.patch.object(_HistoryLog, "record", side_effect=AssertionError("walked per element")):
+            iterated = list(history)
+            for index in (slice(None, -1), slice(None, None, 2), slice(-3, None), slice(None, None, -1), slice(4, 2)):
+                self.assertEqual(summary(history[index]), summary(indexed[index]))
+        self.assertEqual(summary(iterated), summary(indexed))
+        self.assertIs(iterated[-1][0], history[-1][0])
+
+    def test_discarded_branches_are_freed(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        deck = engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), Random(3))
+        hand1, hand2, talon = engine.hand_generator.generateHands(deck)
+        bot1, bot2 = RandBot(seed=1), RandBot(seed=2)
+        current, _ = engine.play_at_most_n_tricks(GameState(leader=BotState(bot1, hand1), follower=BotState(bot2, hand2), talon=talon, previous=None),
+                                                  bot1, bot2, n=4)
+        length = current._history.length
+        # a rollout continuing from the current state of the game, like the bots do, which is discarded afterwards
+        rollout = self._play(engine, current.copy_with_other_bots(RandBot(seed=3), RandBot(seed=4)))
+        self.assertEqual(rollout[-1]._history.length, length + len(rollout) - 1)
+        discarded = [weakref.ref(state) for state in rollout]
+        del rollout
+        gc.collect()
+        self.assertEqual([state() for state in discarded], [None] * len(discarded))
+        # the history of the game is not affected by the rollout
+        self.assertEqual(current._history.length, length)
+        self.assertEqual(len(LeaderPerspective(current, engine).get_game_history()), length + 1)
+
+    def test_seen_and_known_cards(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        for seed in range(20):
+            deck = engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), Random(seed))
+            hand1, hand2, talon = engine.hand_generator.generateHands(deck)
+            states = self._play(engine, GameState(leader=BotState(RandBot(seed=seed), hand1), follower=BotState(RandBot(seed=seed + 1), hand2), talon=talon, previous=None))
+            for state in states[:-1]:
+                # the cards of all past tricks, found by walking the chain of previous states
+                past_cards: Set[Card] = set()
+                previous = state.previous
+                while previous:
+                    past_cards.update(previous.trick.cards)
+                    previous = previous.state.previous
+                perspective = LeaderPerspective(state, engine)
+                expected_seen = set(state.leader.hand) | past_cards | ({state.talon.trump_card()} if state.talon.trump_card() else set())
+                self.assertEqual(set(perspective.seen_cards(None)), expected_seen)
+                known = perspective.get_known_cards_of_opponent_hand().get_cards()
+                if state.game_phase() is GamePhase.ONE:
+                    self.assertEqual(known, [card for card in state.follower.hand if card in past_cards])
+                else:
+                    self.assertEqual(known, state.follower.hand.cards)
+
+
+class MakeAssumptionsTest(TestCase):
+
+    def test_same_as_make_assumption(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        for seed in range(20):
+            deck = engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), Random(seed))
+            hand1, hand2, talon = engine.hand_generator.generateHands(deck)
+            state = GameState(leader=BotState(RandBot(seed=seed), hand1), follower=BotState(RandBot(seed=seed + 1), hand2), talon=talon, previous=None)
+            # play a few tricks, such that some cards are seen
+            state, _ = engine.play_at_most_n_tricks(state, RandBot(seed=seed), RandBot(seed=seed + 1), n=seed % 6)
+            if engine.trick_scorer.declare_winner(state):
+                continue
+            perspective = LeaderPerspective(state, engine)
+            rand = Random(seed)
+            expected = [perspective.make_assumption(None, rand) for _ in range(8)]
+            assumptions = perspective.make_assumptions(None, Random(seed), 8)
+            lazy_assumptions = list(perspective.make_assumptions(None, Random(seed), 8, lazy=True))
+            for assumption_list in (assumptions, lazy_assumptions):
+                self.assertEqual(len(assumption_list), 8)
+                for assumption, expected_assumption in zip(assumption_list, expected):
+                    self.assertEqual(assumption.follower.hand.cards, expected_assumption.follower.hand.cards)
+                    self.assertEqual(assumption.talon.get_cards(), expected_assumption.talon.get_cards())
+                    self.assertEqual(assumption.leader.hand.cards, state.leader.hand.cards)
+
+    def test_enumerate_assumptions(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        for seed in range(10):
+            deck = engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), Random(seed))
+            hand1, hand2, talon = engine.hand_generator.generateHands(deck)
+            state = GameState(leader=BotState(RandBot(seed=seed), hand1), follower=BotState(RandBot(seed=seed + 1), hand2), talon=talon, previous=None)
+            # late in phase one, there are few distinct assumptions
+            state, _ = engine.play_at_most_n_tricks(state, RandBot(seed=seed), RandBot(seed=seed + 1), n=3 + seed % 2)
+            if engine.trick_scorer.declare_winner(state) or state.talon.is_empty():
+                continue
+            perspective = LeaderPerspective(state, engine)
+            enumerated = list(perspective.enumerate_assumptions(None))
+            self.assertEqual(len(enumerated), perspective.count_assumptions(None))
+            self.assertAlmostEqual(sum(probability for _, probability in enumerated), 1.0)
+            keys = {(frozenset(assumption.follower.hand.cards), tuple(assumption.talon.get_cards())) for assumption, _ in enumerated}
+            self.assertEqual(len(keys), len(enumerated))
+            for assumption in perspective.make_assumptions(None, Random(seed), 50):
+                self.assertIn((frozenset(assumption.follower.hand.cards), tuple(assumption.talon.get_cards())), keys)
+
+
+class ZobristHashTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+
+    def __played_state(self, seed: int, tricks: int) -> GameState:
+        deck = self.engine.deck_generator.shuffle_deck(self.engine.deck_generator.get_initial_deck(), Random(seed))
+        hand1, hand2, talon = self.engine.hand_generator.generateHands(deck)
+        state = GameState(leader=BotState(RandBot(seed=seed), hand1), follower=BotState(RandBot(seed=seed + 1), hand2), talon=talon, previous=None)
+        state, _ = self.engine.play_at_most_n_tricks(state, RandBot(seed=seed), RandBot(seed=seed + 1), n=tricks)
+        return state
+
+    def test_same_as_new_state(self) -> None:
+        for seed in range(30):
+            state = self.__played_state(seed, seed % 8)
+            # the same position, built from scratch, with the cards of the hands in another order
+            fresh = GameState(leader=BotState(RandBot(seed=1), Hand(reversed(state.leader.hand.get_cards()))),
+                              follower=BotState(RandBot(seed=2), Hand(state.follower.hand.get_cards())),
+                              talon=Talon(state.talon.get_cards(), state.trump_suit), previous=None)
+            fresh.leader.score, fresh.follower.score = state.leader.score, state.follower.score
+            self.assertEqual(state.zobrist_hash(), fresh.zobrist_hash())
+            # swapping the roles changes the hash
+            swapped = GameState(leader=fresh.follower, follower=fresh.leader, talon=fresh.talon, previous=None)
+            self.assertNotEqual(swapped.zobrist_hash(), fresh.zobrist_hash())
+
+    def test_apply_and_undo(self) -> None:
+        for seed in range(20):
+            state = self.__played_state(seed, 2)
+            before = state.zobrist_hash()
+            leader_move = next(iter(self.engine.move_validator.get_legal_leader_moves(self.engine, state)))
+            if leader_move.is_trump_exchange():
+                state.apply_trick(self.engine, leader_move)
+            else:
+                follower_move = next(iter(self.engine.move_validator.get_legal_follower_moves(self.engine, state, leader_move)))
+                state.apply_trick(self.engine, leader_move, cast(RegularMove, follower_move))
+            self.assertNotEqual(state.zobrist_hash(), before)
+            state.undo()
+            self.assertEqual(state.zobrist_hash(), before)
+
+    def test_information_set(self) -> None:
+        for seed in range(20):
+            state = self.__played_state(seed, seed % 6)
+            if self.engine.trick_scorer.declare_winner(state):
+                continue
+            perspective = LeaderPerspective(state, self.engine)
+            hashes = set()
+            for assumption in perspective.make_assumptions(None, Random(seed), 5):
+                # the assumption has no history, so it only agrees with the perspective on the cards of past tricks if there are none
+                assumption.previous = state.previous
+                self.assertEqual(LeaderPerspective(assumption, self.engine).zobrist_hash(), perspective.zobrist_hash())
+                hashes.add(assumption.zobrist_hash())
+            self.assertNotEqual(FollowerPerspective(state, self.engine, None).zobrist_hash(), perspective.zobrist_hash())
+            if state.game_phase() == GamePhase.TWO:
+                self.assertEqual(len(hashes), 1)
+
+
+class GameStateCodecTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+        self.codec = self.engine.state_codec
+
+    def __played_state(self, seed: int, tricks: int) -> GameState:
+        deck = self.engine.deck_generator.shuffle_deck(self.engine.deck_generator.get_initial_deck(), Random(seed))
+        hand1, hand2, talon = self.engine.hand_generator.generateHands(deck)
+        state = GameState(leader=BotState(RandBot(seed=seed), hand1), follower=BotState(RandBot(seed=seed + 1), hand2), talon=talon, previous=None)
+        state, _ = self.engine.play_at_most_n_tricks(state, RandBot(seed=seed), RandBot(seed=seed + 1), n=tricks)
+        return state
+
+    def __assert_same_state(self, decoded: GameState, state: GameState) -> None:
+        for decoded_bot, bot in ((decoded.leader, state.leader), (decoded.follower, state.follower)):
+            self.assertEqual(decoded_bot.hand.get_cards(), bot.hand.get_cards())
+            self.assertEqual(decoded_bot.score, bot.score)
+            self.assertEqual(decoded_bot.won_cards, bot.won_cards)
+        self.assertEqual(decoded.talon.get_cards(), state.talon.get_cards())
+        self.assertEqual(decoded.trump_suit, state.trump_suit)
+
+    def test_round_trip(self) -> None:
+        for seed in range(30):
+            state = self.__played_state(seed, seed % 10)
+            data = self.codec.encode(state)
+            self.assertLessEqual(len(data), 49)
+            decoded = self.codec.decode(data)
+            self.__assert_same_state(decoded, state)
+            self.assertIsNone(decoded.previous)
+            self.assertEqual(self.codec.encode(decoded), data)
+
+    def test_history(self) -> None:
+        for seed in range(30):
+            state = self.__played_state(seed, seed % 10)
+            data = self.codec.encode(state, history=True)
+            leader, follower = RandBot(seed=1), RandBot(seed=2)
+            decoded = self.codec.decode(memoryview(data), leader, follower)
+            self.__assert_same_state(decoded, state)
+            self.assertIs(decoded.leader.implementation, leader)
+            self.assertIs(decoded.follower.implementation, follower)
+            history = LeaderPerspective(state, self.engine).get_game_history()
+            decoded_history = LeaderPerspective(decoded, self.engine).get_game_history()
+            self.assertEqual(len(decoded_history), len(history))
+            for (perspective, trick), (decoded_perspective, decoded_trick) in zip(history, decoded_history):
+                self.assertEqual(repr(decoded_trick), repr(trick))
+                self.assertEqual(decoded_perspective.zobrist_hash(), perspective.zobrist_hash())
+            self.assertEqual(self.codec.encode(decoded, history=True), data)
+
+    def test_assumption(self) -> None:
+        state = self.__played_state(4, 3)
+        perspective = LeaderPerspective(state, self.engine)
+        # a bot can only encode what it can see, like the states it assumes
+        self.assertFalse(hasattr(perspective, "to_bytes"))
+        for assumption in perspective.make_assumptions(None, Random(2), 3):
+            decoded = self.codec.decode(self.codec.encode(assumption))
+            self.assertEqual(decoded.zobrist_hash(), assumption.zobrist_hash())
+            self.assertEqual(decoded.leader.hand.get_cards(), assumption.leader.hand.get_cards())
+
+
+class SuitRelabelingTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+        self.states: List[GameState] = []
+        for seed in range(20):
+            deck = self.engine.deck_generator.shuffle_deck(self.engine.deck_generator.get_initial_deck(), Random(seed))
+            hand1, hand2, talon = self.engine.hand_generator.generateHands(deck)
+            state = GameState(leader=BotState(RandBot(seed=seed), hand1), follower=BotState(RandBot(seed=seed + 1), hand2), talon=talon, previous=None)
+            state, _ = self.engine.play_at_most_n_tricks(state, RandBot(seed=seed), RandBot(seed=seed + 1), n=seed % 9)
+            if not self.engine.trick_scorer.declare_winner(state):
+                self.states.append(state)
+        self.permutations = [SuitRelabeling(dict(zip(Suit, suits))) for suits in itertools.permutations(Suit)]
+
+    def test_same_canonical_state(self) -> None:
+        for state in self.states:
+            canonical = SuitRelabeling.canonical_for_state(state).state(state)
+            for relabeling in self.permutations:
+                relabeled = relabeling.state(state, self.engine)
+                self.assertEqual(SuitRelabeling.canonical_for_state(relabeled).state(relabeled).zobrist_hash(), canonical.zobrist_hash())
+            self.assertIs(canonical.trump_suit, list(Suit)[0])
+
+    def test_inverse(self) -> None:
+        for state in self.states:
+            relabeling = SuitRelabeling.canonical_for_state(state)
+            restored = relabeling.inverse().state(relabeling.state(state, self.engine), self.engine)
+            self.assertEqual(restored.zobrist_hash(), state.zobrist_hash())
+            self.assertEqual(len(LeaderPerspective(restored, self.engine).get_game_history()),
+                             len(LeaderPerspective(state, self.engine).get_game_history()))
+            for card in Card:
+                self.assertEqual(relabeling.inverse().card(relabeling.card(card)), card)
+
+    def test_perspective(self) -> None:
+        for state in self.states:
+            perspective = LeaderPerspective(state, self.engine)
+            relabeling = SuitRelabeling.canonical_for_perspective(perspective)
+            canonical, _ = relabeling.perspective(perspective)
+            # the moves for the canonical perspective are mapped back to the valid moves
+            self.assertEqual({relabeling.inverse().move(move) for move in canonical.valid_moves()}, set(perspective.valid_moves()))
+            for other in self.permutations:
+                relabeled, _ = other.perspective(perspective)
+                relabeled_canonical, _ = SuitRelabeling.canonical_for_perspective(relabeled).perspective(relabeled)
+                self.assertEqual(relabeled_canonical.zobrist_hash(), canonical.zobrist_hash())
+            # the relabeling only depends on what the player knows
+            for assumption in perspective.make_assumptions(None, Random(1), 3):
+                assumption.previous = state.previous
+                self.assertEqual(SuitRelabeling.canonical_for_perspective(LeaderPerspective(assumption, self.engine)).mapping, relabeling.mapping)
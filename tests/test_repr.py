@@ -1,5 +1,5 @@
 from unittest import TestCase
-from schnapsen.deck import Card, Suit, OrderedCardCollection
+from schnapsen.deck import Card, CardSet, Suit, OrderedCardCollection
 from schnapsen.game import (
     Trump_Exchange,
     RegularMove,
@@ -54,7 +54,7 @@ class ReprTest(TestCase):
         output_score0 = str(score0)
         self.assertEqual(output_score0, "Score(direct_points=4, pending_points=2)")
 
-        won_cards0 = [Card.ACE_DIAMONDS]
+        won_cards0 = CardSet([Card.ACE_DIAMONDS])
         leader = BotState(
             implementation=bot0,
             hand=hand0,
@@ -64,7 +64,7 @@ class ReprTest(TestCase):
         output_leader = str(leader)
         self.assertEqual(
             output_leader,
-            "BotState(implementation=RandBot(seed=42), hand=Hand(cards=[Card.ACE_CLUBS, Card.FIVE_CLUBS, Card.NINE_HEARTS, Card.SEVEN_CLUBS], max_size=5), score=Score(direct_points=4, pending_points=2), won_cards=[Card.ACE_DIAMONDS])",
+            "BotState(implementation=RandBot(seed=42), hand=Hand(cards=[Card.ACE_CLUBS, Card.FIVE_CLUBS, Card.NINE_HEARTS, Card.SEVEN_CLUBS], max_size=5), score=Score(direct_points=4, pending_points=2), won_cards=CardSet(cards=[Card.ACE_DIAMONDS]))",
         )
 
         bot1 = RandBot(seed=43)
@@ -85,7 +85,7 @@ class ReprTest(TestCase):
         )
 
         score1 = Score(direct_points=2, pending_points=4)
-        won_cards1 = [Card.NINE_DIAMONDS]
+        won_cards1 = CardSet([Card.NINE_DIAMONDS])
         follower = BotState(
             implementation=bot1,
             hand=hand1,
@@ -101,7 +101,7 @@ class ReprTest(TestCase):
         output_follower = str(follower)
         self.assertEqual(
             output_follower,
-            "BotState(implementation=RandBot(seed=43), hand=Hand(cards=[Card.ACE_SPADES, Card.FIVE_HEARTS, Card.NINE_CLUBS, Card.SEVEN_SPADES], max_size=5), score=Score(direct_points=2, pending_points=4), won_cards=[Card.NINE_DIAMONDS])",
+            "BotState(implementation=RandBot(seed=43), hand=Hand(cards=[Card.ACE_SPADES, Card.FIVE_HEARTS, Card.NINE_CLUBS, Card.SEVEN_SPADES], max_size=5), score=Score(direct_points=2, pending_points=4), won_cards=CardSet(cards=[Card.NINE_DIAMONDS]))",
         )
 
         gs = GameState(
@@ -110,7 +110,7 @@ class ReprTest(TestCase):
         output_gs = str(gs)
         self.assertEqual(
             output_gs,
-            "GameState(leader=BotState(implementation=RandBot(seed=42), hand=Hand(cards=[Card.ACE_CLUBS, Card.FIVE_CLUBS, Card.NINE_HEARTS, Card.SEVEN_CLUBS], max_size=5), score=Score(direct_points=4, pending_points=2), won_cards=[Card.ACE_DIAMONDS]), follower=BotState(implementation=RandBot(seed=43), hand=Hand(cards=[Card.ACE_SPADES, Card.FIVE_HEARTS, Card.NINE_CLUBS, Card.SEVEN_SPADES], max_size=5), score=Score(direct_points=2, pending_points=4), won_cards=[Card.NINE_DIAMONDS]), talon=Talon(cards=[Card.ACE_HEARTS], trump_suit=HEARTS), previous=None)",
+            "GameState(leader=BotState(implementation=RandBot(seed=42), hand=Hand(cards=[Card.ACE_CLUBS, Card.FIVE_CLUBS, Card.NINE_HEARTS, Card.SEVEN_CLUBS], max_size=5), score=Score(direct_points=4, pending_points=2), won_cards=CardSet(cards=[Card.ACE_DIAMONDS])), follower=BotState(implementation=RandBot(seed=43), hand=Hand(cards=[Card.ACE_SPADES, Card.FIVE_HEARTS, Card.NINE_CLUBS, Card.SEVEN_SPADES], max_size=5), score=Score(direct_points=2, pending_points=4), won_cards=CardSet(cards=[Card.NINE_DIAMONDS])), talon=Talon(cards=[Card.ACE_HEARTS], trump_suit=HEARTS), previous=None)",
         )
 
         te = Trump_Exchange(jack=Card.JACK_SPADES)